@@ -3,6 +3,10 @@ from flask_cors import CORS
 from backend.extensions import db
 from backend.auth.routes import auth_bp
 from backend.iot.routes import iot_bp
+from backend.analysis.commands import lms_cli, rescore
+from backend.ai_commands import ai_precompute
+from backend.iot.commands import sensor_cli
+from backend.db_commands import db_explain
 from dotenv import load_dotenv
 import os
 import sys
@@ -32,6 +36,11 @@ CORS(app, supports_credentials=True)
 db.init_app(app)
 app.register_blueprint(auth_bp, url_prefix="/auth")
 app.register_blueprint(iot_bp, url_prefix="/iot")
+app.cli.add_command(lms_cli)
+app.cli.add_command(rescore)
+app.cli.add_command(ai_precompute)
+app.cli.add_command(sensor_cli)
+app.cli.add_command(db_explain)
 
 if __name__ == "__main__":
     debug_mode = os.getenv("DEBUG", "True").lower() == "true"
@@ -7,11 +7,15 @@ from .iot.routes import iot_bp
 from .children.routes import children_bp
 from .auth.routes import auth_bp
 from .dashboard.routes import dashboard_bp
+from .analysis.commands import lms_cli, rescore
+from .ai_commands import ai_precompute
+from .iot.commands import sensor_cli
+from .db_commands import db_explain
 
 
-def create_app():
+def create_app(config_object=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
 
     # Init extensions
     db.init_app(app)
@@ -24,6 +28,13 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
 
+    # Register CLI commands
+    app.cli.add_command(lms_cli)
+    app.cli.add_command(rescore)
+    app.cli.add_command(ai_precompute)
+    app.cli.add_command(sensor_cli)
+    app.cli.add_command(db_explain)
+
     print("DB URI:", app.config["SQLALCHEMY_DATABASE_URI"])
 
     return app
@@ -0,0 +1,56 @@
+import hashlib
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import AnalisisAI
+
+# ==========================================================
+# ✅ CACHE PERSISTEN HASIL ANALISIS GEMINI (tabel analisis_ai)
+# ==========================================================
+
+
+def kunci_analisis(peng, jenis, model, hasil, umur_bulan):
+    """
+    sha256 dari semua input prompt: pengukuran, nilai ukur, z-score, umur, varian prompt dan model.
+    Input yang sama selalu menghasilkan kunci yang sama sehingga Gemini cukup dipanggil sekali.
+    """
+    data = {
+        "id_pengukuran": peng.id_pengukuran,
+        "jenis": jenis,
+        "model": model,
+        "umur_bulan": umur_bulan,
+        "berat_badan": peng.berat_badan,
+        "tinggi_badan": peng.tinggi_badan,
+        "lingkar_kepala": peng.lingkar_kepala,
+        "lingkar_lengan": peng.lingkar_lengan,
+        "z_score": {k: (v or {}).get("z_score") for k, v in sorted((hasil or {}).items())},
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cari_analisis(kunci, peng):
+    """Analisis tersimpan untuk kunci ini, selama pengukuran belum diubah sejak analisis dibuat"""
+    row = AnalisisAI.query.filter_by(kunci=kunci).first()
+    if row and row.pengukuran_updated_at == peng.updated_at:
+        return row
+    return None
+
+
+def simpan_analisis(kunci, id_pengukuran, jenis, model, hasil_raw, hasil, pengukuran_updated_at):
+    """Simpan / perbarui hasil analisis untuk kunci ini"""
+    row = AnalisisAI.query.filter_by(kunci=kunci).first()
+    if not row:
+        row = AnalisisAI(kunci=kunci, id_pengukuran=id_pengukuran, jenis=jenis, model=model)
+        db.session.add(row)
+    row.hasil_raw = hasil_raw
+    row.hasil = hasil
+    row.pengukuran_updated_at = pengukuran_updated_at
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # worker lain sudah menyimpan kunci yang sama lebih dulu
+        db.session.rollback()
+        row = AnalisisAI.query.filter_by(kunci=kunci).first()
+    return row
@@ -0,0 +1,36 @@
+import click
+from flask import current_app
+
+from .ai_prompts import JENIS_ANALISIS
+from .ai_integration import butuh_api_key
+
+
+@click.command("ai-precompute")
+@click.option("--jenis", multiple=True, type=click.Choice(sorted(JENIS_ANALISIS)), default=["ringkas"],
+              show_default=True, help="Varian analisis yang dibuat (boleh diulang).")
+@click.option("--workers", type=int, default=None, help="Jumlah panggilan Gemini bersamaan (default: AI_PRECOMPUTE_WORKERS).")
+@click.option("--rpm", type=int, default=None, help="Batas permintaan per menit (default: AI_PRECOMPUTE_RPM).")
+@click.option("--retries", default=3, show_default=True, help="Percobaan ulang per analisis yang gagal.")
+@click.option("--limit", "batas", type=int, default=None, help="Maksimum analisis yang dibuat pada run ini.")
+def ai_precompute(jenis, workers, rpm, retries, batas):
+    """Buat analisis Gemini untuk pengukuran terbaru yang analisisnya belum ada atau usang."""
+    from .ai_precompute import precompute_semua
+
+    if butuh_api_key() and not current_app.config.get("GEMINI_API_KEY"):
+        click.echo("❌ API Key Gemini belum diset di environment.")
+        raise SystemExit(1)
+
+    workers = workers or current_app.config.get("AI_PRECOMPUTE_WORKERS", 4)
+    rpm = rpm if rpm is not None else current_app.config.get("AI_PRECOMPUTE_RPM", 60)
+
+    def progress(selesai, total, gagal, detik):
+        if selesai % 10 == 0 or selesai == total:
+            click.echo(f"  {selesai}/{total} analisis ({gagal} gagal, "
+                       f"{selesai / detik * 60 if detik else 0:.1f} per menit)")
+
+    hasil = precompute_semua(list(jenis), workers=workers, rpm=rpm, retries=retries, batas=batas,
+                             progress=progress)
+    click.echo(f"✅ Precompute selesai: {hasil['sukses']} dibuat, {hasil['gagal']} gagal, "
+               f"{hasil['diperiksa'] - hasil['target']} masih valid, dalam {hasil['detik']} detik")
+    if hasil["gagal"]:
+        raise SystemExit(1)
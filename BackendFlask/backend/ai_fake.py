@@ -0,0 +1,112 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+# ==========================================================
+# ✅ BACKEND GEMINI PALSU (GEMINI_BACKEND=fake / fake-latency)
+# ==========================================================
+# Meniru antarmuka genai.Client (client.models.generate_content / generate_content_stream)
+# sehingga breaker, semaphore, dan metrik di ai_integration tetap ikut teruji.
+# Dipakai untuk benchmark & load test tanpa kuota API dan tanpa jaringan.
+
+STATUS = ["Baik", "Perlu Perhatian", "Berisiko"]  # subset enum SKEMA_ANALISIS
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiError(Exception):
+    """Error buatan (mis. 503) untuk mensimulasikan API yang bermasalah"""
+
+
+def jawaban_deterministik(prompt, json_output=False):
+    """
+    Jawaban tetap untuk prompt yang sama (status dipilih dari hash prompt):
+    JSON jika structured output diminta, selain itu paragraf teks biasa.
+    """
+    h = int(hashlib.sha256(str(prompt).encode()).hexdigest(), 16)
+    status = STATUS[h % len(STATUS)]
+    if not json_output:
+        return (f"Secara umum perkembangan anak {status.lower()} menurut standar WHO. "
+                f"Berat badan dan tinggi badan perlu terus dipantau. "
+                f"Lanjutkan pemberian makanan bergizi seimbang. "
+                f"Lakukan pemantauan rutin setiap bulan di posyandu (respons simulasi).")
+    return json.dumps({
+        "status_perkembangan": status,
+        "analisis_umum": f"Analisis simulasi: perkembangan anak {status.lower()}.",
+        "area_perhatian": [] if status == "Baik" else ["Berat badan menurut umur"],
+        "rekomendasi": ["Lanjutkan pemberian makanan bergizi seimbang", "Pemantauan rutin di posyandu"],
+        "saran_pemantauan": "Setiap bulan",
+        "ringkasan": f"Status perkembangan {status.lower()} (respons simulasi).",
+    }, ensure_ascii=False)
+
+
+class ModelLatensi:
+    """
+    Latensi log-normal yang dikalibrasi dari p50 & p99 (milidetik), ditambah peluang error.
+    Latensi di atas `timeout` berakhir sebagai TimeoutError setelah menunggu `timeout` detik,
+    seperti deadline HTTP pada client asli.
+    """
+
+    def __init__(self, p50_ms=800, p99_ms=5000, error_rate=0.0, timeout=None, seed=None):
+        self.mu = math.log(max(p50_ms, 1) / 1000)
+        self.sigma = max(math.log(max(p99_ms, p50_ms, 1) / max(p50_ms, 1)) / 2.326, 0.0)
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def undi(self):
+        """Mengembalikan (detik, gagal?)"""
+        with self._lock:
+            return self._rng.lognormvariate(self.mu, self.sigma), self._rng.random() < self.error_rate
+
+    def jalankan(self, detik, gagal):
+        if self.timeout and detik > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError(f"Fake Gemini timed out setelah {self.timeout} detik")
+        time.sleep(detik)
+        if gagal:
+            raise FakeGeminiError("503 UNAVAILABLE (simulasi)")
+
+
+def minta_json(config):
+    return getattr(config, "response_mime_type", None) == "application/json"
+
+
+class FakeModels:
+    def __init__(self, latensi=None):
+        self.latensi = latensi
+
+    def generate_content(self, model=None, contents=None, config=None):
+        if self.latensi:
+            self.latensi.jalankan(*self.latensi.undi())
+        return FakeResponse(jawaban_deterministik(contents, minta_json(config)))
+
+    def generate_content_stream(self, model=None, contents=None, config=None):
+        teks = jawaban_deterministik(contents, minta_json(config))
+        potongan = [teks[i:i + 40] for i in range(0, len(teks), 40)]
+        if not self.latensi:
+            for p in potongan:
+                yield FakeResponse(p)
+            return
+
+        # potongan pertama setelah ~20% latensi, sisanya tersebar merata
+        detik, gagal = self.latensi.undi()
+        self.latensi.jalankan(detik * 0.2, False)
+        jeda = detik * 0.8 / len(potongan)
+        for i, p in enumerate(potongan):
+            if gagal and i == len(potongan) // 2:
+                raise FakeGeminiError("503 UNAVAILABLE (simulasi, stream terputus)")
+            yield FakeResponse(p)
+            time.sleep(jeda)
+
+
+class FakeGeminiClient:
+    def __init__(self, latensi=None):
+        self.models = FakeModels(latensi)
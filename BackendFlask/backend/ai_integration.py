@@ -1,28 +1,301 @@
 from google import genai
 from google.genai import types
 from flask import current_app
-import logging, os
+from collections import deque
+import logging, os, threading, time
 
-def analyze_with_gemini(prompt: str) -> str:
-    """Kirim prompt ke Gemini API dan ambil hasil teksnya."""
-    try:
-        api_key = current_app.config.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            return "API Key Gemini belum diset di environment."
-
-        os.environ["GEMINI_API_KEY"] = api_key  # pastikan tersedia untuk library
-
-        client = genai.Client()
-        resp = client.models.generate_content(
-            model=current_app.config.get("GEMINI_MODEL", "gemini-2.5-flash"),
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=current_app.config.get("GEMINI_THINKING_BUDGET", 0)
+
+class GeminiError(Exception):
+    """Gemini tidak bisa dipakai atau tidak mengembalikan hasil (pesan siap ditampilkan)."""
+
+
+class GeminiUnavailable(GeminiError):
+    """Circuit breaker terbuka atau antrian penuh: Gemini tidak dipanggil sama sekali."""
+
+
+# ==========================================================
+# ✅ CLIENT GEMINI BERSAMA (satu per proses, koneksi HTTP dipakai ulang)
+# ==========================================================
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def buat_client(api_key):
+    """Client sesuai GEMINI_BACKEND: gemini (API asli), fake, atau fake-latency"""
+    backend = current_app.config.get("GEMINI_BACKEND", "gemini")
+    timeout = current_app.config.get("GEMINI_TIMEOUT", 30)
+    if backend == "fake":
+        from .ai_fake import FakeGeminiClient
+        return FakeGeminiClient()
+    if backend == "fake-latency":
+        from .ai_fake import FakeGeminiClient, ModelLatensi
+        return FakeGeminiClient(ModelLatensi(
+            p50_ms=current_app.config.get("GEMINI_FAKE_P50_MS", 800),
+            p99_ms=current_app.config.get("GEMINI_FAKE_P99_MS", 5000),
+            error_rate=current_app.config.get("GEMINI_FAKE_ERROR_RATE", 0.0),
+            timeout=timeout,
+        ))
+    if backend != "gemini":
+        raise GeminiError(f"GEMINI_BACKEND tidak dikenal: {backend}")
+    return genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
+
+def get_client(api_key):
+    """Client dibuat sekali per proses (dibuat ulang hanya jika backend atau API key berubah)"""
+    global _client, _client_key
+    kunci = (current_app.config.get("GEMINI_BACKEND", "gemini"), api_key)
+    if _client is None or _client_key != kunci:
+        with _client_lock:
+            if _client is None or _client_key != kunci:
+                _client = buat_client(api_key)
+                _client_key = kunci
+    return _client
+
+
+def butuh_api_key():
+    return current_app.config.get("GEMINI_BACKEND", "gemini") == "gemini"
+
+
+def nama_model():
+    """Nama model untuk kunci cache; hasil backend palsu tidak bercampur dengan hasil Gemini asli"""
+    model = current_app.config.get("GEMINI_MODEL", "gemini-2.5-flash")
+    backend = current_app.config.get("GEMINI_BACKEND", "gemini")
+    return model if backend == "gemini" else f"{backend}:{model}"
+
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def get_semaphore():
+    """Batas jumlah panggilan Gemini yang berjalan bersamaan di proses ini"""
+    global _semaphore
+    if _semaphore is None:
+        with _semaphore_lock:
+            if _semaphore is None:
+                _semaphore = threading.BoundedSemaphore(current_app.config.get("GEMINI_MAX_CONCURRENCY", 4))
+    return _semaphore
+
+
+# ==========================================================
+# ✅ CIRCUIT BREAKER
+# ==========================================================
+class CircuitBreaker:
+    """
+    closed -> open setelah `ambang` kegagalan berturut-turut; selama `jeda` detik semua panggilan
+    langsung ditolak. Setelah itu satu panggilan percobaan (half-open) menentukan breaker
+    kembali closed atau open lagi.
+    """
+
+    def __init__(self, ambang=5, jeda=60):
+        self.ambang = ambang
+        self.jeda = jeda
+        self.gagal_berturut = 0
+        self.dibuka_pada = None
+        self.percobaan_berjalan = False
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._status()
+
+    def _status(self):
+        if self.dibuka_pada is None:
+            return "closed"
+        if time.monotonic() - self.dibuka_pada >= self.jeda:
+            return "half-open"
+        return "open"
+
+    def terbuka(self):
+        """True jika panggilan saat ini harus langsung memakai fallback"""
+        with self._lock:
+            status = self._status()
+            return status == "open" or (status == "half-open" and self.percobaan_berjalan)
+
+    def izinkan(self):
+        """Ambil izin memanggil Gemini; pada half-open hanya satu panggilan percobaan"""
+        with self._lock:
+            status = self._status()
+            if status == "closed":
+                return True
+            if status == "half-open" and not self.percobaan_berjalan:
+                self.percobaan_berjalan = True
+                return True
+            return False
+
+    def sukses(self):
+        with self._lock:
+            self.gagal_berturut = 0
+            self.dibuka_pada = None
+            self.percobaan_berjalan = False
+
+    def batal(self):
+        """Izin dikembalikan tanpa memanggil Gemini (misalnya antrian penuh)"""
+        with self._lock:
+            self.percobaan_berjalan = False
+
+    def gagal(self):
+        with self._lock:
+            self.gagal_berturut += 1
+            if self.percobaan_berjalan or self.gagal_berturut >= self.ambang:
+                if self.dibuka_pada is None or self.percobaan_berjalan:
+                    logging.warning(f"Circuit breaker Gemini terbuka setelah {self.gagal_berturut} kegagalan")
+                self.dibuka_pada = time.monotonic()
+            self.percobaan_berjalan = False
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker():
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    ambang=current_app.config.get("GEMINI_BREAKER_THRESHOLD", 5),
+                    jeda=current_app.config.get("GEMINI_BREAKER_COOLDOWN", 60),
                 )
+    return _breaker
+
+
+def gemini_tersedia():
+    """False jika breaker sedang terbuka: pemanggil sebaiknya langsung memakai fallback"""
+    return not get_breaker().terbuka()
+
+
+# ==========================================================
+# ✅ METRIK LATENSI & KEGAGALAN (per proses)
+# ==========================================================
+class GeminiMetrics:
+    def __init__(self, sampel=500):
+        self._lock = threading.Lock()
+        self.latensi = deque(maxlen=sampel)
+        self.hitungan = {"panggilan": 0, "sukses": 0, "gagal": 0, "timeout": 0, "ditolak": 0}
+
+    def catat(self, hasil, detik=None):
+        with self._lock:
+            self.hitungan[hasil] += 1
+            if hasil != "ditolak":
+                self.hitungan["panggilan"] += 1
+            if detik is not None:
+                self.latensi.append(detik)
+
+    def snapshot(self):
+        with self._lock:
+            data = sorted(self.latensi)
+            hitungan = dict(self.hitungan)
+
+        def persentil(p):
+            return round(data[min(len(data) - 1, int(p * len(data)))] * 1000, 1) if data else None
+
+        return {
+            **hitungan,
+            "latensi_ms": {"p50": persentil(0.5), "p95": persentil(0.95), "p99": persentil(0.99),
+                           "sampel": len(data)},
+        }
+
+
+metrics = GeminiMetrics()
+
+
+def gemini_metrics():
+    """Ringkasan metrik Gemini proses ini beserta status breaker"""
+    return {**metrics.snapshot(), "breaker": get_breaker().status}
+
+
+def _timeout(e):
+    teks = f"{type(e).__name__} {e}".lower()
+    return "timeout" in teks or "timed out" in teks or "deadline" in teks
+
+
+# ==========================================================
+# ✅ PANGGILAN GEMINI
+# ==========================================================
+def _config_generate(schema=None):
+    """Model + config; dengan `schema` Gemini diminta mengembalikan JSON sesuai skema (structured output)"""
+    extra = {"response_mime_type": "application/json", "response_schema": schema} if schema else {}
+    return dict(
+        model=current_app.config.get("GEMINI_MODEL", "gemini-2.5-flash"),
+        config=types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=current_app.config.get("GEMINI_THINKING_BUDGET", 0)
             ),
-        )
-        return resp.text.strip() if resp and resp.text else "Tidak ada hasil dari Gemini."
+            **extra,
+        ),
+    )
+
+
+def _ambil_slot():
+    """Cek API key, circuit breaker, lalu ambil slot semaphore. Mengembalikan (client, breaker, semaphore)."""
+    api_key = current_app.config.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key and butuh_api_key():
+        raise GeminiError("API Key Gemini belum diset di environment.")
+
+    breaker = get_breaker()
+    if not breaker.izinkan():
+        metrics.catat("ditolak")
+        raise GeminiUnavailable("Layanan Gemini sedang tidak tersedia, coba lagi nanti.")
+
+    # tunggu slot paling lama selama deadline panggilan itu sendiri
+    semaphore = get_semaphore()
+    if not semaphore.acquire(timeout=current_app.config.get("GEMINI_TIMEOUT", 30)):
+        breaker.batal()
+        metrics.catat("ditolak")
+        raise GeminiUnavailable("Antrian analisis Gemini penuh, coba lagi nanti.")
+    return get_client(api_key), breaker, semaphore
+
+
+def _catat_gagal(breaker, e, mulai):
+    breaker.gagal()
+    metrics.catat("timeout" if _timeout(e) else "gagal", time.perf_counter() - mulai)
+    logging.error(f"Gemini API error: {e}")
+    return GeminiError(f"Gagal menganalisis dengan Gemini: {e}")
+
+
+def generate_with_gemini(prompt: str, schema=None) -> str:
+    """Kirim prompt ke Gemini API dan ambil hasil teksnya (JSON jika `schema` diberikan); gagal -> GeminiError."""
+    client, breaker, semaphore = _ambil_slot()
+    mulai = time.perf_counter()
+    try:
+        resp = client.models.generate_content(contents=prompt, **_config_generate(schema))
+    except Exception as e:
+        raise _catat_gagal(breaker, e, mulai) from e
+    finally:
+        semaphore.release()
+
+    breaker.sukses()
+    metrics.catat("sukses", time.perf_counter() - mulai)
+
+    if not resp or not resp.text:
+        raise GeminiError("Tidak ada hasil dari Gemini.")
+    return resp.text.strip()
+
+
+def stream_with_gemini(prompt: str):
+    """
+    Generator potongan teks dari streaming API Gemini; gagal -> GeminiError.
+    Slot semaphore dipegang sampai stream selesai (atau generator ditutup klien).
+    """
+    client, breaker, semaphore = _ambil_slot()
+    mulai, ada_teks = time.perf_counter(), False
+    try:
+        for chunk in client.models.generate_content_stream(contents=prompt, **_config_generate()):
+            if chunk.text:
+                ada_teks = True
+                yield chunk.text
+    except GeneratorExit:
+        breaker.batal()
+        raise
     except Exception as e:
-        logging.error(f"Gemini API error: {e}")
-        return f"Gagal menganalisis dengan Gemini: {e}"
\ No newline at end of file
+        raise _catat_gagal(breaker, e, mulai) from e
+    finally:
+        semaphore.release()
+
+    breaker.sukses()
+    metrics.catat("sukses", time.perf_counter() - mulai)
+    if not ada_teks:
+        raise GeminiError("Tidak ada hasil dari Gemini.")
@@ -0,0 +1,120 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app, url_for
+
+from .extensions import db
+from .models import AnalisisJob
+from .ai_integration import generate_with_gemini, gemini_tersedia, nama_model
+from .ai_cache import kunci_analisis, cari_analisis, simpan_analisis
+from .ai_parser import skema_untuk
+
+# ==========================================================
+# ✅ JOB ANALISIS AI DI BACKGROUND
+# ==========================================================
+# Request hanya membuat baris analisis_job lalu langsung kembali; panggilan Gemini
+# berjalan di thread pool proses ini. Status disimpan di database sehingga bisa
+# dibaca dari worker gunicorn mana pun.
+_executor = None
+_executor_lock = threading.Lock()
+
+# job pending/running yang lebih tua dari ini dianggap macet dan tidak dipakai ulang
+JOB_AKTIF_MAKS = timedelta(minutes=10)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("AI_JOB_WORKERS", 4),
+                    thread_name_prefix="ai-job",
+                )
+    return _executor
+
+
+def submit_analisis(prompt, id_anak=None, id_pengukuran=None, parser=None,
+                    kunci=None, jenis=None, pengukuran_updated_at=None):
+    """Daftarkan job analisis Gemini dan jalankan di background. Mengembalikan AnalisisJob."""
+    job = AnalisisJob(id_job=uuid.uuid4().hex, id_anak=id_anak, id_pengukuran=id_pengukuran,
+                      kunci=kunci, jenis=jenis)
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    get_executor().submit(jalankan_job, app, job.id_job, prompt, parser, pengukuran_updated_at)
+    return job
+
+
+def jalankan_job(app, id_job, prompt, parser=None, pengukuran_updated_at=None):
+    """Dijalankan di thread pool: panggil Gemini, parse, lalu simpan hasilnya"""
+    with app.app_context():
+        try:
+            job = db.session.get(AnalisisJob, id_job)
+            job.status = "running"
+            db.session.commit()
+
+            raw = generate_with_gemini(prompt, schema=skema_untuk(job.jenis))
+            job.hasil_raw = raw
+            job.hasil = parser(raw) if parser else None
+            job.status = "done"
+            db.session.commit()
+
+            if job.kunci:
+                simpan_analisis(job.kunci, job.id_pengukuran, job.jenis,
+                                nama_model(),
+                                job.hasil_raw, job.hasil, pengukuran_updated_at)
+        except Exception as e:
+            logging.error(f"AI job {id_job} gagal: {e}")
+            db.session.rollback()
+            job = db.session.get(AnalisisJob, id_job)
+            if job:
+                job.status = "error"
+                job.error = str(e)
+                db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def minta_analisis(prompt, jenis, anak, peng, hasil, umur_bulan, parser=None):
+    """
+    Ambil analisis AI dari cache analisis_ai; jika belum ada (atau pengukuran sudah berubah),
+    pakai job yang sedang berjalan untuk input yang sama atau buat job baru.
+    Mengembalikan (AnalisisAI | None, info job | None); keduanya None jika Gemini sedang
+    tidak tersedia (circuit breaker terbuka) sehingga pemanggil langsung memakai hasil rule-based.
+    """
+    model = nama_model()
+    kunci = kunci_analisis(peng, jenis, model, hasil, umur_bulan)
+
+    cached = cari_analisis(kunci, peng)
+    if cached:
+        return cached, None
+    if not gemini_tersedia():
+        return None, None
+
+    job = (
+        AnalisisJob.query
+        .filter(AnalisisJob.kunci == kunci,
+                AnalisisJob.status.in_(["pending", "running"]),
+                AnalisisJob.created_at >= datetime.utcnow() - JOB_AKTIF_MAKS)
+        .order_by(AnalisisJob.created_at.desc())
+        .first()
+    )
+    if not job:
+        job = submit_analisis(prompt, id_anak=anak.id_anak, id_pengukuran=peng.id_pengukuran,
+                              parser=parser, kunci=kunci, jenis=jenis,
+                              pengukuran_updated_at=peng.updated_at)
+    return None, job_info(job)
+
+
+def job_info(job):
+    """Ringkasan job untuk disertakan di response endpoint"""
+    return {
+        "id_job": job.id_job,
+        "status": job.status,
+        "status_url": url_for("iot.api_ai_job_status", id_job=job.id_job),
+    }
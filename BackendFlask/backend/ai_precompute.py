@@ -0,0 +1,150 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app
+
+from .extensions import db
+from .models import Anak, Pengukuran
+from .ai_cache import kunci_analisis, cari_analisis, simpan_analisis
+from .ai_integration import generate_with_gemini, gemini_tersedia, nama_model, GeminiError, GeminiUnavailable
+from .ai_prompts import siapkan_prompt
+from .analysis.scoring import skor_tertunda
+from .shared.umur import umur_bulan_pengukuran
+from .ai_parser import parse_gemini_response, skema_untuk
+
+# ==========================================================
+# ✅ PRE-GENERATE ANALISIS AI (flask ai-precompute)
+# ==========================================================
+# Dijalankan terjadwal (mis. cron malam hari) supaya halaman orang tua di siang hari
+# cukup membaca tabel analisis_ai tanpa memanggil Gemini.
+
+
+class RateLimiter:
+    """Token bucket: paling banyak `rpm` permintaan per menit, dibagi ke semua thread"""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm and rpm > 0 else 0
+        self.berikutnya = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tunggu(self):
+        if not self.interval:
+            return
+        with self._lock:
+            sekarang = time.monotonic()
+            jadwal = max(self.berikutnya, sekarang)
+            self.berikutnya = jadwal + self.interval
+        if jadwal > sekarang:
+            time.sleep(jadwal - sekarang)
+
+
+def pengukuran_terbaru():
+    """
+    Pengukuran terbaru setiap anak (urutan sama dengan halaman detail:
+    created_at lalu id_pengukuran), diambil dengan satu query window function.
+    """
+    urutan = db.func.row_number().over(
+        partition_by=Pengukuran.id_anak,
+        order_by=(Pengukuran.created_at.desc(), Pengukuran.id_pengukuran.desc()),
+    ).label("urutan")
+    sub = db.select(Pengukuran.id_pengukuran, urutan).subquery()
+    query = (
+        db.select(Pengukuran, Anak)
+        .join(sub, sub.c.id_pengukuran == Pengukuran.id_pengukuran)
+        .join(Anak, Anak.id_anak == Pengukuran.id_anak)
+        .where(sub.c.urutan == 1)
+        .order_by(Pengukuran.id_pengukuran)
+    )
+    return db.session.execute(query).all()
+
+
+def cari_target(daftar_jenis, batas=None):
+    """Daftar analisis yang belum ada atau sudah usang (pengukuran/umur/z-score berubah)"""
+    model = nama_model()
+    target, total = [], 0
+    for peng, anak in pengukuran_terbaru():
+        if skor_tertunda(anak, peng):
+            continue  # z-score belum tersimpan: prompt tanpa z-score tidak di-cache
+        umur_bulan = umur_bulan_pengukuran(anak, peng)
+        for jenis in daftar_jenis:
+            total += 1
+            hasil, imt, prompt = siapkan_prompt(jenis, anak, peng, umur_bulan)
+            kunci = kunci_analisis(peng, jenis, model, hasil, umur_bulan)
+            if cari_analisis(kunci, peng):
+                continue
+            target.append({
+                "kunci": kunci,
+                "jenis": jenis,
+                "id_pengukuran": peng.id_pengukuran,
+                "pengukuran_updated_at": peng.updated_at,
+                "prompt": prompt,
+                "parser": None if jenis == "detail" else parse_gemini_response,
+            })
+            if batas and len(target) >= batas:
+                return target, total
+    return target, total
+
+
+def generate_dengan_retry(prompt, limiter, retries=3, backoff=2.0, schema=None):
+    """
+    Panggil Gemini (menunggu jatah rate limit) dengan exponential backoff + jitter.
+    Berhenti lebih awal jika circuit breaker terbuka: menunggu backoff tidak ada gunanya.
+    """
+    for percobaan in range(retries + 1):
+        limiter.tunggu()
+        try:
+            return generate_with_gemini(prompt, schema=schema)
+        except GeminiUnavailable:
+            raise
+        except GeminiError:
+            if percobaan == retries or not gemini_tersedia():
+                raise
+            time.sleep(backoff * (2 ** percobaan) * (0.5 + random.random()))
+
+
+def proses_target(app, item, limiter, retries, backoff):
+    """Dijalankan di thread pool: generate lalu simpan ke analisis_ai"""
+    with app.app_context():
+        try:
+            raw = generate_dengan_retry(item["prompt"], limiter, retries, backoff,
+                                        schema=skema_untuk(item["jenis"]))
+            hasil = item["parser"](raw) if item["parser"] else None
+            simpan_analisis(item["kunci"], item["id_pengukuran"], item["jenis"],
+                            nama_model(),
+                            raw, hasil, item["pengukuran_updated_at"])
+        finally:
+            db.session.remove()
+
+
+def precompute_semua(daftar_jenis, workers=4, rpm=60, retries=3, backoff=2.0, batas=None, progress=None):
+    """Generate semua analisis yang belum ada/usang; mengembalikan ringkasan jumlah & throughput"""
+    mulai = time.perf_counter()
+    target, total = cari_target(daftar_jenis, batas)
+    db.session.rollback()  # lepas transaksi baca sebelum pekerjaan panjang
+
+    app = current_app._get_current_object()
+    limiter = RateLimiter(rpm)
+    sukses, gagal = 0, 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-precompute") as pool:
+        futures = {pool.submit(proses_target, app, item, limiter, retries, backoff): item for item in target}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                sukses += 1
+            except Exception as e:
+                gagal += 1
+                item = futures[future]
+                logging.error(f"Precompute analisis {item['jenis']} pengukuran {item['id_pengukuran']} gagal: {e}")
+            if progress:
+                progress(sukses + gagal, len(target), gagal, time.perf_counter() - mulai)
+
+    return {
+        "diperiksa": total,
+        "target": len(target),
+        "sukses": sukses,
+        "gagal": gagal,
+        "detik": round(time.perf_counter() - mulai, 2),
+    }
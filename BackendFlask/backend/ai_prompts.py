@@ -0,0 +1,125 @@
+# ==========================================================
+# ✅ PROMPT ANALISIS GEMINI (dipakai route dan flask ai-precompute)
+# ==========================================================
+# Setiap varian ("detail", "ringkas", "terstruktur") punya prompt sendiri; z-score dibaca dari pengukuran.
+# Route dan job precompute harus membangun input yang sama persis supaya kunci cache
+# analisis_ai cocok.
+
+
+def hitung_imt(peng):
+    return peng.berat_badan / ((peng.tinggi_badan / 100) ** 2) if peng.tinggi_badan and peng.berat_badan else None
+
+
+def hasil_tersimpan(peng):
+    """Z-score & kategori yang sudah tersimpan di tabel pengukuran"""
+    return {
+        "BB/U": {"z_score": peng.z_bb, "kategori": peng.kategori_bb},
+        "TB/U": {"z_score": peng.z_tb, "kategori": peng.kategori_tb},
+        "LK/U": {"z_score": peng.z_lk, "kategori": peng.kategori_lk},
+        "LILA/U": {"z_score": peng.z_lila, "kategori": peng.kategori_lila},
+        "IMT/U": {"z_score": peng.z_imt, "kategori": peng.kategori_imt},
+    }
+
+
+def prompt_detail(anak, peng, hasil, umur_bulan, imt):
+    return f"""
+    Kamu adalah asisten ahli gizi anak.
+    Berdasarkan hasil analisis rule-based berikut, berikan interpretasi tambahan tentang perkembangan anak ini,
+    apakah perkembangannya baik, area mana yang perlu perhatian, dan saran pemantauan yang sesuai, singkat saja, buat dalam bentuk paragraf
+
+    Data Anak:
+    - Nama: {anak.nama}
+    - Jenis Kelamin: {anak.jenis_kelamin}
+    - Umur saat pengukuran: {umur_bulan} bulan
+    - Berat Badan: {peng.berat_badan or '-'} kg
+    - Tinggi Badan: {peng.tinggi_badan or '-'} cm
+    - IMT: {round(imt, 2) if imt else '-'}
+    - Lingkar Kepala: {peng.lingkar_kepala or '-'} cm
+    - Lingkar Lengan: {peng.lingkar_lengan or '-'} cm
+
+    Hasil Rule-based:
+    - BB/U: {hasil.get('BB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', '-')})
+    - TB/U: {hasil.get('TB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', '-')})
+    - IMT/U: {hasil.get('IMT/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', '-')})
+    - LK/U: {hasil.get('LK/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', '-')})
+    - LILA/U: {hasil.get('LILA/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', '-')})
+
+    Jawab dalam bahasa Indonesia secara singkat, dengan nada ramah dan mudah dipahami orang tua.
+    """
+
+
+def prompt_ringkas(anak, peng, hasil, umur_bulan, imt):
+    return f"""
+    Kamu adalah asisten ahli gizi anak.
+    Berdasarkan hasil analisis rule-based berikut, berikan interpretasi tambahan singkat tentang perkembangan anak ini.
+
+    Data Anak:
+    - Nama: {anak.nama}
+    - Jenis Kelamin: {anak.jenis_kelamin}
+    - Umur saat pengukuran: {umur_bulan} bulan
+    - Berat Badan: {peng.berat_badan or '-'} kg
+    - Tinggi Badan: {peng.tinggi_badan or '-'} cm
+    - IMT: {round(imt, 2) if imt else '-'}
+    - Lingkar Kepala: {peng.lingkar_kepala or '-'} cm
+    - Lingkar Lengan: {peng.lingkar_lengan or '-'} cm
+
+    Hasil Rule-based:
+    - BB/U: {hasil.get('BB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', '-')})
+    - TB/U: {hasil.get('TB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', '-')})
+    - IMT/U: {hasil.get('IMT/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', '-')})
+    - LK/U: {hasil.get('LK/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', '-')})
+    - LILA/U: {hasil.get('LILA/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', '-')})
+
+    Jawab singkat dalam bahasa Indonesia dengan nada ramah dan mudah dipahami.
+    """
+
+
+def prompt_terstruktur(anak, peng, hasil, umur_bulan, imt):
+    return f"""
+    ANALISIS PERTUMBUHAN ANAK
+
+    DATA DASAR:
+    - Nama: {anak.nama}
+    - Usia saat pengukuran: {umur_bulan} bulan
+    - Jenis Kelamin: {anak.jenis_kelamin}
+
+    DATA PENGUKURAN:
+    - Berat Badan: {peng.berat_badan or 'Tidak ada'} kg
+    - Tinggi Badan: {peng.tinggi_badan or 'Tidak ada'} cm
+    - IMT: {round(imt, 2) if imt else 'Tidak dapat dihitung'}
+    - Lingkar Kepala: {peng.lingkar_kepala or 'Tidak ada'} cm
+    - Lingkar Lengan: {peng.lingkar_lengan or 'Tidak ada'} cm
+
+    HASIL ANALISIS STANDAR:
+    - BB/U: {hasil.get('BB/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', 'N/A')})
+    - TB/U: {hasil.get('TB/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', 'N/A')})
+    - IMT/U: {hasil.get('IMT/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', 'N/A')})
+    - LK/U: {hasil.get('LK/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', 'N/A')})
+    - LILA/U: {hasil.get('LILA/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', 'N/A')})
+
+    BERIKAN ANALISIS DALAM FORMAT YANG JELAS DAN TERSTRUKTUR:
+    1. Status perkembangan keseluruhan
+    2. Area yang memerlukan perhatian khusus
+    3. Rekomendasi tindakan
+    4. Saran pemantauan
+
+    Gunakan bahasa Indonesia yang mudah dipahami orang tua.
+    """
+
+
+# jenis -> pembuat prompt
+JENIS_ANALISIS = {
+    "detail": prompt_detail,
+    "ringkas": prompt_ringkas,
+    "terstruktur": prompt_terstruktur,
+}
+
+
+def siapkan_prompt(jenis, anak, peng, umur_bulan):
+    """
+    Mengembalikan (hasil, imt, prompt) untuk satu varian analisis.
+    Semua varian memakai z-score tersimpan (dihitung saat pengukuran ditulis, analysis/scoring.py).
+    """
+    hasil = hasil_tersimpan(peng)
+    imt = hitung_imt(peng)
+    return hasil, imt, JENIS_ANALISIS[jenis](anak, peng, hasil, umur_bulan, imt)
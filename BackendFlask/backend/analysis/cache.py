@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .lms import on_reload
+
+# ==========================================================
+# ✅ CACHE LRU HASIL assess_child_growth
+# ==========================================================
+ASSESS_CACHE_SIZE = int(os.getenv("ASSESS_CACHE_SIZE", "4096"))
+
+
+class LRUCache:
+    """Cache LRU berukuran tetap yang aman dipakai bersama antar thread, dengan penghitung hit/miss"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def info(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self.data),
+                "maxsize": self.maxsize,
+            }
+
+
+assess_cache = LRUCache(ASSESS_CACHE_SIZE)
+on_reload(assess_cache.clear)
+
+
+def kuantisasi(nilai, digit=2):
+    """Bulatkan nilai pengukuran agar variasi float kecil tetap memakai entri cache yang sama"""
+    return None if nilai is None else round(float(nilai), digit)
+
+
+def cache_info():
+    """Statistik cache assess_child_growth untuk proses ini"""
+    return assess_cache.info()
@@ -0,0 +1,52 @@
+import os
+import click
+from flask.cli import AppGroup
+from .lms import compile_artifact, status_artifact, reload_engine, LMS_DIR, ARTIFACT_FILE
+
+lms_cli = AppGroup("lms", help="Kelola tabel referensi LMS WHO.")
+
+
+@lms_cli.command("compile")
+def lms_compile():
+    """Kompilasi file Excel LMS menjadi artefak biner (.npy + manifest)."""
+    manifest = compile_artifact()
+    reload_engine()
+    click.echo(f"✅ Artefak LMS versi {manifest['version']} ditulis ke {LMS_DIR}/{ARTIFACT_FILE}")
+
+
+@lms_cli.command("status")
+def lms_status():
+    """Verifikasi penuh (sha256) artefak biner terhadap file Excel sumber."""
+    ok, pesan = status_artifact()
+    click.echo(("✅ " if ok else "⚠️  ") + pesan)
+    if not ok:
+        raise SystemExit(1)
+
+
+@click.command("rescore")
+@click.option("--chunk-size", default=5000, show_default=True, help="Jumlah baris per chunk/transaksi.")
+@click.option("--workers", default=1, show_default=True, help="Jumlah proses untuk scoring.")
+@click.option("--since", type=click.DateTime(), default=None,
+              help="Hanya pengukuran dengan updated_at >= tanggal ini.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False), default=None,
+              help="File progres (default: instance/rescore.checkpoint).")
+@click.option("--restart", is_flag=True, help="Abaikan checkpoint dan mulai dari awal.")
+def rescore(chunk_size, workers, since, checkpoint, restart):
+    """Hitung ulang z-score & kategori semua Pengukuran secara massal."""
+    from flask import current_app
+    from .rescore import rescore_semua
+
+    if checkpoint is None:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        checkpoint = os.path.join(current_app.instance_path, "rescore.checkpoint")
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    def progress(last_id, baris, dinilai, detik):
+        click.echo(f"  id ≤ {last_id}: {baris} baris dibaca, {dinilai} dinilai "
+                   f"({baris / detik if detik else 0:.0f} baris/detik)")
+
+    hasil = rescore_semua(chunk_size=chunk_size, workers=workers, since=since,
+                          checkpoint=checkpoint, progress=progress)
+    click.echo(f"✅ Rescore selesai: {hasil['dinilai']} dari {hasil['baris']} pengukuran "
+               f"dinilai dalam {hasil['detik']} detik")
@@ -0,0 +1,340 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+
+# ==========================================================
+# ✅ MESIN REFERENSI LMS WHO (dimuat sekali per proses)
+# ==========================================================
+LMS_DIR = os.path.join(os.path.dirname(__file__), 'LMS')
+ARTIFACT_FILE = 'lms_tables.npy'
+MANIFEST_FILE = 'lms_tables.json'
+KOLOM_LMS = ("Month", "L", "M", "S")
+
+# Grid umur harian: 0..1856 hari (batas tabel harian WHO), 1 bulan = 30.4375 hari
+HARI_PER_BULAN = 30.4375
+HARI_MAKS = 1856
+
+NAMA_FILE = {
+    ('bb', 'Laki-Laki'): 'Standar Percintiles WHO Berat Badan_Balita_0-5 Tahun_Laki-Laki.xlsx',
+    ('bb', 'Perempuan'): 'Standar Percintiles WHO Berat Badan_Balita_0-5 Tahun_Perempuan.xlsx',
+    ('tb', 'Laki-Laki'): 'Standar Percintiles WHO Tinggi Badan_Balita_0-5 Tahun_Laki-Laki.xlsx',
+    ('tb', 'Perempuan'): 'Standar Percintiles WHO Tinggi Badan_Balita_0-5 Tahun_Perempuan.xlsx',
+    ('lk', 'Laki-Laki'): 'Standar Percintiles WHO Lingkar Kepala_Balita_0-5 Tahun_Laki-Laki.xlsx',
+    ('lk', 'Perempuan'): 'Standar Percintiles WHO Lingkar Kepala_Balita_0-5 Tahun_Perempuan.xlsx',
+    ('lila', 'Laki-Laki'): 'Standar Percintiles WHO Lingkar Lengan_Balita_0-5 Tahun_Laki-Laki.xlsx',
+    ('lila', 'Perempuan'): 'Standar Percintiles WHO Lingkar Lengan_Balita_0-5 Tahun_Perempuan.xlsx',
+    ('imt', 'Laki-Laki'): 'Standar Percintiles WHO IMT_Balita_0-5 Tahun_Laki-Laki.xlsx',
+    ('imt', 'Perempuan'): 'Standar Percintiles WHO IMT_Balita_0-5 Tahun_Perempuan.xlsx'
+}
+
+
+SEX_LAKI = ["L", "l", "Laki-Laki", "Laki-laki"]
+
+
+def normalisasi_sex(sex):
+    """Samakan penulisan jenis kelamin dengan kunci tabel WHO"""
+    return "Laki-Laki" if sex in SEX_LAKI else "Perempuan"
+
+
+def baca_tabel_excel(file_path):
+    """Baca satu file LMS (.xlsx) menjadi array Month, L, M, S yang terurut"""
+    import pandas as pd  # hanya dibutuhkan saat membaca sumber Excel
+
+    df = pd.read_excel(file_path, usecols=list(KOLOM_LMS))
+    df = df.sort_values(by="Month")
+    return {kolom: df[kolom].to_numpy(dtype=np.float64) for kolom in KOLOM_LMS}
+
+
+def sha256_file(file_path):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for blok in iter(lambda: f.read(1 << 16), b""):
+            h.update(blok)
+    return h.hexdigest()
+
+
+def hash_sumber(base_dir=LMS_DIR):
+    """Checksum setiap file Excel sumber; dipakai untuk versi tabel dan deteksi artefak basi"""
+    hasil = {}
+    for nama in sorted(NAMA_FILE.values()):
+        file_path = os.path.join(base_dir, nama)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File LMS tidak ditemukan: {file_path}")
+        hasil[nama] = sha256_file(file_path)
+    return hasil
+
+
+def stat_file(file_path):
+    """[ukuran, mtime_ns]: cek cepat saat startup, tanpa membaca isi file"""
+    st = os.stat(file_path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def stat_sumber(base_dir=LMS_DIR):
+    return {nama: stat_file(os.path.join(base_dir, nama)) for nama in sorted(NAMA_FILE.values())}
+
+
+def versi_tabel(sources):
+    """Versi gabungan tabel LMS (berubah jika salah satu file Excel berubah)"""
+    gabungan = "".join(f"{nama}:{sha}\n" for nama, sha in sorted(sources.items()))
+    return hashlib.sha256(gabungan.encode()).hexdigest()[:16]
+
+
+class ArtefakBasi(Exception):
+    """Artefak biner tidak ada, rusak, atau tidak sesuai lagi dengan file Excel"""
+
+
+class LMSEngine:
+    """
+    Menyimpan seluruh tabel LMS WHO sebagai array NumPy, dikunci dengan (jenis, sex).
+    Setiap tabel juga diekspansi menjadi grid harian L/M/S sehingga lookup umur
+    cukup dengan indeks array (O(1)) tanpa I/O maupun pencarian saat scoring.
+    Grid dihitung per proses (~450 KB untuk sepuluh tabel); hanya tabel mentah dari
+    artefak yang di-memory-map.
+    """
+
+    def __init__(self, tables, version=None, source="excel"):
+        self.tables = tables
+        self.version = version
+        self.source = source
+        self.grids = {key: self.buat_grid(t) for key, t in tables.items()}
+        self._kurva = {}
+
+    @staticmethod
+    def buat_grid(t):
+        """
+        Hitung L, M, S untuk setiap hari 0..HARI_MAKS dari tabel bulanan.
+        Simpul di luar rentang tabel memakai nilai tepi; validitas umur dicek terpisah
+        lewat batas hari_min / hari_maks.
+        """
+        month = np.asarray(t["Month"])
+        bulan = np.arange(HARI_MAKS + 1) / HARI_PER_BULAN
+        grid = {kolom: np.interp(bulan, month, np.asarray(t[kolom])) for kolom in ("L", "M", "S")}
+        grid["hari_min"] = month[0] * HARI_PER_BULAN
+        grid["hari_maks"] = min(month[-1] * HARI_PER_BULAN, HARI_MAKS)
+        return grid
+
+    @classmethod
+    def from_excel(cls, base_dir=LMS_DIR):
+        sources = hash_sumber(base_dir)
+        tables = {}
+        for key, nama in NAMA_FILE.items():
+            tables[key] = baca_tabel_excel(os.path.join(base_dir, nama))
+        return cls(tables, version=versi_tabel(sources), source="excel")
+
+    @classmethod
+    def from_artifact(cls, base_dir=LMS_DIR, verifikasi=False):
+        """
+        Muat artefak biner hasil `flask lms compile` dengan memory-map (tanpa pandas/openpyxl).
+        Tabel mentah berbagi page yang sama di semua worker gunicorn.
+        Startup hanya membandingkan ukuran + mtime file dengan manifest; sha256 dihitung
+        jika stat berbeda (mis. setelah checkout) atau `verifikasi=True` (`flask lms status`).
+        """
+        manifest_path = os.path.join(base_dir, MANIFEST_FILE)
+        artifact_path = os.path.join(base_dir, ARTIFACT_FILE)
+        if not os.path.exists(manifest_path) or not os.path.exists(artifact_path):
+            raise ArtefakBasi("Artefak LMS belum dikompilasi")
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        stat = manifest.get("stat") or {}
+        stat_cocok = (
+            not verifikasi
+            and stat.get("sources") == stat_sumber(base_dir)
+            and stat.get("artifact") == stat_file(artifact_path)
+        )
+        if not stat_cocok:
+            if manifest.get("sources") != hash_sumber(base_dir):
+                raise ArtefakBasi("Artefak LMS basi: file Excel sumber sudah berubah")
+            if manifest.get("checksum") != sha256_file(artifact_path):
+                raise ArtefakBasi("Checksum artefak LMS tidak cocok")
+
+        data = np.load(artifact_path, mmap_mode="r")
+        tables = {}
+        for nama_key, info in manifest["tables"].items():
+            jenis, sex = nama_key.split("|")
+            start, length = info["offset"], info["length"]
+            tables[(jenis, sex)] = {
+                kolom: data[i, start:start + length] for i, kolom in enumerate(KOLOM_LMS)
+            }
+        return cls(tables, version=manifest["version"], source="artifact")
+
+    def table(self, jenis, sex):
+        try:
+            return self.tables[(jenis, normalisasi_sex(sex))]
+        except KeyError:
+            raise ValueError(f"Tabel LMS tidak dikenal: {jenis} / {sex}")
+
+    def grid(self, jenis, sex):
+        try:
+            return self.grids[(jenis, normalisasi_sex(sex))]
+        except KeyError:
+            raise ValueError(f"Tabel LMS tidak dikenal: {jenis} / {sex}")
+
+    def lms_hari(self, jenis, sex, hari):
+        """
+        L, M, S untuk umur dalam hari (boleh pecahan atau array) dengan indeks langsung
+        ke grid harian: tanpa pencarian, hanya interpolasi antara dua hari yang bertetangga.
+        Umur di luar batas tabel menghasilkan NaN.
+        """
+        g = self.grid(jenis, sex)
+        hari = np.asarray(hari, dtype=np.float64)
+        valid = (hari >= g["hari_min"] - 1e-9) & (hari <= g["hari_maks"] + 1e-9)
+
+        posisi = np.clip(np.where(valid, hari, 0.0), 0, HARI_MAKS)
+        idx = np.minimum(posisi.astype(np.intp), HARI_MAKS - 1)
+        frac = posisi - idx
+
+        hasil = []
+        for kolom in ("L", "M", "S"):
+            v = g[kolom]
+            nilai = v[idx] + frac * (v[idx + 1] - v[idx])
+            hasil.append(np.where(valid, nilai, np.nan))
+        return tuple(hasil)
+
+    def lms(self, jenis, sex, umur):
+        """L, M, S untuk umur dalam bulan (boleh pecahan atau array)"""
+        return self.lms_hari(jenis, sex, np.asarray(umur, dtype=np.float64) * HARI_PER_BULAN)
+
+    def zscore(self, jenis, sex, umur, nilai, satuan="bulan"):
+        """
+        Z-score LMS: ((X/M)^L - 1) / (L*S). NaN jika umur di luar batas WHO.
+        satuan: "bulan" (default) atau "hari" untuk argumen umur.
+        """
+        if satuan == "hari":
+            L, M, S = self.lms_hari(jenis, sex, umur)
+        else:
+            L, M, S = self.lms(jenis, sex, umur)
+        nilai = np.asarray(nilai, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            return ((nilai / M) ** L - 1) / (L * S)
+
+    def nilai_dari_zscore(self, jenis, sex, umur, z, satuan="bulan"):
+        """Kebalikan LMS: X = M * (1 + L*S*z)^(1/L), atau M * exp(S*z) jika L = 0"""
+        if satuan == "hari":
+            L, M, S = self.lms_hari(jenis, sex, umur)
+        else:
+            L, M, S = self.lms(jenis, sex, umur)
+        z = np.asarray(z, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            return np.where(L == 0, M * np.exp(S * z), M * (1 + L * S * z) ** (1 / np.where(L == 0, 1, L)))
+
+    def kurva_referensi(self, jenis, sex):
+        """
+        Kurva -3..+3 SD pada setiap bulan tabel WHO, dihitung sekali lalu disimpan.
+        Cache melekat pada instance engine, jadi ikut hilang saat tabel dimuat ulang.
+        """
+        key = (jenis, normalisasi_sex(sex))
+        if key not in self._kurva:
+            bulan = np.asarray(self.table(jenis, sex)["Month"])
+            self._kurva[key] = {
+                "indikator": jenis,
+                "jenis_kelamin": key[1],
+                "versi": self.version,
+                "bulan": [int(b) if float(b).is_integer() else float(b) for b in bulan],
+                "kurva": {
+                    f"{z:+d}" if z else "0": [
+                        round(float(x), 3) for x in self.nilai_dari_zscore(jenis, sex, bulan, z)
+                    ]
+                    for z in range(-3, 4)
+                },
+            }
+        return self._kurva[key]
+
+    def zscore_batch(self, jenis, sex, umur, nilai, satuan="bulan"):
+        """
+        Versi vektor dari zscore: sex, umur dan nilai berupa array sepanjang N.
+        Baris laki-laki dan perempuan dihitung terpisah dengan tabelnya masing-masing.
+        """
+        laki = np.isin(np.asarray(sex, dtype=object), SEX_LAKI)
+        umur = np.asarray(umur, dtype=np.float64)
+        nilai = np.asarray(nilai, dtype=np.float64)
+
+        z = np.full(laki.shape, np.nan)
+        for mask, key in ((laki, "Laki-Laki"), (~laki, "Perempuan")):
+            if mask.any():
+                z[mask] = self.zscore(jenis, key, umur[mask], nilai[mask], satuan)
+        return z
+
+
+def compile_artifact(base_dir=LMS_DIR):
+    """
+    Kompilasi sepuluh file Excel LMS menjadi satu array .npy (4 x total baris)
+    ditambah manifest JSON berisi offset tabel, checksum artefak dan checksum sumber.
+    """
+    sources = hash_sumber(base_dir)
+    bagian, tables_info, offset = [], {}, 0
+    for (jenis, sex), nama in sorted(NAMA_FILE.items()):
+        t = baca_tabel_excel(os.path.join(base_dir, nama))
+        bagian.append(np.vstack([t[kolom] for kolom in KOLOM_LMS]))
+        tables_info[f"{jenis}|{sex}"] = {"offset": offset, "length": len(t["Month"])}
+        offset += len(t["Month"])
+
+    artifact_path = os.path.join(base_dir, ARTIFACT_FILE)
+    np.save(artifact_path, np.ascontiguousarray(np.hstack(bagian)))
+
+    manifest = {
+        "version": versi_tabel(sources),
+        "checksum": sha256_file(artifact_path),
+        "columns": list(KOLOM_LMS),
+        "sources": sources,
+        "stat": {"sources": stat_sumber(base_dir), "artifact": stat_file(artifact_path)},
+        "tables": tables_info,
+    }
+    with open(os.path.join(base_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def status_artifact(base_dir=LMS_DIR):
+    """Kembalikan (ok, pesan) untuk artefak di base_dir (verifikasi penuh dengan sha256)"""
+    try:
+        engine = LMSEngine.from_artifact(base_dir, verifikasi=True)
+    except ArtefakBasi as e:
+        return False, str(e)
+    return True, f"Artefak LMS versi {engine.version} valid"
+
+
+def load_engine(base_dir=LMS_DIR):
+    """Pakai artefak biner jika valid, selain itu baca langsung dari file Excel"""
+    try:
+        return LMSEngine.from_artifact(base_dir)
+    except ArtefakBasi as e:
+        logging.warning(f"{e}; memuat tabel LMS dari Excel (jalankan `flask lms compile`)")
+        return LMSEngine.from_excel(base_dir)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_reload_hooks = []
+
+
+def on_reload(fn):
+    """Daftarkan fungsi yang dipanggil setiap kali tabel LMS dimuat ulang (mis. membersihkan cache)"""
+    _reload_hooks.append(fn)
+    return fn
+
+
+def get_engine():
+    """Mesin LMS bersama untuk seluruh proses (dimuat saat pertama kali dipakai)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = load_engine()
+    return _engine
+
+
+def reload_engine():
+    """Muat ulang tabel LMS dari sumbernya (mis. setelah file Excel diperbarui)"""
+    global _engine
+    with _engine_lock:
+        _engine = load_engine()
+    for hook in _reload_hooks:
+        hook()
+    return _engine
+
@@ -1,14 +1,36 @@
-from predict import assess_child_growth
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .predict import assess_child_growth, assess_child_growth_batch, KOLOM_HASIL
+
+# Nama kolom yang dikenali pada file ekspor posyandu (huruf besar/kecil diabaikan)
+ALIAS_KOLOM = {
+    "sex": ["jenis_kelamin", "sex", "jk"],
+    "umur_bulan": ["umur_bulan", "age_months", "umur"],
+    "umur_hari": ["umur_hari", "age_days"],
+    "tanggal_lahir": ["tanggal_lahir", "birth_date"],
+    "tanggal": ["tanggal_pengukuran", "tanggal", "date"],
+    "berat": ["berat_badan", "weight_kg", "bb"],
+    "tinggi": ["tinggi_badan", "height_cm", "tb"],
+    "kepala": ["lingkar_kepala", "head_circ", "lk"],
+    "lengan": ["lingkar_lengan", "arm_circ", "lila"],
+}
+
 
 def main():
     print("=== Aplikasi Penilaian Status Gizi Anak ===")
-    
+
     # Input data anak
     sex = input("Jenis kelamin (L/P): ").strip().upper()
     age_months = int(input("Umur (bulan): "))
     weight_kg = float(input("Berat badan (kg): "))
     height_cm = float(input("Tinggi badan (cm): "))
-    
+
     # Opsional
     head_circ = input("Lingkar kepala (cm) [kosongkan jika tidak ada]: ")
     arm_circ = input("Lingkar lengan atas (cm) [kosongkan jika tidak ada]: ")
@@ -31,5 +53,149 @@ def main():
         for k, v in data.items():
             print(f"  {k}: {v}")
 
+
+# ==========================================================
+# ✅ MODE BATCH: python -m backend.analysis.main --in data.csv --out scored.csv
+# ==========================================================
+def cari_kolom(columns):
+    """Petakan kolom file input ke nama internal berdasarkan ALIAS_KOLOM"""
+    lower = {str(c).strip().lower(): c for c in columns}
+    peta = {}
+    for nama, alias in ALIAS_KOLOM.items():
+        for a in alias:
+            if a in lower:
+                peta[nama] = lower[a]
+                break
+
+    wajib = ["sex", "berat", "tinggi"]
+    kurang = [n for n in wajib if n not in peta]
+    if "umur_bulan" not in peta and "umur_hari" not in peta and not {"tanggal_lahir", "tanggal"} <= peta.keys():
+        kurang.append("umur_bulan / umur_hari / (tanggal_lahir + tanggal_pengukuran)")
+    if kurang:
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(ALIAS_KOLOM.get(k, [k])[0] for k in kurang)}")
+    return peta
+
+
+def kolom_angka(df, peta, nama):
+    if nama not in peta:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[peta[nama]], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def score_chunk(df, peta):
+    """Nilai satu chunk DataFrame (dijalankan di proses utama atau worker pool)"""
+    sex = df[peta["sex"]].astype(str).str.strip().to_numpy(dtype=object)
+
+    if "umur_hari" in peta:
+        umur = {"age_days": kolom_angka(df, peta, "umur_hari")}
+    elif "umur_bulan" in peta:
+        umur = {"age_months": kolom_angka(df, peta, "umur_bulan")}
+    else:
+        lahir = pd.to_datetime(df[peta["tanggal_lahir"]], errors="coerce", dayfirst=True)
+        tanggal = pd.to_datetime(df[peta["tanggal"]], errors="coerce", dayfirst=True)
+        umur = {"age_days": (tanggal - lahir).dt.days.to_numpy(dtype=np.float64)}
+
+    hasil = assess_child_growth_batch(
+        sex,
+        umur.get("age_months"),
+        kolom_angka(df, peta, "berat"),
+        kolom_angka(df, peta, "tinggi"),
+        kolom_angka(df, peta, "kepala"),
+        kolom_angka(df, peta, "lengan"),
+        age_days=umur.get("age_days"),
+    )
+
+    df = df.copy()
+    for indikator, (kol_z, kol_kat) in KOLOM_HASIL.items():
+        df[kol_z] = hasil[indikator]["z_score"]
+        df[kol_kat] = hasil[indikator]["kategori"]
+    return df
+
+
+def baca_chunk(path, chunksize):
+    """Baca CSV atau Excel per chunk tanpa memuat seluruh file ke memori"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunksize:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            wb.close()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def proses_file(path_in, path_out, chunksize=10000, workers=1, progress=None):
+    """
+    Streaming: baca chunk -> nilai (opsional paralel) -> tulis CSV secara bertahap.
+    Jumlah chunk yang sedang diproses dibatasi sehingga memori tetap datar.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    antrian, peta, total, header = [], None, 0, True
+
+    def tulis(df):
+        nonlocal total, header
+        df.to_csv(path_out, mode="w" if header else "a", header=header, index=False)
+        header = False
+        total += len(df)
+        if progress:
+            progress(total)
+
+    try:
+        for chunk in baca_chunk(path_in, chunksize):
+            if peta is None:
+                peta = cari_kolom(chunk.columns)
+            if pool:
+                antrian.append(pool.submit(score_chunk, chunk, peta))
+                while len(antrian) > workers * 2:
+                    tulis(antrian.pop(0).result())
+            else:
+                tulis(score_chunk(chunk, peta))
+        while antrian:
+            tulis(antrian.pop(0).result())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    if header:  # file input kosong
+        raise ValueError("File input tidak berisi data")
+    return total
+
+
+def main_batch(argv=None):
+    parser = argparse.ArgumentParser(description="Penilaian status gizi massal dari file CSV/Excel")
+    parser.add_argument("--in", dest="path_in", required=True, help="File input (.csv atau .xlsx)")
+    parser.add_argument("--out", dest="path_out", required=True, help="File output (.csv)")
+    parser.add_argument("--chunksize", type=int, default=10000, help="Jumlah baris per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses untuk scoring")
+    args = parser.parse_args(argv)
+
+    def progress(total):
+        print(f"  {total} baris dinilai", file=sys.stderr)
+
+    try:
+        total = proses_file(args.path_in, args.path_out, args.chunksize, args.workers, progress)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(f"✅ {total} baris ditulis ke {args.path_out}")
+    return 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main_batch())
     main()
@@ -1,45 +1,25 @@
-import os
-import pandas as pd
+import math
 import numpy as np
-
-def hitung_zscore(nilai, umur, sex, jenis):
-    base_dir = os.path.join(os.path.dirname(__file__), 'LMS')
-
-    nama_file = {
-        ('bb', 'Laki-Laki'): 'Standar Percintiles WHO Berat Badan_Balita_0-5 Tahun_Laki-Laki.xlsx',
-        ('bb', 'Perempuan'): 'Standar Percintiles WHO Berat Badan_Balita_0-5 Tahun_Perempuan.xlsx',
-        ('tb', 'Laki-Laki'): 'Standar Percintiles WHO Tinggi Badan_Balita_0-5 Tahun_Laki-Laki.xlsx',
-        ('tb', 'Perempuan'): 'Standar Percintiles WHO Tinggi Badan_Balita_0-5 Tahun_Perempuan.xlsx',
-        ('lk', 'Laki-Laki'): 'Standar Percintiles WHO Lingkar Kepala_Balita_0-5 Tahun_Laki-Laki.xlsx',
-        ('lk', 'Perempuan'): 'Standar Percintiles WHO Lingkar Kepala_Balita_0-5 Tahun_Perempuan.xlsx',
-        ('lila', 'Laki-Laki'): 'Standar Percintiles WHO Lingkar Lengan_Balita_0-5 Tahun_Laki-Laki.xlsx',
-        ('lila', 'Perempuan'): 'Standar Percintiles WHO Lingkar Lengan_Balita_0-5 Tahun_Perempuan.xlsx',
-        ('imt', 'Laki-Laki'): 'Standar Percintiles WHO IMT_Balita_0-5 Tahun_Laki-Laki.xlsx',    
-        ('imt', 'Perempuan'): 'Standar Percintiles WHO IMT_Balita_0-5 Tahun_Perempuan.xlsx'      
-    }
-
-    file_path = os.path.join(base_dir, nama_file.get((jenis, sex)))
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File LMS tidak ditemukan: {file_path}")
-
-    df = pd.read_excel(file_path)
-    df = df.sort_values(by="Month")
-
-    if umur < df["Month"].min() or umur > df["Month"].max():
+from .lms import get_engine, normalisasi_sex
+from .cache import assess_cache, kuantisasi
+
+# Indikator -> (kolom z-score, kolom kategori) pada tabel pengukuran / file hasil
+KOLOM_HASIL = {
+    'BB/U': ("z_bb", "kategori_bb"),
+    'TB/U': ("z_tb", "kategori_tb"),
+    'IMT/U': ("z_imt", "kategori_imt"),
+    'LK/U': ("z_lk", "kategori_lk"),
+    'LILA/U': ("z_lila", "kategori_lila"),
+}
+
+def hitung_zscore(nilai, umur, sex, jenis, satuan="bulan"):
+    """
+    Hitung Z-score satu nilai memakai mesin LMS yang sudah dimuat di memori.
+    umur dalam bulan (boleh pecahan), atau dalam hari jika satuan="hari".
+    """
+    z = float(get_engine().zscore(jenis, sex, umur, nilai, satuan))
+    if math.isnan(z):
         return None  # umur di luar batas WHO
-
-    row_bawah = df[df["Month"] <= umur].iloc[-1]
-    row_atas = df[df["Month"] >= umur].iloc[0]
-
-    if row_bawah["Month"] == row_atas["Month"]:
-        L, M, S = row_bawah["L"], row_bawah["M"], row_bawah["S"]
-    else:
-        ratio = (umur - row_bawah["Month"]) / (row_atas["Month"] - row_bawah["Month"])
-        L = row_bawah["L"] + ratio * (row_atas["L"] - row_bawah["L"])
-        M = row_bawah["M"] + ratio * (row_atas["M"] - row_bawah["M"])
-        S = row_bawah["S"] + ratio * (row_atas["S"] - row_bawah["S"])
-
-    z = ((nilai / M) ** L - 1) / (L * S)
     return round(z, 2)
 
 
@@ -57,43 +37,117 @@ def kategori_zscore(z):
         return "Lebih"
 
 
-def assess_child_growth(sex, age_months, weight_kg, height_cm, head_circ=None, arm_circ=None):
+def kategori_zscore_batch(z):
+    """Versi vektor dari kategori_zscore; NaN menjadi "-" """
+    z = np.asarray(z, dtype=np.float64)
+    return np.select(
+        [z < -3, z < -2, z <= 2, z > 2],
+        ["Sangat Kurang", "Kurang", "Normal", "Lebih"],
+        default="-",
+    ).astype(object)
+
+
+def assess_child_growth(sex, age_months, weight_kg, height_cm, head_circ=None, arm_circ=None, age_days=None):
     """
     Fungsi utama untuk menilai pertumbuhan anak berdasarkan standar WHO.
+    Hasil disimpan di cache LRU dengan kunci (sex, umur, pengukuran terkuantisasi, versi LMS),
+    sehingga tampilan berulang untuk pengukuran yang sama cukup satu lookup dictionary.
+    """
+    sex = normalisasi_sex(sex)
+    age_months, age_days = kuantisasi(age_months, 3), kuantisasi(age_days, 3)
+    ukuran = tuple(kuantisasi(v) for v in (weight_kg, height_cm, head_circ, arm_circ))
+    key = (sex, age_months, age_days, ukuran, get_engine().version)
+
+    hasil = assess_cache.get(key)
+    if hasil is None:
+        hasil = hitung_pertumbuhan(sex, age_months, *ukuran, age_days=age_days)
+        assess_cache.set(key, hasil)
+    # salinan dangkal per indikator agar pemanggil tidak mengubah isi cache
+    return {indikator: dict(v) for indikator, v in hasil.items()}
+
+
+def hitung_pertumbuhan(sex, age_months, weight_kg, height_cm, head_circ=None, arm_circ=None, age_days=None):
+    """
+    Penilaian pertumbuhan tanpa cache (dipakai oleh assess_child_growth).
     sex: 'L' atau 'P'
-    age_months: umur anak dalam bulan
+    age_months: umur anak dalam bulan (boleh pecahan)
+    age_days: umur dalam hari; jika diisi, dipakai menggantikan age_months
     weight_kg, height_cm, head_circ, arm_circ: nilai pengukuran
     """
 
     hasil = {}
+    if age_days is not None:
+        umur, satuan = age_days, "hari"
+    else:
+        umur, satuan = age_months, "bulan"
 
     # Normalisasi jenis kelamin
-    sex = "Laki-Laki" if sex in ["L", "l", "Laki-Laki"] else "Perempuan"
+    sex = normalisasi_sex(sex)
 
     # Berat Badan per Umur
-    z_bb = hitung_zscore(weight_kg, age_months, sex, 'bb')
+    z_bb = hitung_zscore(weight_kg, umur, sex, 'bb', satuan)
     hasil['BB/U'] = {"z_score": z_bb, "kategori": kategori_zscore(z_bb)}
 
     # Tinggi Badan per Umur
-    z_tb = hitung_zscore(height_cm, age_months, sex, 'tb')
+    z_tb = hitung_zscore(height_cm, umur, sex, 'tb', satuan)
     hasil['TB/U'] = {"z_score": z_tb, "kategori": kategori_zscore(z_tb)}
 
     # ✅ IMT per Umur (BMI-for-age)
     imt = weight_kg / ((height_cm / 100) ** 2) if height_cm > 0 else None
     if imt:
-        z_imt = hitung_zscore(imt, age_months, sex, 'imt')
+        z_imt = hitung_zscore(imt, umur, sex, 'imt', satuan)
         hasil['IMT/U'] = {"z_score": z_imt, "kategori": kategori_zscore(z_imt)}
     else:
         hasil['IMT/U'] = {"z_score": None, "kategori": "-"}
 
     # Lingkar Kepala (opsional)
     if head_circ is not None:
-        z_lk = hitung_zscore(head_circ, age_months, sex, 'lk')
+        z_lk = hitung_zscore(head_circ, umur, sex, 'lk', satuan)
         hasil['LK/U'] = {"z_score": z_lk, "kategori": kategori_zscore(z_lk)}
 
     # Lingkar Lengan (opsional)
     if arm_circ is not None:
-        z_lila = hitung_zscore(arm_circ, age_months, sex, 'lila')
+        z_lila = hitung_zscore(arm_circ, umur, sex, 'lila', satuan)
         hasil['LILA/U'] = {"z_score": z_lila, "kategori": kategori_zscore(z_lila)}
 
-    return hasil
\ No newline at end of file
+    return hasil
+
+
+def assess_child_growth_batch(sex, age_months, weight_kg, height_cm, head_circ=None, arm_circ=None, age_days=None):
+    """
+    Penilaian pertumbuhan untuk banyak pengukuran sekaligus (satu posyandu, satu file ekspor).
+    Semua argumen berupa array sepanjang N; head_circ / arm_circ boleh None.
+    Umur diberikan dalam bulan (age_months) atau hari (age_days, age_months boleh None).
+    Mengembalikan hasil kolumnar: {indikator: {"z_score": array, "kategori": array}},
+    nilai yang tidak bisa dihitung bernilai NaN dengan kategori "-".
+    """
+    engine = get_engine()
+
+    sex = np.asarray(sex, dtype=object)
+    n = len(sex)
+    if age_days is not None:
+        umur, satuan = np.asarray(age_days, dtype=np.float64), "hari"
+    else:
+        umur, satuan = np.asarray(age_months, dtype=np.float64), "bulan"
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    head_circ = np.full(n, np.nan) if head_circ is None else np.asarray(head_circ, dtype=np.float64)
+    arm_circ = np.full(n, np.nan) if arm_circ is None else np.asarray(arm_circ, dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        imt = np.where(height_cm > 0, weight_kg / (height_cm / 100) ** 2, np.nan)
+    imt[imt == 0] = np.nan
+
+    kolom = {
+        'BB/U': ('bb', weight_kg),
+        'TB/U': ('tb', height_cm),
+        'IMT/U': ('imt', imt),
+        'LK/U': ('lk', head_circ),
+        'LILA/U': ('lila', arm_circ),
+    }
+
+    hasil = {}
+    for indikator, (jenis, nilai) in kolom.items():
+        z = np.round(engine.zscore_batch(jenis, sex, umur, nilai, satuan), 2)
+        hasil[indikator] = {"z_score": z, "kategori": kategori_zscore_batch(z)}
+    return hasil
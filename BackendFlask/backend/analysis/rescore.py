@@ -0,0 +1,185 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import bindparam
+
+from ..extensions import db
+from ..models import Pengukuran, Anak
+from .predict import assess_child_growth_batch, KOLOM_HASIL
+
+# ==========================================================
+# ✅ RESCORE MASSAL Z-SCORE PENGUKURAN (flask rescore)
+# ==========================================================
+
+
+def umur_hari_pada(tanggal_lahir, tanggal):
+    """Umur dalam hari pada tanggal pengukuran"""
+    if isinstance(tanggal, datetime):
+        tanggal = tanggal.date()
+    return max(0, (tanggal - tanggal_lahir).days)
+
+
+def ambil_chunk(last_id, chunk_size, since=None):
+    """Ambil satu chunk Pengukuran + Anak berurutan id (keyset pagination, tanpa OFFSET)"""
+    query = (
+        db.select(
+            Pengukuran.id_pengukuran,
+            Pengukuran.tanggal,
+            Pengukuran.created_at,
+            Pengukuran.updated_at,
+            Pengukuran.berat_badan,
+            Pengukuran.tinggi_badan,
+            Pengukuran.lingkar_kepala,
+            Pengukuran.lingkar_lengan,
+            Anak.jenis_kelamin,
+            Anak.tanggal_lahir,
+        )
+        .join(Anak, Anak.id_anak == Pengukuran.id_anak)
+        .where(Pengukuran.id_pengukuran > last_id)
+        .order_by(Pengukuran.id_pengukuran.asc())
+        .limit(chunk_size)
+    )
+    if since is not None:
+        query = query.where(Pengukuran.updated_at >= since)
+    return db.session.execute(query).all()
+
+
+def siapkan_kolom(rows):
+    """
+    Ubah baris hasil query menjadi kolom array untuk assess_child_growth_batch.
+    Baris tanpa tanggal lahir, berat, atau tinggi tidak bisa dinilai dan dilewati.
+    """
+    ids, sex, umur, berat, tinggi, kepala, lengan, updated_at = [], [], [], [], [], [], [], []
+    for r in rows:
+        if not r.tanggal_lahir or not r.berat_badan or not r.tinggi_badan:
+            continue
+        tanggal = r.tanggal or r.created_at or datetime.utcnow()
+        ids.append(r.id_pengukuran)
+        sex.append(r.jenis_kelamin or "")
+        umur.append(umur_hari_pada(r.tanggal_lahir, tanggal))
+        berat.append(r.berat_badan)
+        tinggi.append(r.tinggi_badan)
+        kepala.append(r.lingkar_kepala if r.lingkar_kepala else np.nan)
+        lengan.append(r.lingkar_lengan if r.lingkar_lengan else np.nan)
+        updated_at.append(r.updated_at)
+    return {
+        "ids": ids,
+        "updated_at": updated_at,
+        "sex": sex,
+        "umur": umur,
+        "berat": berat,
+        "tinggi": tinggi,
+        "kepala": kepala,
+        "lengan": lengan,
+    }
+
+
+def score_kolom(kolom):
+    """Dijalankan di worker pool: nilai satu chunk dan kembalikan parameter UPDATE"""
+    if not kolom["ids"]:
+        return []
+
+    hasil = assess_child_growth_batch(
+        kolom["sex"], None, kolom["berat"], kolom["tinggi"], kolom["kepala"], kolom["lengan"],
+        age_days=kolom["umur"],
+    )
+
+    params = []
+    for i, id_pengukuran in enumerate(kolom["ids"]):
+        p = {"b_id": id_pengukuran, "b_updated_at": kolom["updated_at"][i]}
+        for indikator, (kol_z, kol_kat) in KOLOM_HASIL.items():
+            z = hasil[indikator]["z_score"][i]
+            p[f"b_{kol_z}"] = None if np.isnan(z) else float(z)
+            p[f"b_{kol_kat}"] = hasil[indikator]["kategori"][i]
+        params.append(p)
+    return params
+
+
+def tulis_hasil(params, hanya_jika_tetap=False):
+    """
+    Bulk UPDATE (executemany) satu chunk dalam satu transaksi; updated_at tidak diubah.
+    `hanya_jika_tetap` = lewati baris yang updated_at-nya sudah berubah sejak dibaca.
+    """
+    if params:
+        tabel = Pengukuran.__table__
+        values = {kol: bindparam(f"b_{kol}") for pair in KOLOM_HASIL.values() for kol in pair}
+        values["updated_at"] = bindparam("b_updated_at")
+        stmt = tabel.update().where(tabel.c.id_pengukuran == bindparam("b_id")).values(**values)
+        if hanya_jika_tetap:
+            stmt = stmt.where(tabel.c.updated_at.is_not_distinct_from(bindparam("b_updated_at")))
+        db.session.execute(stmt, params)
+    db.session.commit()
+
+
+def baca_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            isi = f.read().strip()
+            return int(isi) if isi else 0
+    return 0
+
+
+def simpan_checkpoint(path, last_id):
+    if path:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(last_id))
+        os.replace(tmp, path)
+
+
+def rescore_semua(chunk_size=5000, workers=1, since=None, checkpoint=None, start_id=0, progress=None):
+    """
+    Hitung ulang z-score seluruh Pengukuran per chunk.
+    Chunk ditulis berurutan sehingga checkpoint (id terakhir yang sudah tersimpan)
+    selalu aman untuk melanjutkan proses yang terputus.
+    """
+    last_id = max(start_id, baca_checkpoint(checkpoint))
+    total_baris, total_dinilai, mulai = 0, 0, time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    antrian = []  # (last_id chunk, jumlah baris, future/hasil)
+
+    def selesaikan(item):
+        nonlocal total_baris, total_dinilai
+        chunk_last_id, jumlah, hasil = item
+        params = hasil.result() if pool else hasil
+        tulis_hasil(params)
+        simpan_checkpoint(checkpoint, chunk_last_id)
+        total_baris += jumlah
+        total_dinilai += len(params)
+        if progress:
+            progress(chunk_last_id, total_baris, total_dinilai, time.perf_counter() - mulai)
+
+    try:
+        while True:
+            rows = ambil_chunk(last_id, chunk_size, since)
+            if not rows:
+                break
+            last_id = rows[-1].id_pengukuran
+            kolom = siapkan_kolom(rows)
+            db.session.rollback()  # lepas transaksi baca sebelum menunggu worker
+
+            hasil = pool.submit(score_kolom, kolom) if pool else score_kolom(kolom)
+            antrian.append((last_id, len(rows), hasil))
+
+            # batasi chunk yang sedang diproses agar memori tetap datar
+            while len(antrian) > (workers if pool else 0):
+                selesaikan(antrian.pop(0))
+
+        while antrian:
+            selesaikan(antrian.pop(0))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)  # selesai penuh: run berikutnya mulai dari awal lagi
+
+    return {
+        "last_id": last_id,
+        "baris": total_baris,
+        "dinilai": total_dinilai,
+        "detik": round(time.perf_counter() - mulai, 2),
+    }
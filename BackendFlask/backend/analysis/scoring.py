@@ -0,0 +1,106 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from ..extensions import db
+from ..models import Pengukuran, Anak
+from .rescore import siapkan_kolom, score_kolom, tulis_hasil
+
+# ==========================================================
+# ✅ Z-SCORE SAAT TULIS (compute-on-write)
+# ==========================================================
+# Setiap penulisan nilai ukur (save-current, update IoT, ingest, listener) menjadwalkan
+# penilaian ulang pengukuran tersebut di thread pool proses ini. Hasilnya disimpan di kolom
+# z_* / kategori_* sehingga endpoint baca cukup membaca kolom itu tanpa menghitung ulang.
+# Pengukuran tanpa tanggal lahir, berat, atau tinggi dilewati (sama seperti flask rescore).
+_executor = None
+_executor_lock = threading.Lock()
+
+# id yang sudah dijadwalkan tapi belum dibaca worker: penulisan beruntun cukup satu job
+_tertunda = set()
+_tertunda_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("SCORING_WORKERS", 1),
+                    thread_name_prefix="scoring",
+                )
+    return _executor
+
+
+def ambil_baris(ids):
+    """Pengukuran + Anak untuk id tertentu (kolom sama dengan rescore.ambil_chunk)"""
+    return db.session.execute(
+        db.select(
+            Pengukuran.id_pengukuran,
+            Pengukuran.tanggal,
+            Pengukuran.created_at,
+            Pengukuran.updated_at,
+            Pengukuran.berat_badan,
+            Pengukuran.tinggi_badan,
+            Pengukuran.lingkar_kepala,
+            Pengukuran.lingkar_lengan,
+            Anak.jenis_kelamin,
+            Anak.tanggal_lahir,
+        )
+        .join(Anak, Anak.id_anak == Pengukuran.id_anak)
+        .where(Pengukuran.id_pengukuran.in_(ids))
+    ).all()
+
+
+def nilai_pengukuran(ids):
+    """
+    Hitung dan simpan z-score untuk beberapa pengukuran (satu transaksi).
+    Baris yang berubah setelah dibaca tidak ditimpa; penulisan itu sudah menjadwalkan job sendiri.
+    Mengembalikan jumlah pengukuran yang dinilai.
+    """
+    ids = {int(i) for i in ids if i is not None}
+    if not ids:
+        return 0
+    params = score_kolom(siapkan_kolom(ambil_baris(ids)))
+    tulis_hasil(params, hanya_jika_tetap=True)
+    return len(params)
+
+
+def jalankan_scoring(app, ids):
+    """Dijalankan di thread pool"""
+    with app.app_context():
+        with _tertunda_lock:
+            _tertunda.difference_update(ids)
+        try:
+            return nilai_pengukuran(ids)
+        except Exception as e:
+            logging.error(f"Scoring pengukuran {sorted(ids)} gagal: {e}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def jadwalkan_scoring(ids):
+    """Panggil setelah commit: nilai ulang pengukuran ini di background. Mengembalikan Future atau None."""
+    ids = {int(i) for i in ids if i is not None}
+    with _tertunda_lock:
+        ids -= _tertunda
+        _tertunda.update(ids)
+    if not ids:
+        return None
+    app = current_app._get_current_object()
+    return get_executor().submit(jalankan_scoring, app, ids)
+
+
+def jadwalkan_scoring_anak(id_anak):
+    """Panggil setelah commit perubahan tanggal lahir / jenis kelamin: semua pengukuran anak dinilai ulang"""
+    ids = db.session.scalars(db.select(Pengukuran.id_pengukuran).where(Pengukuran.id_anak == id_anak)).all()
+    return jadwalkan_scoring(ids)
+
+
+def skor_tertunda(anak, peng):
+    """Data lengkap tapi belum pernah dinilai (job belum selesai / data lama); kategori selalu diisi saat dinilai"""
+    return bool(anak.tanggal_lahir and peng.berat_badan and peng.tinggi_badan and peng.kategori_bb is None)
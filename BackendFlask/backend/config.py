@@ -33,3 +33,79 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = "gemini-2.5-flash"
     GEMINI_THINKING_BUDGET = 0
+    GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") == "1"  # JSON schema output for parsed analyses
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))  # per-call deadline (seconds)
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))  # concurrent calls per process
+    GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))  # consecutive failures before opening
+    GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "60"))  # seconds before a trial call
+
+    # ============================================================
+    # 🔹 Gemini backend: gemini | fake | fake-latency (offline load testing)
+    # ============================================================
+    GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "gemini")
+    GEMINI_FAKE_P50_MS = float(os.getenv("GEMINI_FAKE_P50_MS", "800"))
+    GEMINI_FAKE_P99_MS = float(os.getenv("GEMINI_FAKE_P99_MS", "5000"))
+    GEMINI_FAKE_ERROR_RATE = float(os.getenv("GEMINI_FAKE_ERROR_RATE", "0"))
+
+    # ============================================================
+    # 🔹 Background AI analysis jobs
+    # ============================================================
+    AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+    AI_PRECOMPUTE_WORKERS = int(os.getenv("AI_PRECOMPUTE_WORKERS", "4"))
+    AI_PRECOMPUTE_RPM = int(os.getenv("AI_PRECOMPUTE_RPM", "60"))
+
+    # ============================================================
+    # 🔹 Live IoT readings shared across workers: sqlite | redis | memory
+    # ============================================================
+    LIVE_STORE = os.getenv("LIVE_STORE", "sqlite")
+    LIVE_STORE_PATH = os.getenv("LIVE_STORE_PATH")  # default: instance/live_store.sqlite3
+    LIVE_STORE_URL = os.getenv("LIVE_STORE_URL", "redis://localhost:6379/0")
+    LIVE_STORE_TTL = int(os.getenv("LIVE_STORE_TTL", "300"))
+    LIVE_STREAM_HEARTBEAT = int(os.getenv("LIVE_STREAM_HEARTBEAT", "15"))  # seconds between SSE keep-alives
+    LIVE_STREAM_MAX_DURATION = int(os.getenv("LIVE_STREAM_MAX_DURATION", "300"))  # client reconnects after this
+    # Open SSE streams (live readings + Gemini) per gunicorn worker. Each one holds a gthread
+    # thread, so keep this below --threads; extra subscribers get 503 and fall back to polling.
+    LIVE_STREAM_MAX = int(os.getenv("LIVE_STREAM_MAX", "8"))
+
+    # ============================================================
+    # 🔹 Batched sensor ingest (/iot/ingest)
+    # ============================================================
+    INGEST_MAX_BATCH = int(os.getenv("INGEST_MAX_BATCH", "1000"))  # readings per request
+    INGEST_DEDUP_TTL = int(os.getenv("INGEST_DEDUP_TTL", "86400"))  # seconds a (device, seq) is remembered
+
+    # ============================================================
+    # 🔹 Sensor stabilisation: only settled readings are written to pengukuran
+    # (batched /iot/ingest + MQTT; single POSTs to /iot/update and /iot/devices/<id>/reading
+    # are written as-is unless they send "final": false)
+    # ============================================================
+    STABIL_AKTIF = os.getenv("STABIL_AKTIF", "1") == "1"
+    STABIL_SAMPEL = int(os.getenv("STABIL_SAMPEL", "5"))  # window size (samples)
+    STABIL_TOLERANSI_CM = float(os.getenv("STABIL_TOLERANSI_CM", "0.2"))  # max std dev for tape/height sensors
+    STABIL_TOLERANSI_KG = float(os.getenv("STABIL_TOLERANSI_KG", "0.05"))  # max std dev for the scale
+    STABIL_JEDA_MAKS = float(os.getenv("STABIL_JEDA_MAKS", "10"))  # seconds of silence that reset the window
+
+    # ============================================================
+    # 🔹 Raw sensor time series (sensor_reading)
+    # ============================================================
+    SENSOR_RAW_AKTIF = os.getenv("SENSOR_RAW_AKTIF", "1") == "1"
+    SENSOR_RETENSI_HARI = int(os.getenv("SENSOR_RETENSI_HARI", "180"))  # used by `flask sensor prune`
+
+    # ============================================================
+    # 🔹 Asyncio device listener (python -m backend.iot.listener)
+    # ============================================================
+    IOT_LISTENER_HOST = os.getenv("IOT_LISTENER_HOST", "0.0.0.0")
+    IOT_LISTENER_TCP_PORT = int(os.getenv("IOT_LISTENER_TCP_PORT", "7070"))  # 0 disables TCP
+    IOT_LISTENER_UDP_PORT = int(os.getenv("IOT_LISTENER_UDP_PORT", "7071"))  # 0 disables UDP
+    IOT_LISTENER_BATCH = int(os.getenv("IOT_LISTENER_BATCH", "500"))  # readings per DB transaction
+    IOT_LISTENER_FLUSH_MS = float(os.getenv("IOT_LISTENER_FLUSH_MS", "50"))  # max wait to fill a batch
+
+    # ============================================================
+    # 🔹 Device -> measurement session bindings
+    # ============================================================
+    IOT_BINDING_IDLE = int(os.getenv("IOT_BINDING_IDLE", "900"))  # binding expires after this many idle seconds
+    IOT_BINDING_MAX = int(os.getenv("IOT_BINDING_MAX", "43200"))  # hard limit for one binding
+
+    # ============================================================
+    # 🔹 Compute-on-write z-scores (scored in the background after each write)
+    # ============================================================
+    SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "1"))
@@ -0,0 +1,18 @@
+import click
+
+
+@click.command("db-explain")
+def db_explain():
+    """Pastikan query route utama memakai index (EXPLAIN di database aktif)."""
+    from .query_plans import periksa_semua
+
+    hasil = periksa_semua()
+    for h in hasil:
+        click.echo(f"{'✅' if h['index'] else '❌'} {h['nama']} ({h['route']})")
+        click.echo(f"     {h['rencana']}")
+
+    gagal = [h for h in hasil if not h["index"]]
+    if gagal:
+        click.echo(f"❌ {len(gagal)} query tanpa index. Sudah menjalankan `flask db upgrade`?")
+        raise SystemExit(1)
+    click.echo(f"✅ {len(hasil)} query memakai index")
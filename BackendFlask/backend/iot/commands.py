@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+
+sensor_cli = AppGroup("sensor", help="Kelola deret waktu pembacaan sensor (sensor_reading).")
+
+
+@sensor_cli.command("rollup")
+@click.option("--since-hours", type=float, default=24, show_default=True,
+              help="Rangkum pengukuran yang punya sampel dalam N jam terakhir.")
+@click.option("--all", "semua", is_flag=True, help="Rangkum ulang semua pengukuran.")
+@click.option("--chunk-size", default=500, show_default=True, help="Jumlah pengukuran per transaksi.")
+def sensor_rollup(since_hours, semua, chunk_size):
+    """Hitung ringkasan min/max/median/jumlah per pengukuran ke sensor_rollup."""
+    from .timeseries import rollup_semua
+
+    since = None if semua else datetime.utcnow() - timedelta(hours=since_hours)
+
+    def progress(selesai, total):
+        click.echo(f"  {selesai}/{total} pengukuran")
+
+    hasil = rollup_semua(since=since, chunk_size=chunk_size, progress=progress)
+    click.echo(f"✅ Rollup selesai: {hasil['rollup']} ringkasan dari {hasil['pengukuran']} pengukuran "
+               f"dalam {hasil['detik']} detik")
+
+
+@sensor_cli.command("prune")
+@click.option("--days", type=int, default=None, help="Retensi dalam hari (default: SENSOR_RETENSI_HARI).")
+@click.option("--batch-size", default=10000, show_default=True, help="Jumlah baris per transaksi DELETE.")
+def sensor_prune(days, batch_size):
+    """Hapus pembacaan sensor mentah yang melewati masa retensi."""
+    from .timeseries import prune
+
+    def progress(total):
+        click.echo(f"  {total} baris dihapus")
+
+    hasil = prune(hari=days, batch_size=batch_size, progress=progress)
+    click.echo(f"✅ Prune selesai: {hasil['dihapus']} baris sebelum {hasil['batas']:%Y-%m-%d %H:%M} "
+               f"dihapus dalam {hasil['detik']} detik")
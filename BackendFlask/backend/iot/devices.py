@@ -0,0 +1,70 @@
+import time
+
+from flask import current_app
+
+from .live_store import get_live_store
+
+# ==========================================================
+# ✅ BINDING PERANGKAT -> SESI PENGUKURAN
+# ==========================================================
+# Perawat mengikat perangkat ke (id_anak, id_pengukuran) dari UI; perangkat cukup mengirim
+# device_id + nilai. Binding disimpan di live store (bersama semua worker dan listener):
+#   binding:<device_id>  -> {id_anak, id_pengukuran, jenis}, TTL IOT_BINDING_MAX (batas sesi)
+#   aktif:<device_id>    -> penanda aktivitas, TTL IOT_BINDING_IDLE, diperbarui setiap batch
+# Binding hanya berlaku jika keduanya masih ada, sehingga binding yang tidak dipakai
+# kedaluwarsa sendiri. Memperbarui `aktif:` tidak bisa menghidupkan lagi binding yang
+# sudah dilepas.
+
+
+def kunci_binding(device_id):
+    return f"binding:{device_id}"
+
+
+def kunci_aktif(device_id):
+    return f"aktif:{device_id}"
+
+
+def ikat(device, peng):
+    """Ikat perangkat ke pengukuran (menggantikan binding sebelumnya)"""
+    data = {
+        "id_device": device.id_device,
+        "id_anak": peng.id_anak,
+        "id_pengukuran": peng.id_pengukuran,
+        "jenis": device.jenis_sensor,
+        "diikat_at": time.time(),
+    }
+    store = get_live_store()
+    store.set(kunci_binding(device.id_device), data, ttl=current_app.config.get("IOT_BINDING_MAX", 43200))
+    store.set(kunci_aktif(device.id_device), {}, ttl=current_app.config.get("IOT_BINDING_IDLE", 900))
+    return data
+
+
+def lepas(device_id):
+    store = get_live_store()
+    store.delete(kunci_binding(device_id))
+    store.delete(kunci_aktif(device_id))
+
+
+def cari_binding_banyak(daftar_device):
+    """{device_id: binding} untuk perangkat yang binding-nya masih berlaku (satu baca store)"""
+    daftar_device = set(daftar_device)
+    if not daftar_device:
+        return {}
+    kunci = [kunci_binding(d) for d in daftar_device] + [kunci_aktif(d) for d in daftar_device]
+    ada = get_live_store().get_many(kunci)
+    return {
+        d: {k: v for k, v in ada[kunci_binding(d)].items() if k != "seq"}
+        for d in daftar_device
+        if kunci_binding(d) in ada and kunci_aktif(d) in ada
+    }
+
+
+def cari_binding(device_id):
+    return cari_binding_banyak([device_id]).get(device_id)
+
+
+def segarkan(daftar_device):
+    """Perpanjang masa idle perangkat yang baru mengirim data (satu penulisan store)"""
+    if daftar_device:
+        get_live_store().set_many({kunci_aktif(d): {} for d in set(daftar_device)},
+                                  ttl=current_app.config.get("IOT_BINDING_IDLE", 900))
@@ -0,0 +1,311 @@
+"""
+Listener IoT ringan (asyncio, tanpa HTTP/Flask routing per sampel):
+
+    python -m backend.iot.listener                        # TCP 7070 + UDP 7071
+    python -m backend.iot.listener --tcp-port 9000 --udp-port 0 --batch 1000 --flush-ms 20
+
+Protokol: satu pembacaan per baris (UTF-8, diakhiri \\n), salah satu format
+    teks : <device_id> <seq> <jenis|-> <nilai> [ts|-] [id_pengukuran]
+    JSON : {"device_id": "tape-01", "seq": 1, "jenis": "kepala", "nilai": 45.2, "ts": 1700000000.5}
+Balasan per pembacaan: "OK <seq>" setelah batch-nya tersimpan, atau "ERR <seq|-> <pesan>".
+Tanpa id_pengukuran (dan jenis "-") keduanya diambil dari binding perangkat.
+"PING" dibalas "PONG". Di UDP satu datagram boleh berisi beberapa baris dan balasannya
+dikirim sebagai satu datagram.
+
+Pembacaan dari semua koneksi dikumpulkan ke antrian lalu diproses per batch oleh satu
+thread database melalui pipeline yang sama dengan /iot/ingest (dedup, stabilisasi,
+sensor_reading, live store). Antrian terbatas: koneksi TCP berhenti dibaca saat antrian
+penuh (backpressure), datagram UDP dibalas ERR.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..extensions import db
+from .pipeline import normalisasi_bacaan, proses_batch
+
+MAKS_BARIS = 4096  # byte per baris
+
+
+def naikkan_batas_file():
+    """Ribuan koneksi butuh ribuan file descriptor: naikkan soft limit ke hard limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def parse_baris(teks):
+    """Satu baris protokol -> pembacaan ternormalisasi; ValueError jika tidak valid"""
+    if teks.startswith("{"):
+        try:
+            item = json.loads(teks)
+        except json.JSONDecodeError:
+            raise ValueError("JSON tidak valid")
+        return normalisasi_bacaan(item, {})
+
+    bagian = teks.split()
+    if not 4 <= len(bagian) <= 6:
+        raise ValueError("format: <device_id> <seq> <jenis> <nilai> [ts] [id_pengukuran]")
+    try:
+        seq = int(bagian[1])
+    except ValueError:
+        raise ValueError("seq harus bilangan bulat >= 0")
+    item = {"device_id": bagian[0], "seq": seq, "nilai": bagian[3]}
+    if bagian[2] != "-":
+        item["jenis"] = bagian[2]
+    if len(bagian) > 4 and bagian[4] != "-":
+        try:
+            item["ts"] = float(bagian[4])
+        except ValueError:
+            item["ts"] = bagian[4]  # ISO 8601
+    if len(bagian) > 5:
+        item["id_pengukuran"] = bagian[5]
+    return normalisasi_bacaan(item, {})
+
+
+def balasan(seq, future):
+    if future.cancelled():
+        return f"ERR {seq} dibatalkan\n"
+    if isinstance(future.exception(), ValueError):
+        return f"ERR {seq} {future.exception()}\n"
+    if future.exception() is not None:
+        return f"ERR {seq} gagal disimpan\n"
+    return f"OK {seq}\n"
+
+
+def kirim_balasan(writer, seq, future):
+    if not writer.is_closing():
+        writer.write(balasan(seq, future).encode())
+
+
+class ProtokolUDP(asyncio.DatagramProtocol):
+    def __init__(self, listener):
+        self.listener = listener
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        langsung, menunggu = [], []
+        for baris in data.decode("utf-8", errors="replace").splitlines():
+            teks = baris.strip()
+            if not teks:
+                continue
+            if teks == "PING":
+                langsung.append("PONG\n")
+                continue
+            try:
+                bacaan = parse_baris(teks)
+            except ValueError as e:
+                langsung.append(f"ERR - {e}\n")
+                continue
+            future = self.listener.masukkan_nowait(bacaan)
+            if future is None:
+                langsung.append(f"ERR {bacaan['seq']} antrian penuh\n")
+            else:
+                menunggu.append((bacaan["seq"], future))
+
+        if langsung and not menunggu:
+            self.transport.sendto("".join(langsung).encode(), addr)
+        elif menunggu:
+            asyncio.ensure_future(self.balas(langsung, menunggu, addr))
+
+    async def balas(self, langsung, menunggu, addr):
+        await asyncio.gather(*(f for _, f in menunggu), return_exceptions=True)
+        isi = "".join(langsung) + "".join(balasan(seq, f) for seq, f in menunggu)
+        self.transport.sendto(isi.encode(), addr)
+
+
+class Listener:
+    def __init__(self, app, maks_batch=500, jeda_flush=0.05, antrian_maks=20000):
+        self.app = app
+        self.maks_batch = maks_batch
+        self.jeda_flush = jeda_flush
+        self.antrian = asyncio.Queue(antrian_maks)
+        # satu thread: batch ditulis berurutan, sesi SQLAlchemy tidak dibagi antar thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="iot-listener-db")
+        self.statistik = {"koneksi": 0, "diterima": 0, "ditolak": 0, "duplikat": 0,
+                          "batch": 0, "gagal": 0, "antrian_penuh": 0}
+
+    # ---------------- masuk antrian ----------------
+    async def masukkan(self, bacaan):
+        future = asyncio.get_running_loop().create_future()
+        await self.antrian.put((bacaan, future))
+        return future
+
+    def masukkan_nowait(self, bacaan):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.antrian.put_nowait((bacaan, future))
+        except asyncio.QueueFull:
+            self.statistik["antrian_penuh"] += 1
+            return None
+        return future
+
+    # ---------------- TCP ----------------
+    async def tangani_tcp(self, reader, writer):
+        self.statistik["koneksi"] += 1
+        try:
+            while True:
+                try:
+                    baris = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b"ERR - baris terlalu panjang\n")
+                    break
+                if not baris:
+                    break
+                teks = baris.decode("utf-8", errors="replace").strip()
+                if not teks:
+                    continue
+                if teks == "PING":
+                    writer.write(b"PONG\n")
+                    continue
+                try:
+                    bacaan = parse_baris(teks)
+                except ValueError as e:
+                    self.statistik["ditolak"] += 1
+                    writer.write(f"ERR - {e}\n".encode())
+                    continue
+
+                future = await self.masukkan(bacaan)
+                future.add_done_callback(lambda f, seq=bacaan["seq"]: kirim_balasan(writer, seq, f))
+                await writer.drain()  # klien yang tidak membaca balasan ikut tertahan
+        except ConnectionError:
+            pass
+        finally:
+            self.statistik["koneksi"] -= 1
+            writer.close()
+
+    # ---------------- batch ke database ----------------
+    def proses(self, bacaan):
+        with self.app.app_context():
+            try:
+                return proses_batch(bacaan)
+            finally:
+                db.session.remove()
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.antrian.get()]
+            batas = loop.time() + self.jeda_flush
+            while len(batch) < self.maks_batch:
+                sisa = batas - loop.time()
+                if sisa <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.antrian.get(), sisa))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self.maks_batch and not self.antrian.empty():
+                batch.append(self.antrian.get_nowait())
+
+            try:
+                hasil = await loop.run_in_executor(self.executor, self.proses, [b for b, _ in batch])
+            except Exception as e:
+                logging.error(f"Listener IoT: batch {len(batch)} pembacaan gagal disimpan: {e}")
+                self.statistik["gagal"] += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                self.statistik["batch"] += 1
+                self.statistik["diterima"] += hasil["diterima"]
+                self.statistik["duplikat"] += hasil["duplikat"]
+                self.statistik["ditolak"] += len(hasil["ditolak"])
+                ditolak = {(d["device_id"], d["seq"]): d["error"] for d in hasil["ditolak"]}
+                for b, future in batch:
+                    if future.done():
+                        continue
+                    error = ditolak.get((b["device_id"], b["seq"]))
+                    if error:
+                        future.set_exception(ValueError(error))
+                    else:
+                        future.set_result(True)
+
+    async def laporan(self, interval):
+        sebelum, waktu = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            sekarang = time.monotonic()
+            s = self.statistik
+            print(f"  {s['koneksi']} koneksi, "
+                  f"{(s['diterima'] - sebelum) / (sekarang - waktu):.0f} pembacaan/detik, "
+                  f"{s['diterima']} diterima, {s['duplikat']} duplikat, "
+                  f"{s['ditolak'] + s['gagal']} ditolak/gagal, antrian {self.antrian.qsize()}", flush=True)
+            sebelum, waktu = s["diterima"], sekarang
+
+    async def jalankan(self, host, tcp_port, udp_port, interval_laporan=10, siap=None):
+        loop = asyncio.get_running_loop()
+        tugas = [asyncio.create_task(self.batcher())]
+        if interval_laporan:
+            tugas.append(asyncio.create_task(self.laporan(interval_laporan)))
+
+        server = transport = None
+        if tcp_port is not None:
+            server = await asyncio.start_server(self.tangani_tcp, host, tcp_port, limit=MAKS_BARIS, backlog=4096)
+            print(f"✅ TCP  {', '.join(str(s.getsockname()) for s in server.sockets)}", flush=True)
+        if udp_port is not None:
+            transport, _ = await loop.create_datagram_endpoint(lambda: ProtokolUDP(self),
+                                                               local_addr=(host, udp_port))
+            print(f"✅ UDP  {transport.get_extra_info('sockname')}", flush=True)
+        if siap:
+            siap(server, transport)
+
+        try:
+            await asyncio.gather(*tugas)
+        finally:
+            if server:
+                server.close()
+            if transport:
+                transport.close()
+            self.executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Listener TCP/UDP untuk pembacaan sensor IoT")
+    parser.add_argument("--host", default=None, help="Alamat bind (default: IOT_LISTENER_HOST)")
+    parser.add_argument("--tcp-port", type=int, default=None,
+                        help="Port TCP, 0 = nonaktif (default: IOT_LISTENER_TCP_PORT)")
+    parser.add_argument("--udp-port", type=int, default=None,
+                        help="Port UDP, 0 = nonaktif (default: IOT_LISTENER_UDP_PORT)")
+    parser.add_argument("--batch", type=int, default=None,
+                        help="Maksimum pembacaan per transaksi (default: IOT_LISTENER_BATCH)")
+    parser.add_argument("--flush-ms", type=float, default=None,
+                        help="Waktu tunggu batch (default: IOT_LISTENER_FLUSH_MS)")
+    parser.add_argument("--laporan", type=float, default=10, help="Interval laporan statistik (detik, 0 = nonaktif)")
+    args = parser.parse_args(argv)
+
+    from .. import create_app
+
+    app = create_app()
+    config = app.config
+    host = args.host or config.get("IOT_LISTENER_HOST", "0.0.0.0")
+    tcp_port = args.tcp_port if args.tcp_port is not None else config.get("IOT_LISTENER_TCP_PORT", 7070)
+    udp_port = args.udp_port if args.udp_port is not None else config.get("IOT_LISTENER_UDP_PORT", 7071)
+    listener_kwargs = {
+        "maks_batch": args.batch or config.get("IOT_LISTENER_BATCH", 500),
+        "jeda_flush": (args.flush_ms if args.flush_ms is not None
+                       else config.get("IOT_LISTENER_FLUSH_MS", 50)) / 1000,
+    }
+
+    print(f"Batas file descriptor: {naikkan_batas_file()}")
+
+    async def mulai():
+        listener = Listener(app, **listener_kwargs)
+        await listener.jalankan(host, tcp_port or None, udp_port or None, interval_laporan=args.laporan)
+
+    try:
+        asyncio.run(mulai())
+    except KeyboardInterrupt:
+        print("Listener dihentikan")
+
+
+if __name__ == "__main__":
+    main()
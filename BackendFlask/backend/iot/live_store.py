@@ -0,0 +1,454 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+# ==========================================================
+# ✅ PENYIMPANAN PEMBACAAN IoT TERBARU (bersama antar worker gunicorn)
+# ==========================================================
+# Kunci:
+#   terbaru               -> pembacaan terakhir dari perangkat mana pun (perilaku lama /latest-json)
+#   device:<id>           -> pembacaan terakhir satu perangkat
+#   pengukuran:<id>       -> pembacaan terakhir untuk satu pengukuran
+#   tanpa_pengukuran      -> pembacaan terakhir yang tidak terikat ke pengukuran mana pun (firmware
+#                            lama tanpa id_pengukuran / binding); halaman pengukuran ikut menampilkannya
+#   binding:<id>          -> sesi (id_anak, id_pengukuran) yang sedang memakai perangkat (lihat devices.py)
+# Setiap entri punya TTL; entri kedaluwarsa dianggap tidak ada.
+# Setiap penulisan mendapat nomor `seq` global yang naik terus (dipakai sebagai id event SSE).
+# Store juga mencatat pasangan (perangkat, seq perangkat) yang sudah diterima /iot/ingest
+# agar batch yang dikirim ulang firmware tidak diproses dua kali.
+# eksklusif(...) = lock bernama antar worker untuk read-modify-write (jendela stabilisasi).
+
+KUNCI_TERBARU = "terbaru"
+KUNCI_TANPA_PENGUKURAN = "tanpa_pengukuran"
+
+
+class LiveStore(ABC):
+    """
+    Antarmuka: set_many/get dengan TTL (detik). Nilai berupa dict yang bisa di-JSON-kan.
+    set_many menambahkan `seq` ke setiap nilai dan mengembalikannya.
+    """
+
+    POLL = 0.2  # interval cek store saat menunggu pembacaan baru dari worker lain (detik)
+    LOCK_LEASE = 10  # detik; lock milik worker yang mati dilepas otomatis setelah ini
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._berubah = threading.Condition()
+
+    @abstractmethod
+    def set_many(self, items, ttl=None):
+        """Tulis beberapa kunci sekaligus; mengembalikan seq penulisan ini"""
+
+    @abstractmethod
+    def get(self, kunci):
+        """Nilai kunci, atau None jika tidak ada / kedaluwarsa"""
+
+    def set(self, kunci, data, ttl=None):
+        return self.set_many({kunci: data}, ttl)
+
+    @abstractmethod
+    def delete(self, kunci):
+        """Hapus kunci (tidak error jika tidak ada)"""
+
+    def get_many(self, daftar_kunci):
+        """{kunci: nilai} untuk kunci yang ada"""
+        hasil = {}
+        for kunci in daftar_kunci:
+            data = self.get(kunci)
+            if data is not None:
+                hasil[kunci] = data
+        return hasil
+
+    @abstractmethod
+    def saring_baru(self, pasangan, ttl):
+        """Tandai pasangan (device_id, seq) sebagai sudah diterima; kembalikan set pasangan yang belum pernah ada"""
+
+    @abstractmethod
+    def lupakan(self, pasangan):
+        """Batalkan saring_baru (mis. transaksi database gagal) agar kiriman ulang diterima lagi"""
+
+    @abstractmethod
+    def _ambil_lock(self, kunci, token, lease):
+        """Ambil lock bernama jika bebas atau kedaluwarsa (atomik); True jika berhasil"""
+
+    @abstractmethod
+    def _lepas_lock(self, kunci, token):
+        """Lepas lock hanya jika masih dipegang token ini"""
+
+    @contextmanager
+    def eksklusif(self, daftar_kunci, timeout=5):
+        """
+        Lock antar worker selama blok berjalan. Kunci diambil berurutan agar dua pemanggil
+        dengan kunci yang beririsan tidak saling mengunci; TimeoutError jika tidak didapat.
+        """
+        token = uuid.uuid4().hex
+        batas = time.monotonic() + timeout
+        diambil = []
+        try:
+            for kunci in sorted(set(daftar_kunci)):
+                while not self._ambil_lock(kunci, token, self.LOCK_LEASE):
+                    if time.monotonic() >= batas:
+                        raise TimeoutError(f"Lock live store '{kunci}' tidak didapat dalam {timeout} detik")
+                    time.sleep(0.005)
+                diambil.append(kunci)
+            yield
+        finally:
+            for kunci in reversed(diambil):
+                self._lepas_lock(kunci, token)
+
+    def _beri_tahu(self):
+        """Bangunkan subscriber di proses ini tanpa menunggu interval poll"""
+        with self._berubah:
+            self._berubah.notify_all()
+
+    def terbaru_dari(self, daftar_kunci):
+        """Nilai dengan seq terbesar di antara beberapa kunci (satu baca store), atau None"""
+        ada = self.get_many(daftar_kunci).values()
+        return max(ada, key=lambda d: d.get("seq", 0), default=None)
+
+    def tunggu(self, daftar_kunci, setelah_seq, timeout):
+        """Nilai terbaru dari kunci-kunci ini dengan seq > setelah_seq, atau None sampai timeout"""
+        batas = time.monotonic() + timeout
+        while True:
+            data = self.terbaru_dari(daftar_kunci)
+            if data and data.get("seq", 0) > setelah_seq:
+                return data
+            sisa = batas - time.monotonic()
+            if sisa <= 0:
+                return None
+            with self._berubah:
+                self._berubah.wait(min(sisa, self.POLL))
+
+
+class MemoryLiveStore(LiveStore):
+    """Hanya untuk satu proses (development / test): dict biasa + lock"""
+
+    BERSIHKAN_SETIAP = 500  # hapus entri kedaluwarsa setiap N penulisan
+
+    def __init__(self, ttl=300):
+        super().__init__(ttl)
+        self._data = {}
+        self._terlihat = {}  # (device_id, seq) -> kedaluwarsa
+        self._lock_nama = {}  # kunci -> (token, kedaluwarsa)
+        self._seq = 0
+        self._tulis = 0
+        self._lock = threading.Lock()
+
+    def _bersihkan_berkala(self):
+        """Dipanggil di dalam lock setiap penulisan; kunci/pasangan yang tidak pernah dibaca lagi ikut terhapus"""
+        self._tulis += 1
+        if self._tulis % self.BERSIHKAN_SETIAP:
+            return
+        sekarang = time.time()
+        self._data = {k: v for k, v in self._data.items() if v[0] > sekarang}
+        self._terlihat = {p: t for p, t in self._terlihat.items() if t > sekarang}
+
+    def set_many(self, items, ttl=None):
+        kedaluwarsa = time.time() + (ttl or self.ttl)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            for kunci, data in items.items():
+                self._data[kunci] = (kedaluwarsa, {**data, "seq": seq})
+            self._bersihkan_berkala()
+        self._beri_tahu()
+        return seq
+
+    def get(self, kunci):
+        with self._lock:
+            entri = self._data.get(kunci)
+            if entri and entri[0] <= time.time():
+                del self._data[kunci]
+                entri = None
+        return entri[1] if entri else None
+
+    def delete(self, kunci):
+        with self._lock:
+            self._data.pop(kunci, None)
+
+    def saring_baru(self, pasangan, ttl):
+        sekarang = time.time()
+        baru = set()
+        with self._lock:
+            for p in pasangan:
+                if self._terlihat.get(p, 0) <= sekarang:
+                    self._terlihat[p] = sekarang + ttl
+                    baru.add(p)
+            self._bersihkan_berkala()
+        return baru
+
+    def lupakan(self, pasangan):
+        with self._lock:
+            for p in pasangan:
+                self._terlihat.pop(p, None)
+
+    def _ambil_lock(self, kunci, token, lease):
+        sekarang = time.time()
+        with self._lock:
+            pemegang = self._lock_nama.get(kunci)
+            if pemegang and pemegang[1] > sekarang:
+                return False
+            self._lock_nama[kunci] = (token, sekarang + lease)
+            return True
+
+    def _lepas_lock(self, kunci, token):
+        with self._lock:
+            if self._lock_nama.get(kunci, (None,))[0] == token:
+                del self._lock_nama[kunci]
+
+
+class SQLiteLiveStore(LiveStore):
+    """
+    Satu host: file SQLite mode WAL yang dibagi semua worker.
+    Baca = satu lookup primary key; pembaca tidak terblokir oleh penulis (WAL).
+    """
+
+    BERSIHKAN_SETIAP = 500  # hapus entri kedaluwarsa setiap N penulisan
+
+    def __init__(self, path, ttl=300):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._tulis = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS live_reading ("
+            " kunci TEXT PRIMARY KEY, data TEXT NOT NULL, kedaluwarsa REAL NOT NULL)"
+        )
+        # AUTOINCREMENT: nomor seq tidak pernah dipakai ulang walaupun baris lama dihapus
+        conn.execute("CREATE TABLE IF NOT EXISTS live_seq (seq INTEGER PRIMARY KEY AUTOINCREMENT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS live_seen ("
+            " device_id TEXT NOT NULL, seq INTEGER NOT NULL, kedaluwarsa REAL NOT NULL,"
+            " PRIMARY KEY (device_id, seq)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS live_lock ("
+            " kunci TEXT PRIMARY KEY, token TEXT NOT NULL, kedaluwarsa REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit; busy_timeout agar penulis bersamaan antar worker saling menunggu, bukan error
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set_many(self, items, ttl=None):
+        kedaluwarsa = time.time() + (ttl or self.ttl)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute("INSERT INTO live_seq DEFAULT VALUES").lastrowid
+            conn.executemany(
+                "INSERT OR REPLACE INTO live_reading (kunci, data, kedaluwarsa) VALUES (?, ?, ?)",
+                [(k, json.dumps({**v, "seq": seq}, default=str), kedaluwarsa) for k, v in items.items()],
+            )
+        self._tulis += 1
+        if self._tulis % self.BERSIHKAN_SETIAP == 0:
+            conn.execute("DELETE FROM live_reading WHERE kedaluwarsa <= ?", (time.time(),))
+            conn.execute("DELETE FROM live_seq WHERE seq < ?", (seq,))
+            conn.execute("DELETE FROM live_seen WHERE kedaluwarsa <= ?", (time.time(),))
+        self._beri_tahu()
+        return seq
+
+    def get(self, kunci):
+        row = self._conn().execute(
+            "SELECT data FROM live_reading WHERE kunci = ? AND kedaluwarsa > ?", (kunci, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, kunci):
+        self._conn().execute("DELETE FROM live_reading WHERE kunci = ?", (kunci,))
+
+    def get_many(self, daftar_kunci):
+        daftar_kunci = list(daftar_kunci)
+        hasil, sekarang, conn = {}, time.time(), self._conn()
+        for i in range(0, len(daftar_kunci), 500):  # batas jumlah parameter SQLite
+            bagian = daftar_kunci[i:i + 500]
+            rows = conn.execute(
+                f"SELECT kunci, data FROM live_reading WHERE kunci IN ({','.join('?' * len(bagian))})"
+                " AND kedaluwarsa > ?", (*bagian, sekarang)
+            )
+            hasil.update((k, json.loads(d)) for k, d in rows)
+        return hasil
+
+    def saring_baru(self, pasangan, ttl):
+        sekarang = time.time()
+        conn = self._conn()
+        baru = set()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for device_id, seq in pasangan:
+                # baris baru, atau baris lama yang sudah kedaluwarsa -> dihitung sebagai baru
+                cur = conn.execute(
+                    "INSERT INTO live_seen (device_id, seq, kedaluwarsa) VALUES (?, ?, ?)"
+                    " ON CONFLICT (device_id, seq) DO UPDATE SET kedaluwarsa = excluded.kedaluwarsa"
+                    " WHERE live_seen.kedaluwarsa <= ?",
+                    (device_id, seq, sekarang + ttl, sekarang),
+                )
+                if cur.rowcount:
+                    baru.add((device_id, seq))
+        return baru
+
+    def lupakan(self, pasangan):
+        conn = self._conn()
+        with conn:
+            conn.executemany("DELETE FROM live_seen WHERE device_id = ? AND seq = ?", list(pasangan))
+
+    def _ambil_lock(self, kunci, token, lease):
+        sekarang = time.time()
+        # satu statement (atomik): baris baru, atau ambil alih lock yang sudah kedaluwarsa
+        cur = self._conn().execute(
+            "INSERT INTO live_lock (kunci, token, kedaluwarsa) VALUES (?, ?, ?)"
+            " ON CONFLICT (kunci) DO UPDATE SET token = excluded.token, kedaluwarsa = excluded.kedaluwarsa"
+            " WHERE live_lock.kedaluwarsa <= ?",
+            (kunci, token, sekarang + lease, sekarang),
+        )
+        return cur.rowcount == 1
+
+    def _lepas_lock(self, kunci, token):
+        self._conn().execute("DELETE FROM live_lock WHERE kunci = ? AND token = ?", (kunci, token))
+
+
+class RedisLiveStore(LiveStore):
+    """Beberapa host: server ber-protokol Redis (Redis/Valkey/KeyDB), TTL memakai SET ... EX"""
+
+    # hapus lock hanya jika token masih sama (GET + DEL atomik di server)
+    LEPAS_LOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, ttl=300, prefix="balitacare:live:"):
+        super().__init__(ttl)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("LIVE_STORE=redis membutuhkan paket 'redis' (pip install redis)") from e
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def set_many(self, items, ttl=None):
+        seq = self.client.incr(self.prefix + "seq")
+        pipe = self.client.pipeline(transaction=False)
+        for kunci, data in items.items():
+            pipe.set(self.prefix + kunci, json.dumps({**data, "seq": seq}, default=str), ex=int(ttl or self.ttl))
+            pipe.publish(self.prefix + "update:" + kunci, seq)
+        pipe.execute()
+        return seq
+
+    def get(self, kunci):
+        nilai = self.client.get(self.prefix + kunci)
+        return json.loads(nilai) if nilai else None
+
+    def delete(self, kunci):
+        self.client.delete(self.prefix + kunci)
+
+    def get_many(self, daftar_kunci):
+        daftar_kunci = list(daftar_kunci)
+        if not daftar_kunci:
+            return {}
+        nilai = self.client.mget([self.prefix + k for k in daftar_kunci])
+        return {k: json.loads(v) for k, v in zip(daftar_kunci, nilai) if v}
+
+    def saring_baru(self, pasangan, ttl):
+        pasangan = list(pasangan)
+        pipe = self.client.pipeline(transaction=False)
+        for device_id, seq in pasangan:
+            pipe.set(f"{self.prefix}seen:{device_id}:{seq}", 1, nx=True, ex=int(ttl))
+        return {p for p, ok in zip(pasangan, pipe.execute()) if ok}
+
+    def lupakan(self, pasangan):
+        kunci = [f"{self.prefix}seen:{device_id}:{seq}" for device_id, seq in pasangan]
+        if kunci:
+            self.client.delete(*kunci)
+
+    def _ambil_lock(self, kunci, token, lease):
+        return bool(self.client.set(f"{self.prefix}lock:{kunci}", token, nx=True, px=int(lease * 1000)))
+
+    def _lepas_lock(self, kunci, token):
+        self.client.eval(self.LEPAS_LOCK, 1, f"{self.prefix}lock:{kunci}", token)
+
+    def tunggu(self, daftar_kunci, setelah_seq, timeout):
+        """Pub/sub: subscriber di host mana pun langsung bangun saat ada penulisan"""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(*(self.prefix + "update:" + k for k in daftar_kunci))
+            batas = time.monotonic() + timeout
+            while True:
+                # cek setelah subscribe agar penulisan di antara keduanya tidak terlewat
+                data = self.terbaru_dari(daftar_kunci)
+                if data and data.get("seq", 0) > setelah_seq:
+                    return data
+                sisa = batas - time.monotonic()
+                if sisa <= 0:
+                    return None
+                pubsub.get_message(timeout=sisa)
+        finally:
+            pubsub.close()
+
+
+def buat_live_store(app):
+    jenis = app.config.get("LIVE_STORE", "sqlite")
+    ttl = app.config.get("LIVE_STORE_TTL", 300)
+    if jenis == "memory":
+        return MemoryLiveStore(ttl)
+    if jenis == "sqlite":
+        path = app.config.get("LIVE_STORE_PATH") or os.path.join(app.instance_path, "live_store.sqlite3")
+        return SQLiteLiveStore(path, ttl)
+    if jenis == "redis":
+        return RedisLiveStore(app.config.get("LIVE_STORE_URL", "redis://localhost:6379/0"), ttl)
+    raise ValueError(f"LIVE_STORE tidak dikenal: {jenis}")
+
+
+def get_live_store():
+    """Satu store per app (disimpan di app.extensions)"""
+    app = current_app._get_current_object()
+    store = app.extensions.get("live_store")
+    if store is None:
+        store = app.extensions["live_store"] = buat_live_store(app)
+    return store
+
+
+# ==========================================================
+# ✅ FUNGSI BANTU UNTUK ROUTE
+# ==========================================================
+def simpan_pembacaan(data, id_pengukuran=None, device_id=None):
+    """Simpan satu pembacaan di kunci terbaru + per perangkat + per pengukuran (satu penulisan)"""
+    data = dict(data)
+    data.setdefault("diterima_at", time.time())
+    items = {KUNCI_TERBARU: data}
+    if device_id:
+        items[f"device:{device_id}"] = data
+    if id_pengukuran:
+        items[f"pengukuran:{id_pengukuran}"] = data
+    else:
+        items[KUNCI_TANPA_PENGUKURAN] = data
+    data["seq"] = get_live_store().set_many(items)
+    return data
+
+
+def kunci_pembacaan(id_pengukuran=None, device_id=None):
+    """
+    Kunci yang dipantau satu halaman. Halaman pengukuran juga menerima pembacaan yang tidak
+    terikat ke pengukuran mana pun, seperti /latest-json lama yang menampilkan perangkat apa saja.
+    """
+    if id_pengukuran:
+        return [f"pengukuran:{id_pengukuran}", KUNCI_TANPA_PENGUKURAN]
+    if device_id:
+        return [f"device:{device_id}"]
+    return [KUNCI_TERBARU]
+
+
+def baca_pembacaan(id_pengukuran=None, device_id=None):
+    """Pembacaan untuk pengukuran/perangkat tertentu, atau pembacaan terbaru jika tanpa filter"""
+    return get_live_store().terbaru_dari(kunci_pembacaan(id_pengukuran, device_id))
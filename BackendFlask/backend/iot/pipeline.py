@@ -0,0 +1,287 @@
+import math
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import bindparam
+
+from ..extensions import db
+from ..models import Pengukuran
+from ..analysis.scoring import jadwalkan_scoring
+from .live_store import get_live_store, simpan_pembacaan
+from .timeseries import tulis_mentah
+from .devices import cari_binding_banyak, segarkan
+from .stabilizer import kunci_status, langkah, muat_status, simpan_status
+
+# ==========================================================
+# ✅ PIPELINE PEMBACAAN SENSOR (dipakai /iot/ingest)
+# ==========================================================
+# Alur satu batch:
+#   validasi -> lengkapi id_pengukuran/jenis dari binding perangkat -> buang kiriman ulang (device_id, seq) -> stabilisasi (hanya nilai yang sudah tenang)
+#   -> satu transaksi (INSERT sensor_reading + UPDATE pengukuran, keduanya executemany)
+#   -> satu penulisan live store per pengukuran -> z-score pengukuran yang berubah dinilai di background
+
+# jenis pengukuran dari perangkat -> kolom Pengukuran
+KOLOM_JENIS = {
+    "kepala": "lingkar_kepala",
+    "lengan": "lingkar_lengan",
+    "tinggi": "tinggi_badan",
+    "berat": "berat_badan",
+}
+
+
+def parse_ts(ts):
+    """
+    Timestamp pembacaan -> epoch detik (UTC): epoch (angka) atau string ISO 8601; None = waktu terima.
+    ISO tanpa zona waktu dianggap UTC (bukan zona waktu server), sama dengan tulis_mentah.
+    """
+    if ts is None:
+        return time.time()
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return float(ts)
+    waktu = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    if waktu.tzinfo is None:
+        waktu = waktu.replace(tzinfo=timezone.utc)
+    return waktu.timestamp()
+
+
+def normalisasi_bacaan(item, default):
+    """Satu pembacaan mentah -> dict bersih; ValueError jika tidak valid"""
+    if not isinstance(item, dict):
+        raise ValueError("pembacaan harus berupa object")
+    device_id = item.get("device_id", default.get("device_id"))
+    if not device_id:
+        raise ValueError("device_id wajib diisi")
+
+    jenis = item.get("jenis")  # boleh kosong jika perangkat diikat dengan jenis_sensor
+    if jenis is not None and jenis not in KOLOM_JENIS:
+        raise ValueError(f"jenis harus salah satu dari {', '.join(KOLOM_JENIS)}")
+
+    seq = item.get("seq")
+    if isinstance(seq, bool) or not isinstance(seq, int) or seq < 0:
+        raise ValueError("seq harus bilangan bulat >= 0")
+
+    try:
+        nilai = float(item.get("nilai"))
+    except (TypeError, ValueError):
+        raise ValueError("nilai harus berupa angka")
+    if not math.isfinite(nilai):
+        raise ValueError("nilai harus berupa angka")
+
+    id_pengukuran = item.get("id_pengukuran", default.get("id_pengukuran"))
+    if id_pengukuran is not None:
+        try:
+            id_pengukuran = int(id_pengukuran)
+        except (TypeError, ValueError):
+            raise ValueError("id_pengukuran tidak valid")
+
+    return {
+        "device_id": str(device_id),
+        "seq": seq,
+        "ts": parse_ts(item.get("ts")),
+        "jenis": jenis,
+        "nilai": nilai,
+        "id_pengukuran": id_pengukuran,
+        "final": bool(item.get("final")),
+    }
+
+
+def normalisasi_batch(payload):
+    """
+    Terima `[bacaan, ...]` atau `{"device_id", "id_pengukuran"?, "readings": [...]}`.
+    Mengembalikan (bacaan valid, daftar penolakan {index, error}).
+    """
+    if isinstance(payload, list):
+        default, daftar = {}, payload
+    elif isinstance(payload, dict) and isinstance(payload.get("readings"), list):
+        default, daftar = payload, payload["readings"]
+    else:
+        raise ValueError("Format data salah, gunakan { 'device_id': ..., 'readings': [...] }")
+
+    bacaan, ditolak = [], []
+    for i, item in enumerate(daftar):
+        try:
+            bacaan.append(normalisasi_bacaan(item, default))
+        except ValueError as e:
+            ditolak.append({"index": i, "error": str(e)})
+    return bacaan, ditolak
+
+
+def terapkan_binding(bacaan):
+    """
+    Pembacaan tanpa id_pengukuran/jenis dilengkapi dari binding perangkat (satu baca store
+    per batch, tanpa query Pengukuran). Mengembalikan (bacaan valid, penolakan).
+    """
+    perlu = {b["device_id"] for b in bacaan if b["id_pengukuran"] is None or b["jenis"] is None}
+    binding = cari_binding_banyak(perlu)
+
+    valid, ditolak = [], []
+    for b in bacaan:
+        ikatan = binding.get(b["device_id"])
+        if ikatan:
+            if b["id_pengukuran"] is None:
+                b["id_pengukuran"] = ikatan["id_pengukuran"]
+                b["terikat"] = True  # pengukuran sudah dicek saat binding dibuat
+            if b["jenis"] is None:
+                b["jenis"] = ikatan.get("jenis")
+        if b["jenis"] is None:
+            ditolak.append({"device_id": b["device_id"], "seq": b["seq"],
+                            "error": "jenis tidak diketahui: kirim jenis atau ikat perangkat ke sesi"})
+        else:
+            valid.append(b)
+    segarkan(binding)
+    return valid, ditolak
+
+
+def buang_duplikat(bacaan):
+    """Hanya pembacaan yang (device_id, seq)-nya belum pernah diterima; dicatat di live store"""
+    ttl = current_app.config.get("INGEST_DEDUP_TTL", 86400)
+    baru = get_live_store().saring_baru([(b["device_id"], b["seq"]) for b in bacaan], ttl)
+
+    hasil = []
+    for b in bacaan:
+        pasangan = (b["device_id"], b["seq"])
+        if pasangan in baru:
+            baru.discard(pasangan)  # seq yang sama dua kali dalam satu batch
+            hasil.append(b)
+    return hasil
+
+
+def lupakan_bacaan(bacaan):
+    get_live_store().lupakan([(b["device_id"], b["seq"]) for b in bacaan])
+
+
+def nilai_terakhir(bacaan):
+    """{(id_pengukuran, kolom): bacaan terbaru menurut (ts, seq)}"""
+    terakhir = {}
+    for b in bacaan:
+        kunci = (b["id_pengukuran"], KOLOM_JENIS[b["jenis"]])
+        lama = terakhir.get(kunci)
+        if lama is None or (b["ts"], b["seq"]) >= (lama["ts"], lama["seq"]):
+            terakhir[kunci] = b
+    return terakhir
+
+
+def stabilkan(bacaan):
+    """
+    Jalankan pembacaan (urut waktu) melalui jendela stabilisasi.
+    Mengembalikan ({(id_pengukuran, kolom): bacaan dengan nilai stabil}, status jendela).
+    Setiap bacaan mendapat flag `stabil` untuk live store.
+    """
+    kunci = [kunci_status(b["device_id"], b["id_pengukuran"], b["jenis"]) for b in bacaan]
+    semua_status = muat_status(set(kunci))
+    terakhir = {}
+    for k, b in zip(kunci, bacaan):
+        status = semua_status[k]
+        nilai = langkah(status, b["nilai"], b["ts"], b["jenis"], final=b.get("final"))
+        b["stabil"] = status["stabil"]
+        if nilai is not None:
+            terakhir[(b["id_pengukuran"], KOLOM_JENIS[b["jenis"]])] = {**b, "nilai": nilai}
+    return terakhir, semua_status
+
+
+def simpan_bacaan(bacaan, mentah=None):
+    """
+    Tulis pembacaan yang terikat ke Pengukuran yang ada. Dengan STABIL_AKTIF hanya nilai
+    yang sudah stabil yang ditulis; tanpa itu nilai terakhir per kolom.
+    Semua sampel (`mentah`, default = bacaan) masuk sensor_reading di transaksi yang sama.
+    """
+    bacaan = sorted(bacaan, key=lambda b: (b["ts"], b["seq"]))
+    if current_app.config.get("STABIL_AKTIF", True):
+        # jendela = baca-ubah-tulis di live store bersama: request lain untuk jendela yang sama
+        # (worker/thread lain) menunggu sampai status ini disimpan, jadi tidak ada sampel yang hilang
+        jendela = {kunci_status(b["device_id"], b["id_pengukuran"], b["jenis"]) for b in bacaan}
+        with get_live_store().eksklusif(jendela):
+            terakhir, semua_status = stabilkan(bacaan)
+            tulis_mentah(bacaan if mentah is None else mentah)
+            tulis_pengukuran(terakhir)
+            simpan_status(semua_status)  # setelah commit: jendela tidak mencatat nilai yang gagal ditulis
+    else:
+        terakhir = nilai_terakhir(bacaan)
+        tulis_mentah(bacaan if mentah is None else mentah)
+        tulis_pengukuran(terakhir)
+    jadwalkan_scoring({id_pengukuran for id_pengukuran, _ in terakhir})
+    return terakhir
+
+
+def tulis_pengukuran(terakhir):
+    """Satu transaksi: satu UPDATE executemany per kolom yang berubah"""
+    per_kolom = {}
+    for (id_pengukuran, kolom), b in terakhir.items():
+        per_kolom.setdefault(kolom, []).append({"b_id": id_pengukuran, "b_nilai": b["nilai"]})
+
+    tabel = Pengukuran.__table__
+    for kolom, params in per_kolom.items():
+        stmt = (
+            tabel.update()
+            .where(tabel.c.id_pengukuran == bindparam("b_id"))
+            .values({kolom: bindparam("b_nilai")})
+        )
+        db.session.execute(stmt, params)
+    db.session.commit()
+
+
+def data_live(b):
+    return {
+        "nilai": b["nilai"],
+        "jenis": b["jenis"],
+        "ts": b["ts"],
+        "seq_perangkat": b["seq"],
+        "stabil": b.get("stabil"),
+    }
+
+
+def proses_tunggal(bacaan):
+    """Satu pembacaan tanpa dedup (endpoint per sampel). Mengembalikan (tersimpan?, data live)."""
+    tersimpan = bool(simpan_bacaan([bacaan]))
+    data = simpan_pembacaan({**data_live(bacaan), "tersimpan": tersimpan},
+                            id_pengukuran=bacaan["id_pengukuran"], device_id=bacaan["device_id"])
+    return tersimpan, data
+
+
+def proses_batch(bacaan):
+    """
+    Proses pembacaan yang sudah dinormalisasi. Pembacaan tanpa id_pengukuran (atau dengan
+    id yang tidak ada) dan tanpa binding hanya diteruskan ke live store per perangkat.
+    """
+    bacaan, ditolak = terapkan_binding(bacaan)
+    baru = buang_duplikat(bacaan)
+
+    ids = {b["id_pengukuran"] for b in baru if b["id_pengukuran"] is not None and not b.get("terikat")}
+    ada = set()
+    if ids:
+        ada = set(db.session.scalars(
+            db.select(Pengukuran.id_pengukuran).where(Pengukuran.id_pengukuran.in_(ids))
+        ))
+    for b in baru:
+        if not b.get("terikat") and b["id_pengukuran"] not in ada:
+            b["id_pengukuran"] = None
+    tersimpan = [b for b in baru if b["id_pengukuran"] is not None]
+
+    try:
+        terakhir = simpan_bacaan(tersimpan, mentah=baru)
+    except Exception:
+        db.session.rollback()
+        lupakan_bacaan(baru)  # kiriman ulang firmware harus diterima lagi
+        raise
+
+    # live store: pembacaan terbaru per pengukuran, lalu per perangkat yang belum tercakup
+    live = {}
+    for b in baru:
+        kunci = ("pengukuran", b["id_pengukuran"]) if b["id_pengukuran"] else ("device", b["device_id"])
+        lama = live.get(kunci)
+        if lama is None or (b["ts"], b["seq"]) >= (lama["ts"], lama["seq"]):
+            live[kunci] = b
+    for b in live.values():
+        simpan_pembacaan(data_live(b), id_pengukuran=b["id_pengukuran"], device_id=b["device_id"])
+
+    return {
+        "diterima": len(baru),
+        "duplikat": len(bacaan) - len(baru),
+        "tanpa_pengukuran": len(baru) - len(tersimpan),
+        "ditolak": ditolak,
+        "diperbarui": [
+            {"id_pengukuran": id_pengukuran, "kolom": kolom, "nilai": b["nilai"]}
+            for (id_pengukuran, kolom), b in sorted(terakhir.items())
+        ],
+    }
@@ -1,15 +1,25 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, current_app, Response, stream_with_context
 from ..extensions import db
-from ..models import Pengukuran, Anak, OrangTua, Perawat
-from ..analysis.predict import assess_child_growth
-from datetime import datetime,date
-from ..ai_integration import analyze_with_gemini
+from ..models import Pengukuran, Anak, OrangTua, Perawat, AnalisisJob, SensorReading, Device
+from ..analysis.lms import get_engine
+from ..analysis.scoring import jadwalkan_scoring, jadwalkan_scoring_anak, nilai_pengukuran, skor_tertunda
+from ..shared.umur import hitung_umur_bulan, umur_bulan_pengukuran
+from datetime import datetime, date, timedelta
+import json
+import threading
+import time
+from ..ai_jobs import minta_analisis
+from ..ai_integration import gemini_metrics, gemini_tersedia, stream_with_gemini, nama_model, GeminiError
+from ..ai_cache import kunci_analisis, cari_analisis, simpan_analisis
+from ..ai_prompts import siapkan_prompt, hasil_tersimpan
+from ..ai_parser import parse_gemini_response
+from .live_store import simpan_pembacaan, baca_pembacaan, kunci_pembacaan, get_live_store
+from .timeseries import rollup_untuk
+from .pipeline import KOLOM_JENIS, normalisasi_batch, normalisasi_bacaan, proses_batch, proses_tunggal
+from .devices import ikat, lepas, cari_binding, cari_binding_banyak, segarkan
 
 iot_bp = Blueprint("iot", __name__, template_folder="../templates")
 
-# -------- VARIABEL GLOBAL UNTUK DATA POST TERBARU --------
-latest_data = None
-
 
 # ==========================================================
 # ✅ GUI FORM PENGUKURAN
@@ -86,11 +96,14 @@ def create_pengukuran():
     tanggal = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
 
     # 🔍 cek apakah sudah ada pengukuran untuk anak dan tanggal tersebut
+    # (rentang satu hari, bukan DATE(tanggal), agar index (id_anak, tanggal) terpakai)
+    awal_hari = datetime.combine(tanggal, datetime.min.time())
     existing = (
         Pengukuran.query
         .filter(
             Pengukuran.id_anak == id_anak,
-            db.func.date(Pengukuran.tanggal) == tanggal  # penting: ubah datetime ke date saat query
+            Pengukuran.tanggal >= awal_hari,
+            Pengukuran.tanggal < awal_hari + timedelta(days=1),
         )
         .first()
     )
@@ -122,7 +135,6 @@ def create_pengukuran():
 # ==========================================================
 @iot_bp.route("/update/<int:id_pengukuran>", methods=["POST"])
 def update_pengukuran_iot(id_pengukuran):
-    global latest_data
     data = request.get_json()
 
     if not data or "nilai" not in data:
@@ -132,25 +144,149 @@ def update_pengukuran_iot(id_pengukuran):
     if not peng:
         return jsonify({"error": "Pengukuran tidak ditemukan"}), 404
 
-    # Simpan nilai dari IoT (sementara di lingkar kepala)
-    nilai = float(data["nilai"])
-    latest_data = {"nilai": nilai}
-    peng.lingkar_kepala = nilai
-    db.session.commit()
+    # jenis default kepala (perilaku lama). Satu POST = satu nilai akhir seperti firmware lama,
+    # jadi langsung ditulis; firmware yang mengirim sampel beruntun memakai "final": false
+    # agar nilainya lewat jendela stabilisasi.
+    try:
+        bacaan = normalisasi_bacaan({**data, "jenis": data.get("jenis") or "kepala", "seq": 0,
+                                     "final": data.get("final", True)}, {
+            "device_id": f"pengukuran-{peng.id_pengukuran}",
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    bacaan["id_pengukuran"] = peng.id_pengukuran
+
+    tersimpan, latest_data = proses_tunggal(bacaan)
 
     return jsonify({
         "message": "Data berhasil diterima dari IoT",
         "id_pengukuran": peng.id_pengukuran,
+        "tersimpan": tersimpan,
+        "latest_data": latest_data
+    }), 200
+
+
+# ==========================================================
+# ✅ ENDPOINT UNTUK IOT (perangkat terikat: cukup device_id + nilai)
+# ==========================================================
+@iot_bp.route("/devices/<device_id>/reading", methods=["POST"])
+def device_reading(device_id):
+    """Pengukuran tujuan diambil dari binding perangkat (satu baca live store, tanpa query Pengukuran)"""
+    data = request.get_json(silent=True)
+    if not data or "nilai" not in data:
+        return jsonify({"error": "Format data salah, gunakan { 'nilai': number }"}), 400
+
+    binding = cari_binding(device_id)
+    if not binding:
+        return jsonify({"error": "Perangkat belum diikat ke sesi pengukuran"}), 409
+
+    # sama seperti /update: tanpa "final": false nilai langsung ditulis
+    try:
+        bacaan = normalisasi_bacaan({**data, "seq": 0, "final": data.get("final", True)}, {"device_id": device_id})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    bacaan["device_id"] = device_id
+    bacaan["id_pengukuran"] = binding["id_pengukuran"]
+    bacaan["jenis"] = bacaan["jenis"] or binding.get("jenis")
+    if not bacaan["jenis"]:
+        return jsonify({"error": "jenis wajib diisi untuk perangkat tanpa jenis_sensor"}), 400
+
+    tersimpan, latest_data = proses_tunggal(bacaan)
+    segarkan([device_id])
+
+    return jsonify({
+        "message": "Data berhasil diterima dari IoT",
+        "id_pengukuran": binding["id_pengukuran"],
+        "tersimpan": tersimpan,
         "latest_data": latest_data
     }), 200
 
 
+# ==========================================================
+# ✅ REGISTRI PERANGKAT + BINDING KE SESI PENGUKURAN (dipakai UI perawat)
+# ==========================================================
+def device_json(device, binding=None):
+    return {
+        "id_device": device.id_device,
+        "nama": device.nama,
+        "jenis_sensor": device.jenis_sensor,
+        "binding": binding,
+    }
+
+
+@iot_bp.route("/api/devices", methods=["GET"])
+def api_devices():
+    devices = Device.query.order_by(Device.nama).all()
+    binding = cari_binding_banyak(d.id_device for d in devices)
+    return jsonify([device_json(d, binding.get(d.id_device)) for d in devices])
+
+
+@iot_bp.route("/api/devices", methods=["POST"])
+def api_register_device():
+    data = request.get_json(silent=True) or {}
+    id_device = str(data.get("id_device") or "").strip()
+    if not id_device or not data.get("nama"):
+        return jsonify({"error": "id_device dan nama wajib diisi"}), 400
+    jenis_sensor = data.get("jenis_sensor") or None
+    if jenis_sensor and jenis_sensor not in KOLOM_JENIS:
+        return jsonify({"error": f"jenis_sensor harus salah satu dari {', '.join(KOLOM_JENIS)}"}), 400
+    if db.session.get(Device, id_device):
+        return jsonify({"error": "Perangkat sudah terdaftar"}), 409
+
+    device = Device(id_device=id_device, nama=data["nama"], jenis_sensor=jenis_sensor)
+    db.session.add(device)
+    db.session.commit()
+    return jsonify(device_json(device)), 201
+
+
+@iot_bp.route("/api/devices/<device_id>/bind", methods=["POST"])
+def api_bind_device(device_id):
+    device = db.session.get(Device, device_id)
+    if not device:
+        return jsonify({"error": "Perangkat tidak ditemukan"}), 404
+    data = request.get_json(silent=True) or {}
+    peng = db.session.get(Pengukuran, data.get("id_pengukuran")) if data.get("id_pengukuran") else None
+    if not peng:
+        return jsonify({"error": "Pengukuran tidak ditemukan"}), 404
+
+    return jsonify(device_json(device, ikat(device, peng))), 200
+
+
+@iot_bp.route("/api/devices/<device_id>/bind", methods=["DELETE"])
+def api_unbind_device(device_id):
+    lepas(device_id)
+    return jsonify({"message": "Binding perangkat dilepas"}), 200
+
+
+# ==========================================================
+# ✅ ENDPOINT UNTUK IOT (batch pembacaan sensor)
+# ==========================================================
+@iot_bp.route("/ingest", methods=["POST"])
+def ingest_batch():
+    """
+    Firmware menampung pembacaan lalu mengirim sekaligus:
+    { "device_id": "...", "id_pengukuran": 12,
+      "readings": [{ "seq": 1, "ts": 1700000000.5, "jenis": "kepala", "nilai": 45.2 }, ...] }
+    Kiriman ulang dengan (device_id, seq) yang sama diabaikan; batch disimpan dalam satu transaksi.
+    """
+    try:
+        bacaan, ditolak = normalisasi_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    batas = current_app.config.get("INGEST_MAX_BATCH", 1000)
+    if len(bacaan) + len(ditolak) > batas:
+        return jsonify({"error": f"Maksimal {batas} pembacaan per batch"}), 413
+
+    hasil = proses_batch(bacaan)
+    return jsonify({"message": "Batch diterima", **hasil, "ditolak": ditolak + hasil["ditolak"]}), 200
+
+
 # ==========================================================
 # ✅ SIMPAN DATA DARI FORM + IoT KE DATABASE
 # ==========================================================
 @iot_bp.route("/save-current", methods=["POST"])
 def save_current():
-    global latest_data
     id_anak = request.form.get("id_anak")
     jenis = request.form.get("jenis")
     id_pengukuran = request.form.get("id_pengukuran")
@@ -180,6 +316,7 @@ def save_current():
             peng.berat_badan = float(berat)
 
     db.session.commit()
+    jadwalkan_scoring([peng.id_pengukuran])
 
     return jsonify({
         "message": "Data berhasil disimpan",
@@ -192,33 +329,129 @@ def save_current():
 # ==========================================================
 @iot_bp.route("/post-display", methods=["GET", "POST"])
 def post_display():
-    global latest_data
     if request.method == "POST":
-        if request.is_json:
-            latest_data = request.get_json()
-        else:
-            latest_data = request.form.to_dict()
+        data = (request.get_json(silent=True) if request.is_json else request.form.to_dict()) or {}
+        id_pengukuran = data.get("id_pengukuran")
+        if not id_pengukuran and data.get("device_id"):
+            # firmware tanpa id_pengukuran: pakai sesi yang sedang diikat ke perangkat ini
+            binding = cari_binding(data["device_id"])
+            id_pengukuran = binding["id_pengukuran"] if binding else None
+        latest_data = simpan_pembacaan(data, id_pengukuran=id_pengukuran, device_id=data.get("device_id"))
         return jsonify({"message": "Data diterima", "data": latest_data}), 200
-    return render_template("post_display.html", data=latest_data)
+    return render_template("post_display.html", data=baca_pembacaan())
 
 
 @iot_bp.route("/latest-json", methods=["GET"])
 def latest_json():
-    global latest_data
+    # ?id_pengukuran= / ?device_id= untuk pembacaan tertentu; tanpa filter = pembacaan terbaru
+    latest_data = baca_pembacaan(id_pengukuran=request.args.get("id_pengukuran"),
+                                 device_id=request.args.get("device_id"))
     return jsonify(latest_data if latest_data else {})
 
 
 # ==========================================================
-# ✅ FUNGSI BANTU: HITUNG UMUR DALAM BULAN
+# ✅ BATAS STREAM SSE PER WORKER
 # ==========================================================
-def hitung_umur_bulan(tanggal_lahir):
-    today = datetime.today()
-    umur_tahun = today.year - tanggal_lahir.year
-    umur_bulan = today.month - tanggal_lahir.month
-    total_bulan = umur_tahun * 12 + umur_bulan
-    if today.day < tanggal_lahir.day:
-        total_bulan -= 1
-    return max(0, total_bulan)
+# Setiap stream memegang satu thread gthread selama terbuka. Dibatasi LIVE_STREAM_MAX per
+# proses agar sisa thread tetap melayani API biasa; di atas batas dibalas 503 dan frontend
+# kembali ke polling /latest-json.
+_slot_stream = None
+_slot_stream_lock = threading.Lock()
+
+
+def ambil_slot_stream():
+    """True jika masih ada slot stream; lepaskan dengan lepas_slot_stream setelah response ditutup"""
+    global _slot_stream
+    if _slot_stream is None:
+        with _slot_stream_lock:
+            if _slot_stream is None:
+                _slot_stream = threading.BoundedSemaphore(current_app.config.get("LIVE_STREAM_MAX", 8))
+    return _slot_stream.acquire(blocking=False)
+
+
+def lepas_slot_stream():
+    _slot_stream.release()
+
+
+def stream_penuh():
+    return jsonify({"error": "Terlalu banyak stream terbuka, gunakan polling"}), 503, {"Retry-After": "30"}
+
+
+def response_stream(generator):
+    """
+    Response SSE, atau 503 jika slot stream worker ini penuh. Slot diambil paling akhir,
+    setelah semua persiapan route, dan dilepas saat koneksi ditutup (selesai atau klien pergi).
+    """
+    response = Response(
+        stream_with_context(generator),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    if not ambil_slot_stream():
+        generator.close()
+        return stream_penuh()
+    response.call_on_close(lepas_slot_stream)
+    return response
+
+
+# ==========================================================
+# ✅ STREAM PEMBACAAN IoT (Server-Sent Events, pengganti polling /latest-json)
+# ==========================================================
+@iot_bp.route("/stream", methods=["GET"])
+@iot_bp.route("/stream/<int:id_pengukuran>", methods=["GET"])
+def stream_pembacaan(id_pengukuran=None):
+    """
+    Kirim event `reading` setiap ada pembacaan baru untuk pengukuran ini (termasuk pembacaan
+    perangkat yang tidak terikat ke pengukuran mana pun), atau ?device_id=, atau pembacaan
+    terbaru jika tanpa keduanya. Id event = seq pembacaan sehingga
+    EventSource yang tersambung ulang (header Last-Event-ID) tidak menerima data lama lagi.
+    Stream ditutup setelah LIVE_STREAM_MAX_DURATION detik; browser otomatis menyambung ulang.
+    Maksimal LIVE_STREAM_MAX stream per worker; selebihnya 503.
+    """
+    store = get_live_store()
+    kunci = kunci_pembacaan(id_pengukuran, request.args.get("device_id"))
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or "0"
+    seq_awal = int(last_id) if last_id.isdigit() else 0
+    heartbeat = current_app.config.get("LIVE_STREAM_HEARTBEAT", 15)
+    durasi_maks = current_app.config.get("LIVE_STREAM_MAX_DURATION", 300)
+
+    def generate():
+        seq, mulai = seq_awal, time.monotonic()
+        yield "retry: 2000\n\n"
+        while time.monotonic() - mulai < durasi_maks:
+            data = store.tunggu(kunci, seq, timeout=heartbeat)
+            if data:
+                seq = data["seq"]
+                yield f"id: {seq}\nevent: reading\ndata: {json.dumps(data, default=str)}\n\n"
+            else:
+                yield ": heartbeat\n\n"
+
+    return response_stream(generate())
+
+
+# ==========================================================
+# ✅ AUDIT PEMBACAAN SENSOR MENTAH SATU PENGUKURAN
+# ==========================================================
+@iot_bp.route("/api/pengukuran/<int:id_pengukuran>/sensor", methods=["GET"])
+def api_sensor_pengukuran(id_pengukuran):
+    """Ringkasan per jenis; ?raw=1 menyertakan sampel mentah (maksimal ?limit=, default 1000)"""
+    if not db.session.get(Pengukuran, id_pengukuran):
+        return jsonify({"error": "Pengukuran tidak ditemukan"}), 404
+
+    hasil = {"id_pengukuran": id_pengukuran, "rollup": rollup_untuk(id_pengukuran)}
+    if request.args.get("raw") == "1":
+        limit = min(request.args.get("limit", 1000, type=int), 10000)
+        rows = db.session.execute(
+            db.select(SensorReading.device_id, SensorReading.jenis, SensorReading.ts, SensorReading.nilai)
+            .where(SensorReading.id_pengukuran == id_pengukuran)
+            .order_by(SensorReading.ts)
+            .limit(limit)
+        ).all()
+        hasil["readings"] = [
+            {"device_id": r.device_id, "jenis": r.jenis, "ts": r.ts.isoformat(), "nilai": r.nilai}
+            for r in rows
+        ]
+    return jsonify(hasil)
 
 
 # ==========================================================
@@ -236,21 +469,11 @@ def analyze_anak(id_anak):
     if not peng:
         return jsonify({"error": "Belum ada data pengukuran"}), 400
 
-    umur_bulan = hitung_umur_bulan(anak.tanggal_lahir) if anak.tanggal_lahir else 0
+    # z-score dihitung saat pengukuran ditulis; di sini cukup dibaca
+    if skor_tertunda(anak, peng):
+        jadwalkan_scoring([peng.id_pengukuran])
 
-    # Konversi jenis kelamin agar cocok dengan standar WHO
-    sex = "Laki-Laki" if anak.jenis_kelamin in ["L", "l", "Laki-Laki"] else "Perempuan"
-
-    hasil = assess_child_growth(
-        sex=sex,
-        age_months=umur_bulan,
-        weight_kg=peng.berat_badan or 0,
-        height_cm=peng.tinggi_badan or 1,
-        head_circ=peng.lingkar_kepala or 0,
-        arm_circ=peng.lingkar_lengan or 0
-    )
-
-    return jsonify(hasil)
+    return jsonify(hasil_tersimpan(peng))
 
 
 # ==========================================================
@@ -270,48 +493,21 @@ def detail_pengukuran(id_anak):
         return render_template("detail_pengukuran.html", anak=anak, peng=None, error="Belum ada data pengukuran")
 
     umur_bulan = hitung_umur_bulan(anak.tanggal_lahir) if anak.tanggal_lahir else 0
-
-    hasil = assess_child_growth(
-        sex=anak.jenis_kelamin or "L",
-        age_months=umur_bulan,
-        weight_kg=peng.berat_badan or 0,
-        height_cm=peng.tinggi_badan or 1,
-        head_circ=peng.lingkar_kepala or 0,
-        arm_circ=peng.lingkar_lengan or 0
-    )
-
-    # ==============================
-    # 🔹 Siapkan nilai IMT manual (untuk dikirim ke AI)
-    imt = peng.berat_badan / ((peng.tinggi_badan / 100) ** 2) if peng.tinggi_badan else None
-    # ==============================
+    # z-score dihitung dengan umur pada tanggal pengukuran; prompt & cache memakai umur yang sama
+    umur_pengukuran = umur_bulan_pengukuran(anak, peng)
 
     # ======= Integrasi Gemini =======
-    prompt = f"""
-    Kamu adalah asisten ahli gizi anak.
-    Berdasarkan hasil analisis rule-based berikut, berikan interpretasi tambahan tentang perkembangan anak ini,
-    apakah perkembangannya baik, area mana yang perlu perhatian, dan saran pemantauan yang sesuai, singkat saja, buat dalam bentuk paragraf
-
-    Data Anak:
-    - Nama: {anak.nama}
-    - Jenis Kelamin: {anak.jenis_kelamin}
-    - Umur: {umur_bulan} bulan
-    - Berat Badan: {peng.berat_badan or '-'} kg
-    - Tinggi Badan: {peng.tinggi_badan or '-'} cm
-    - IMT: {round(imt, 2) if imt else '-'}
-    - Lingkar Kepala: {peng.lingkar_kepala or '-'} cm
-    - Lingkar Lengan: {peng.lingkar_lengan or '-'} cm
-
-    Hasil Rule-based:
-    - BB/U: {hasil.get('BB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', '-')})
-    - TB/U: {hasil.get('TB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', '-')})
-    - IMT/U: {hasil.get('IMT/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', '-')})
-    - LK/U: {hasil.get('LK/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', '-')})
-    - LILA/U: {hasil.get('LILA/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', '-')})
-
-    Jawab dalam bahasa Indonesia secara singkat, dengan nada ramah dan mudah dipahami orang tua.
-    """
-
-    ai_analysis = analyze_with_gemini(prompt)
+    hasil, imt, prompt = siapkan_prompt("detail", anak, peng, umur_pengukuran)
+
+    # Pakai analisis tersimpan jika ada; selain itu Gemini dijalankan di background
+    # dan halaman mengambil hasilnya lewat status_url. Selama z-score belum tersimpan
+    # Gemini belum dipanggil (prompt tanpa z-score tidak berguna).
+    cached = ai_job = None
+    if skor_tertunda(anak, peng):
+        jadwalkan_scoring([peng.id_pengukuran])
+    else:
+        cached, ai_job = minta_analisis(prompt, "detail", anak, peng, hasil, umur_pengukuran)
+    ai_analysis = cached.hasil_raw if cached else None
     # =================================
 
     return render_template(
@@ -320,7 +516,9 @@ def detail_pengukuran(id_anak):
         peng=peng,
         hasil=hasil,
         ai_analysis=ai_analysis,
-        umur_bulan=umur_bulan
+        ai_job=ai_job,
+        umur_bulan=umur_bulan,
+        umur_pengukuran=umur_pengukuran
     )
 
 @iot_bp.route("/api/pengukuran/detail/<int:id_anak>", methods=["GET"])
@@ -338,47 +536,20 @@ def api_detail_pengukuran(id_anak):
             return jsonify({"error": "Belum ada data pengukuran"}), 404
 
         umur_bulan = hitung_umur_bulan(anak.tanggal_lahir) if anak.tanggal_lahir else 0
+        umur_pengukuran = umur_bulan_pengukuran(anak, peng)
 
-        hasil = assess_child_growth(
-            sex=anak.jenis_kelamin or "L",
-            age_months=umur_bulan,
-            weight_kg=peng.berat_badan or 0,
-            height_cm=peng.tinggi_badan or 1,
-            head_circ=peng.lingkar_kepala or 0,
-            arm_circ=peng.lingkar_lengan or 0
-        )
+        hasil, imt, prompt = siapkan_prompt("ringkas", anak, peng, umur_pengukuran)
 
-        imt = peng.berat_badan / ((peng.tinggi_badan / 100) ** 2) if peng.tinggi_badan else None
-
-        # panggil Gemini AI untuk tambahan analisis
-        prompt = f"""
-        Kamu adalah asisten ahli gizi anak.
-        Berdasarkan hasil analisis rule-based berikut, berikan interpretasi tambahan singkat tentang perkembangan anak ini.
-
-        Data Anak:
-        - Nama: {anak.nama}
-        - Jenis Kelamin: {anak.jenis_kelamin}
-        - Umur: {umur_bulan} bulan
-        - Berat Badan: {peng.berat_badan or '-'} kg
-        - Tinggi Badan: {peng.tinggi_badan or '-'} cm
-        - IMT: {round(imt, 2) if imt else '-'}
-        - Lingkar Kepala: {peng.lingkar_kepala or '-'} cm
-        - Lingkar Lengan: {peng.lingkar_lengan or '-'} cm
-
-        Hasil Rule-based:
-        - BB/U: {hasil.get('BB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', '-')})
-        - TB/U: {hasil.get('TB/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', '-')})
-        - IMT/U: {hasil.get('IMT/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', '-')})
-        - LK/U: {hasil.get('LK/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', '-')})
-        - LILA/U: {hasil.get('LILA/U', {}).get('kategori', '-')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', '-')})
-
-        Jawab singkat dalam bahasa Indonesia dengan nada ramah dan mudah dipahami.
-        """
-
-        ai_analysis_raw = analyze_with_gemini(prompt)
-        
-        # 🔥 PERUBAHAN: Parse response Gemini menjadi JSON terstruktur
-        ai_analysis_parsed = parse_gemini_response(ai_analysis_raw)
+        # Analisis tersimpan dipakai langsung; jika belum ada, Gemini berjalan di background
+        # dan hasil rule-based langsung dikirim. z-score yang belum tersimpan dijadwalkan
+        # (skor_tertunda=true), Gemini menunggu request berikutnya.
+        cached = ai_job = None
+        tertunda = skor_tertunda(anak, peng)
+        if tertunda:
+            jadwalkan_scoring([peng.id_pengukuran])
+        else:
+            cached, ai_job = minta_analisis(prompt, "ringkas", anak, peng, hasil, umur_pengukuran,
+                                            parser=parse_gemini_response)
 
         return jsonify({
             "anak": {
@@ -394,111 +565,42 @@ def api_detail_pengukuran(id_anak):
                 "tinggi_badan": peng.tinggi_badan,
                 "lingkar_kepala": peng.lingkar_kepala,
                 "lingkar_lengan": peng.lingkar_lengan,
-                "created_at": peng.created_at.strftime("%Y-%m-%d %H:%M:%S") if peng.created_at else None
+                "created_at": peng.created_at.strftime("%Y-%m-%d %H:%M:%S") if peng.created_at else None,
+                "umur_bulan": umur_pengukuran  # umur saat z-score di "hasil" dihitung
             },
             "hasil": hasil,
+            "skor_tertunda": tertunda,
             "imt": round(imt, 2) if imt else None,
-            "ai_analysis": ai_analysis_parsed  # 🔥 Response yang sudah diparsing
+            "ai_analysis": cached.hasil if cached else None,  # jika None, diisi frontend dari ai_job.status_url
+            "ai_job": ai_job
         }), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# ==========================================================
-# ✅ FUNGSI BARU: PARSE RESPONSE GEMINI MENJADI JSON
-# ==========================================================
-def parse_gemini_response(gemini_response):
+def siapkan_analisis_terstruktur(id_anak):
     """
-    Parse response Gemini AI menjadi format JSON yang terstruktur
-    untuk memudahkan parsing di frontend
+    Data pengukuran terbaru + prompt analisis terstruktur untuk satu anak.
+    Mengembalikan (anak, peng, umur_bulan, umur_pengukuran, hasil, imt, prompt) atau None jika
+    belum ada pengukuran. umur_bulan = umur hari ini, umur_pengukuran = umur saat z-score dihitung.
     """
-    try:
-        # Jika response sudah JSON, langsung return
-        if isinstance(gemini_response, dict):
-            return gemini_response
-            
-        response_text = str(gemini_response)
-        
-        # Coba parsing sebagai JSON jika mengandung struktur JSON
-        if "{" in response_text and "}" in response_text:
-            try:
-                # Cari bagian JSON dalam response
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_str = response_text[start_idx:end_idx]
-                    return json.loads(json_str)
-            except:
-                pass  # Jika gagal, lanjut ke parsing teks
-        
-        # Parsing manual berdasarkan pola umum
-        parsed_response = {
-            "status_perkembangan": "Normal",  # default
-            "analisis_umum": "",
-            "area_perhatian": [],
-            "rekomendasi": [],
-            "saran_pemantauan": "",
-            "ringkasan": response_text[:200] + "..." if len(response_text) > 200 else response_text
-        }
-        
-        # Analisis teks untuk menentukan status perkembangan
-        text_lower = response_text.lower()
-        
-        # Deteksi status perkembangan
-        if any(word in text_lower for word in ["sangat baik", "optimal", "ideal", "baik sekali"]):
-            parsed_response["status_perkembangan"] = "Sangat Baik"
-        elif any(word in text_lower for word in ["baik", "normal", "sesuai", "memadai"]):
-            parsed_response["status_perkembangan"] = "Baik"
-        elif any(word in text_lower for word in ["perhatian", "waspada", "hati-hati", "perlu monitoring"]):
-            parsed_response["status_perkembangan"] = "Perlu Perhatian"
-        elif any(word in text_lower for word in ["risiko", "kurang", "terhambat", "masalah"]):
-            parsed_response["status_perkembangan"] = "Berisiko"
-        
-        # Deteksi area perhatian
-        areas = []
-        if any(word in text_lower for word in ["berat badan", "bb/", "berat"]):
-            areas.append("Berat Badan")
-        if any(word in text_lower for word in ["tinggi badan", "tb/", "tinggi", "panjang badan"]):
-            areas.append("Tinggi Badan")
-        if any(word in text_lower for word in ["imt", "indeks massa tubuh", "kegemukan", "kurus"]):
-            areas.append("IMT (Indeks Massa Tubuh)")
-        if any(word in text_lower for word in ["lingkar kepala", "lk/", "kepala"]):
-            areas.append("Lingkar Kepala")
-        if any(word in text_lower for word in ["lingkar lengan", "lila", "lengan"]):
-            areas.append("Lingkar Lengan")
-        
-        parsed_response["area_perhatian"] = areas if areas else ["Tidak ada area khusus yang perlu perhatian"]
-        
-        # Deteksi rekomendasi
-        recommendations = []
-        if any(word in text_lower for word in ["nutrisi", "gizi", "makanan", "asupan"]):
-            recommendations.append("Perbaikan asupan nutrisi")
-        if any(word in text_lower for word in ["pemantauan", "monitoring", "kontrol"]):
-            recommendations.append("Pemantauan rutin")
-        if any(word in text_lower for word in ["konsultasi", "dokter", "ahli gizi"]):
-            recommendations.append("Konsultasi dengan ahli")
-        
-        parsed_response["rekomendasi"] = recommendations if recommendations else ["Teruskan pola asuh yang baik"]
-        
-        # Analisis umum (ambil 2-3 kalimat pertama)
-        sentences = [s.strip() for s in response_text.split('.') if s.strip()]
-        parsed_response["analisis_umum"] = '. '.join(sentences[:3]) + '.' if sentences else response_text
-        
-        # Saran pemantauan (ambil kalimat terakhir atau buat default)
-        parsed_response["saran_pemantauan"] = sentences[-1] + '.' if sentences else "Lakukan pemantauan rutin setiap bulan."
-        
-        return parsed_response
-        
-    except Exception as e:
-        # Fallback jika parsing gagal
-        return {
-            "status_perkembangan": "Tidak Dapat Dianalisis",
-            "analisis_umum": str(gemini_response),
-            "area_perhatian": ["Data tidak cukup untuk analisis"],
-            "rekomendasi": ["Konsultasi dengan ahli gizi"],
-            "saran_pemantauan": "Perlu data lebih lengkap untuk analisis yang akurat",
-            "ringkasan": str(gemini_response)[:150] + "..." if len(str(gemini_response)) > 150 else str(gemini_response)
-        }
+    anak = Anak.query.get_or_404(id_anak)
+    peng = (
+        Pengukuran.query
+        .filter_by(id_anak=id_anak)
+        .order_by(Pengukuran.created_at.desc(), Pengukuran.id_pengukuran.desc())
+        .first()
+    )
+
+    if not peng:
+        return None
+
+    umur_bulan = hitung_umur_bulan(anak.tanggal_lahir) if anak.tanggal_lahir else 0
+    umur_pengukuran = umur_bulan_pengukuran(anak, peng)
+
+    hasil, imt, prompt = siapkan_prompt("terstruktur", anak, peng, umur_pengukuran)
+    return anak, peng, umur_bulan, umur_pengukuran, hasil, imt, prompt
+
 
 # ==========================================================
 # ✅ API BARU: ANALISIS GEMINI SAJA (JSON RESPONSE)
@@ -509,86 +611,31 @@ def api_gemini_analysis(id_anak):
     Endpoint khusus untuk mendapatkan analisis Gemini dalam format JSON terstruktur
     """
     try:
-        anak = Anak.query.get_or_404(id_anak)
-        peng = (
-            Pengukuran.query
-            .filter_by(id_anak=id_anak)
-            .order_by(Pengukuran.created_at.desc(), Pengukuran.id_pengukuran.desc())
-            .first()
-        )
-
-        if not peng:
+        data = siapkan_analisis_terstruktur(id_anak)
+        if not data:
             return jsonify({"error": "Belum ada data pengukuran"}), 404
+        anak, peng, umur_bulan, umur_pengukuran, hasil, imt, prompt = data
 
-        umur_bulan = hitung_umur_bulan(anak.tanggal_lahir) if anak.tanggal_lahir else 0
-
-        hasil = {
-            "BB/U": {
-                "z_score": peng.z_bb,
-                "kategori": peng.kategori_bb
-            },
-            "TB/U": {
-                "z_score": peng.z_tb,
-                "kategori": peng.kategori_tb
-            },
-            "LK/U": {
-                "z_score": peng.z_lk,
-                "kategori": peng.kategori_lk
-            },
-            "LILA/U": {
-                "z_score": peng.z_lila,
-                "kategori": peng.kategori_lila
-            },
-            "IMT/U": {
-                "z_score": peng.z_imt,
-                "kategori": peng.kategori_imt
-            }
-        }
-
-        imt = peng.berat_badan / ((peng.tinggi_badan / 100) ** 2) if peng.tinggi_badan else None
-
-        # Prompt untuk Gemini
-        prompt = f"""
-        ANALISIS PERTUMBUHAN ANAK
-
-        DATA DASAR:
-        - Nama: {anak.nama}
-        - Usia: {umur_bulan} bulan
-        - Jenis Kelamin: {anak.jenis_kelamin}
-        
-        DATA PENGUKURAN:
-        - Berat Badan: {peng.berat_badan or 'Tidak ada'} kg
-        - Tinggi Badan: {peng.tinggi_badan or 'Tidak ada'} cm
-        - IMT: {round(imt, 2) if imt else 'Tidak dapat dihitung'}
-        - Lingkar Kepala: {peng.lingkar_kepala or 'Tidak ada'} cm
-        - Lingkar Lengan: {peng.lingkar_lengan or 'Tidak ada'} cm
-
-        HASIL ANALISIS STANDAR:
-        - BB/U: {hasil.get('BB/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('BB/U', {}).get('z_score', 'N/A')})
-        - TB/U: {hasil.get('TB/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('TB/U', {}).get('z_score', 'N/A')})
-        - IMT/U: {hasil.get('IMT/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('IMT/U', {}).get('z_score', 'N/A')})
-        - LK/U: {hasil.get('LK/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('LK/U', {}).get('z_score', 'N/A')})
-        - LILA/U: {hasil.get('LILA/U', {}).get('kategori', 'Tidak ada data')} (Z-Score: {hasil.get('LILA/U', {}).get('z_score', 'N/A')})
-
-        BERIKAN ANALISIS DALAM FORMAT YANG JELAS DAN TERSTRUKTUR:
-        1. Status perkembangan keseluruhan
-        2. Area yang memerlukan perhatian khusus
-        3. Rekomendasi tindakan
-        4. Saran pemantauan
-
-        Gunakan bahasa Indonesia yang mudah dipahami orang tua.
-        """
-
-        ai_analysis_raw = analyze_with_gemini(prompt)
-        ai_analysis_parsed = parse_gemini_response(ai_analysis_raw)
+        # z-score belum tersimpan: jadwalkan scoring, Gemini menunggu request berikutnya
+        cached = ai_job = None
+        tertunda = skor_tertunda(anak, peng)
+        if tertunda:
+            jadwalkan_scoring([peng.id_pengukuran])
+        else:
+            cached, ai_job = minta_analisis(prompt, "terstruktur", anak, peng, hasil, umur_pengukuran,
+                                            parser=parse_gemini_response)
 
         return jsonify({
             "success": True,
             "id_anak": id_anak,
             "nama_anak": anak.nama,
             "umur_bulan": umur_bulan,
+            "umur_bulan_pengukuran": umur_pengukuran,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "gemini_analysis": ai_analysis_parsed,
+            "hasil": hasil,
+            "skor_tertunda": tertunda,
+            "gemini_analysis": cached.hasil if cached else None,  # jika None, diisi dari ai_job.status_url
+            "ai_job": ai_job,
             "raw_data": {
                 "berat_badan": peng.berat_badan,
                 "tinggi_badan": peng.tinggi_badan,
@@ -596,7 +643,7 @@ def api_gemini_analysis(id_anak):
                 "lingkar_lengan": peng.lingkar_lengan,
                 "imt": round(imt, 2) if imt else None
             }
-        }), 200
+        }), 202 if ai_job or tertunda else 200
 
     except Exception as e:
         return jsonify({
@@ -606,6 +653,95 @@ def api_gemini_analysis(id_anak):
         }), 500
 
     
+# ==========================================================
+# ✅ API: STREAMING ANALISIS GEMINI (Server-Sent Events)
+# ==========================================================
+def sse(event, data):
+    """Format satu event Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@iot_bp.route("/api/gemini-analysis/<int:id_anak>/stream", methods=["GET"])
+def api_gemini_analysis_stream(id_anak):
+    """
+    Teks Gemini dikirim per potongan sebagai event `token`, lalu event `done`
+    berisi hasil parse_gemini_response. Event `hasil` (rule-based) dikirim paling awal.
+    """
+    data = siapkan_analisis_terstruktur(id_anak)
+    if not data:
+        return jsonify({"error": "Belum ada data pengukuran"}), 404
+    anak, peng, umur_bulan, umur_pengukuran, hasil, imt, prompt = data
+
+    tertunda = skor_tertunda(anak, peng)
+    if tertunda:
+        jadwalkan_scoring([peng.id_pengukuran])
+    model = nama_model()
+    kunci = kunci_analisis(peng, "terstruktur", model, hasil, umur_pengukuran)
+    cached = None if tertunda else cari_analisis(kunci, peng)
+    id_pengukuran, pengukuran_updated_at = peng.id_pengukuran, peng.updated_at
+
+    def generate():
+        yield sse("hasil", {"id_anak": id_anak, "nama_anak": anak.nama, "umur_bulan": umur_bulan,
+                            "umur_bulan_pengukuran": umur_pengukuran, "hasil": hasil,
+                            "skor_tertunda": tertunda})
+
+        if tertunda:
+            yield sse("error", {"error": "Z-score sedang dihitung, coba lagi sebentar lagi.",
+                                "skor_tertunda": True})
+            return
+        if cached:
+            yield sse("token", {"teks": cached.hasil_raw})
+            yield sse("done", {"gemini_analysis": cached.hasil, "cached": True})
+            return
+        if not gemini_tersedia():
+            yield sse("error", {"error": "Layanan Gemini sedang tidak tersedia, coba lagi nanti."})
+            return
+
+        potongan = []
+        try:
+            for teks in stream_with_gemini(prompt):
+                potongan.append(teks)
+                yield sse("token", {"teks": teks})
+        except GeminiError as e:
+            yield sse("error", {"error": str(e)})
+            return
+
+        raw = "".join(potongan).strip()
+        analisis = parse_gemini_response(raw)
+        simpan_analisis(kunci, id_pengukuran, "terstruktur", model, raw, analisis, pengukuran_updated_at)
+        yield sse("done", {"gemini_analysis": analisis, "cached": False})
+
+    return response_stream(generate())
+
+
+# ==========================================================
+# ✅ API: STATUS JOB ANALISIS AI
+# ==========================================================
+@iot_bp.route("/api/ai-jobs/<id_job>", methods=["GET"])
+def api_ai_job_status(id_job):
+    job = db.session.get(AnalisisJob, id_job)
+    if not job:
+        return jsonify({"error": "Job analisis tidak ditemukan"}), 404
+
+    return jsonify({
+        "id_job": job.id_job,
+        "status": job.status,
+        "id_anak": job.id_anak,
+        "id_pengukuran": job.id_pengukuran,
+        "ai_analysis": job.hasil,
+        "ai_analysis_raw": job.hasil_raw,
+        "error": job.error
+    }), 200
+
+
+# ==========================================================
+# ✅ API: METRIK GEMINI (latensi, kegagalan, status circuit breaker)
+# ==========================================================
+@iot_bp.route("/api/gemini-metrics", methods=["GET"])
+def api_gemini_metrics():
+    return jsonify(gemini_metrics()), 200
+
+
 # ==========================================================
 # ✅ HISTORY DAN GRAFIK
 # ==========================================================
@@ -706,10 +842,14 @@ def add_anak():
 def edit_anak(id_anak):
     anak = Anak.query.get_or_404(id_anak)
     if request.method == "POST":
+        sebelum = (str(anak.tanggal_lahir), anak.jenis_kelamin)
         anak.nama = request.form.get("nama")
         anak.tanggal_lahir = request.form.get("tanggal_lahir")
         anak.jenis_kelamin = request.form.get("jenis_kelamin")
         db.session.commit()
+        # z-score tersimpan bergantung pada umur & jenis kelamin: nilai ulang semua pengukuran anak
+        if (str(anak.tanggal_lahir), anak.jenis_kelamin) != sebelum:
+            jadwalkan_scoring_anak(anak.id_anak)
         return redirect(url_for("iot.list_anak"))
     return render_template("form_anak.html", anak=anak)
 
@@ -856,35 +996,13 @@ def process_pengukuran(id_pengukuran):
 
     if not peng.berat_badan or not peng.tinggi_badan:
         return jsonify({"error": "Tinggi & berat badan wajib untuk analisis"}), 400
+    if not anak.tanggal_lahir:
+        return jsonify({"error": "Tanggal lahir anak wajib untuk analisis"}), 400
 
-    umur_bulan = hitung_umur_bulan(anak.tanggal_lahir)
-    sex = "Laki-Laki" if anak.jenis_kelamin in ["L", "l", "Laki-Laki"] else "Perempuan"
-
-    hasil = assess_child_growth(
-        sex=sex,
-        age_months=umur_bulan,
-        weight_kg=peng.berat_badan,
-        height_cm=peng.tinggi_badan,
-        head_circ=peng.lingkar_kepala or 0,
-        arm_circ=peng.lingkar_lengan or 0
-    )
-
-    peng.z_bb = hasil["BB/U"]["z_score"]
-    peng.kategori_bb = hasil["BB/U"]["kategori"]
-
-    peng.z_tb = hasil["TB/U"]["z_score"]
-    peng.kategori_tb = hasil["TB/U"]["kategori"]
-
-    peng.z_imt = hasil["IMT/U"]["z_score"]
-    peng.kategori_imt = hasil["IMT/U"]["kategori"]
-
-    peng.z_lk = hasil["LK/U"]["z_score"]
-    peng.kategori_lk = hasil["LK/U"]["kategori"]
-
-    peng.z_lila = hasil["LILA/U"]["z_score"]
-    peng.kategori_lila = hasil["LILA/U"]["kategori"]
-
-    db.session.commit()
+    # hitung langsung (tanpa menunggu job background) lalu baca hasil yang tersimpan
+    nilai_pengukuran([id_pengukuran])
+    db.session.refresh(peng)
+    hasil = hasil_tersimpan(peng)
 
     return jsonify({
         "message": "Analisis gizi berhasil diproses",
@@ -1032,3 +1150,30 @@ def api_pengukuran_grafik(id_anak):
     except Exception as e:
         # jangan expose sensitive info di production; untuk debugging sekarang sertakan error
         return jsonify({"error": str(e)}), 500
+
+
+# ==========================================================
+# ✅ API: KURVA REFERENSI WHO (-3..+3 SD) UNTUK GRAFIK
+# ==========================================================
+INDIKATOR_KURVA = ["bb", "tb", "imt", "lk", "lila"]
+
+
+@iot_bp.route("/api/reference-curves/<indicator>/<sex>", methods=["GET"])
+def api_reference_curves(indicator, sex):
+    """
+    Kurva -3..+3 SD per bulan dari tabel LMS (rumus LMS terbalik), dihitung sekali per proses.
+    ETag kuat mengikuti versi tabel LMS sehingga pemuatan grafik berikutnya cukup 304.
+    """
+    indicator = indicator.lower()
+    if indicator not in INDIKATOR_KURVA:
+        return jsonify({"error": f"Indikator tidak dikenal, gunakan salah satu: {', '.join(INDIKATOR_KURVA)}"}), 404
+    if sex not in ["L", "l", "P", "p", "Laki-Laki", "Laki-laki", "Perempuan"]:
+        return jsonify({"error": "Jenis kelamin harus L atau P"}), 404
+
+    kurva = get_engine().kurva_referensi(indicator, sex)
+
+    resp = jsonify(kurva)
+    resp.set_etag(f"{kurva['versi']}-{indicator}-{kurva['jenis_kelamin']}")
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 7 * 24 * 3600
+    return resp.make_conditional(request)
@@ -0,0 +1,176 @@
+"""
+Simulasi banyak perangkat IoT untuk menguji listener (python -m backend.iot.listener):
+
+    python -m backend.iot.simulator --devices 2000 --rate 5 --duration 20
+    python -m backend.iot.simulator --udp --port 7071 --devices 200 --id-pengukuran 12
+
+Setiap perangkat membuka koneksi TCP sendiri (atau socket UDP) dan mengirim pembacaan
+format teks dengan sinyal pita ukur yang bergoyang lalu stabil. Laporan berisi jumlah
+terkirim/di-ack, error, throughput, dan latensi ack (p50/p95/p99).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from .listener import naikkan_batas_file
+
+
+def persentil(data, p):
+    return data[min(len(data) - 1, int(p * len(data)))] if data else None
+
+
+def sinyal(t, target):
+    """Goyang +-3 cm yang mengecil selama 3 detik pertama, lalu noise kecil di sekitar target"""
+    if t < 3:
+        return target + random.uniform(-3, 3) * (1 - t / 3)
+    return target + random.gauss(0, 0.03)
+
+
+class Hasil:
+    def __init__(self):
+        self.terkirim = 0
+        self.ok = 0
+        self.error = 0
+        self.gagal_konek = 0
+        self.latensi = []
+
+
+def baris_pembacaan(device_id, seq, t, target, id_pengukuran):
+    baris = f"{device_id} {seq} kepala {sinyal(t, target):.2f} {time.time():.3f}"
+    if id_pengukuran:
+        baris += f" {id_pengukuran}"
+    return baris + "\n"
+
+
+async def perangkat_tcp(i, args, hasil, mulai):
+    device_id = f"{args.prefix}-{i}"
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError:
+        hasil.gagal_konek += 1
+        return
+
+    terkirim = {}
+
+    async def baca_ack():
+        while True:
+            baris = await reader.readline()
+            if not baris:
+                return
+            bagian = baris.decode().split()
+            if len(bagian) >= 2 and bagian[1].isdigit():
+                t = terkirim.pop(int(bagian[1]), None)
+                if bagian[0] == "OK":
+                    hasil.ok += 1
+                    if t is not None:
+                        hasil.latensi.append(time.perf_counter() - t)
+                else:
+                    hasil.error += 1
+            elif bagian and bagian[0] == "ERR":
+                hasil.error += 1
+
+    pembaca = asyncio.create_task(baca_ack())
+    target = random.uniform(40, 50)
+    jeda = 1 / args.rate
+    await asyncio.sleep(random.uniform(0, jeda))  # sebar waktu kirim antar perangkat
+    seq = 0
+    try:
+        while time.perf_counter() - mulai < args.duration:
+            terkirim[seq] = time.perf_counter()
+            writer.write(baris_pembacaan(device_id, seq, time.perf_counter() - mulai, target,
+                                         args.id_pengukuran).encode())
+            await writer.drain()
+            hasil.terkirim += 1
+            seq += 1
+            await asyncio.sleep(jeda)
+        # beri waktu ack terakhir datang
+        batas = time.perf_counter() + 5
+        while terkirim and time.perf_counter() < batas:
+            await asyncio.sleep(0.05)
+    except ConnectionError:
+        hasil.error += 1
+    finally:
+        pembaca.cancel()
+        writer.close()
+
+
+class KlienUDP(asyncio.DatagramProtocol):
+    def __init__(self, hasil, terkirim):
+        self.hasil = hasil
+        self.terkirim = terkirim
+
+    def datagram_received(self, data, addr):
+        for baris in data.decode().splitlines():
+            bagian = baris.split()
+            if len(bagian) >= 2 and bagian[1].isdigit():
+                t = self.terkirim.pop(int(bagian[1]), None)
+                if bagian[0] == "OK":
+                    self.hasil.ok += 1
+                    if t is not None:
+                        self.hasil.latensi.append(time.perf_counter() - t)
+                    continue
+            self.hasil.error += 1
+
+
+async def perangkat_udp(i, args, hasil, mulai):
+    device_id = f"{args.prefix}-{i}"
+    terkirim = {}
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: KlienUDP(hasil, terkirim),
+                                                       remote_addr=(args.host, args.port))
+    target = random.uniform(40, 50)
+    jeda = 1 / args.rate
+    await asyncio.sleep(random.uniform(0, jeda))
+    seq = 0
+    try:
+        while time.perf_counter() - mulai < args.duration:
+            terkirim[seq] = time.perf_counter()
+            transport.sendto(baris_pembacaan(device_id, seq, time.perf_counter() - mulai, target,
+                                             args.id_pengukuran).encode())
+            hasil.terkirim += 1
+            seq += 1
+            await asyncio.sleep(jeda)
+        await asyncio.sleep(1)
+    finally:
+        transport.close()
+
+
+async def jalankan(args):
+    hasil = Hasil()
+    mulai = time.perf_counter()
+    perangkat = perangkat_udp if args.udp else perangkat_tcp
+    await asyncio.gather(*(perangkat(i, args, hasil, mulai) for i in range(args.devices)))
+    return hasil, time.perf_counter() - mulai
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulasi perangkat IoT untuk listener TCP/UDP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Default 7070 (TCP) / 7071 (UDP)")
+    parser.add_argument("--udp", action="store_true", help="Kirim lewat UDP, bukan TCP")
+    parser.add_argument("--devices", type=int, default=100, help="Jumlah perangkat (koneksi) bersamaan")
+    parser.add_argument("--rate", type=float, default=5, help="Pembacaan per detik per perangkat")
+    parser.add_argument("--duration", type=float, default=10, help="Lama simulasi (detik)")
+    parser.add_argument("--prefix", default="sim", help="Awalan device_id")
+    parser.add_argument("--id-pengukuran", type=int, default=None,
+                        help="id_pengukuran untuk semua pembacaan (default: hanya live store)")
+    args = parser.parse_args(argv)
+    if args.port is None:
+        args.port = 7071 if args.udp else 7070
+
+    print(f"Batas file descriptor: {naikkan_batas_file()}")
+    hasil, detik = asyncio.run(jalankan(args))
+
+    latensi = sorted(hasil.latensi)
+    print(f"\n=== {args.devices} perangkat {'UDP' if args.udp else 'TCP'}, {args.rate}/detik, {detik:.1f} detik ===")
+    print(f"  terkirim       : {hasil.terkirim} ({hasil.terkirim / detik:.0f}/detik)")
+    print(f"  ack OK         : {hasil.ok}")
+    print(f"  error          : {hasil.error}, gagal konek: {hasil.gagal_konek}")
+    if latensi:
+        print(f"  latensi ack ms : p50 {persentil(latensi, 0.5) * 1000:.1f}, "
+              f"p95 {persentil(latensi, 0.95) * 1000:.1f}, p99 {persentil(latensi, 0.99) * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import statistics
+
+from flask import current_app
+
+from .live_store import get_live_store
+
+# ==========================================================
+# ✅ STABILISASI PEMBACAAN SENSOR
+# ==========================================================
+# Pita ukur / timbangan bergoyang beberapa detik sebelum nilainya tenang. Setiap
+# (perangkat, pengukuran, jenis) punya jendela N sampel terakhir; nilai dianggap stabil
+# jika variansinya <= toleransi^2. Hanya nilai stabil (median jendela) yang ditulis ke
+# Pengukuran, dan hanya jika berbeda lebih dari toleransi dari nilai yang terakhir ditulis.
+# Sampel di antaranya cukup dikirim ke live store. Status jendela disimpan di live store
+# agar sama untuk semua worker; baca-ubah-tulis jendela berjalan di bawah lock live store
+# (lihat pipeline.simpan_bacaan) agar sampel dari worker lain tidak hilang.
+
+
+def toleransi(jenis):
+    if jenis == "berat":
+        return current_app.config.get("STABIL_TOLERANSI_KG", 0.05)
+    return current_app.config.get("STABIL_TOLERANSI_CM", 0.2)
+
+
+def kunci_status(device_id, id_pengukuran, jenis):
+    return f"stabil:{device_id}:{id_pengukuran}:{jenis}"
+
+
+def variansi(nilai):
+    """Variansi populasi dengan float biasa (statistics.pvariance memakai Fraction, jauh lebih lambat)"""
+    rata = sum(nilai) / len(nilai)
+    return sum((x - rata) ** 2 for x in nilai) / len(nilai)
+
+
+def status_awal():
+    return {"nilai": [], "ts": None, "stabil": False, "tersimpan": None}
+
+
+def langkah(status, nilai, ts, jenis, final=False):
+    """
+    Tambahkan satu sampel ke jendela (status diubah langsung).
+    Mengembalikan nilai yang harus ditulis ke database, atau None.
+    `final` = perangkat menandai sampel ini sebagai hasil akhir -> langsung ditulis.
+    """
+    n = current_app.config.get("STABIL_SAMPEL", 5)
+    jeda_maks = current_app.config.get("STABIL_JEDA_MAKS", 10)
+    tol = toleransi(jenis)
+
+    # jeda panjang = pengukuran baru dimulai; sampel lama tidak relevan lagi
+    if status["ts"] is not None and ts - status["ts"] > jeda_maks:
+        status["nilai"] = []
+    status["ts"] = ts
+    status["nilai"] = (status["nilai"] + [nilai])[-n:]
+
+    if final:
+        status["stabil"] = True
+        stabil = nilai
+    else:
+        status["stabil"] = len(status["nilai"]) >= n and variansi(status["nilai"]) <= tol * tol
+        if not status["stabil"]:
+            return None
+        stabil = round(statistics.median(status["nilai"]), 2)
+
+    if status["tersimpan"] is not None and abs(stabil - status["tersimpan"]) <= tol and not final:
+        return None  # masih nilai yang sama dengan yang sudah ditulis
+    status["tersimpan"] = stabil
+    return stabil
+
+
+def muat_status(daftar_kunci):
+    ada = get_live_store().get_many(daftar_kunci)
+    return {kunci: ada.get(kunci) or status_awal() for kunci in daftar_kunci}
+
+
+def simpan_status(semua_status):
+    """Satu penulisan live store untuk seluruh jendela yang berubah"""
+    if semua_status:
+        data = {k: {f: v for f, v in s.items() if f != "seq"} for k, s in semua_status.items()}
+        get_live_store().set_many(data)
@@ -0,0 +1,175 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import insert, delete
+
+from ..extensions import db
+from ..models import Pengukuran, SensorReading, SensorRollup
+
+# ==========================================================
+# ✅ DERET WAKTU PEMBACAAN SENSOR (sensor_reading + sensor_rollup)
+# ==========================================================
+# sensor_reading menyimpan setiap sampel apa adanya (append-only, bulk insert di
+# transaksi yang sama dengan update Pengukuran). `flask sensor rollup` merangkum per
+# (pengukuran, jenis) ke sensor_rollup, `flask sensor prune` menghapus sampel yang lebih
+# tua dari SENSOR_RETENSI_HARI. Tabel pengukuran tetap kecil.
+
+KOLOM_RINGKASAN = ("jenis", "jumlah", "nilai_min", "nilai_max", "nilai_median", "ts_awal", "ts_akhir")
+
+
+def tulis_mentah(bacaan):
+    """Bulk INSERT (executemany); commit mengikuti transaksi pemanggil"""
+    if not bacaan or not current_app.config.get("SENSOR_RAW_AKTIF", True):
+        return
+    db.session.execute(insert(SensorReading.__table__), [
+        {
+            "device_id": b["device_id"],
+            "id_pengukuran": b["id_pengukuran"],
+            "jenis": b["jenis"],
+            "ts": datetime.utcfromtimestamp(b["ts"]),
+            "nilai": b["nilai"],
+        }
+        for b in bacaan
+    ])
+
+
+def ambil_pembacaan(ids):
+    """(id_pengukuran, jenis, ts, nilai) untuk beberapa pengukuran; dibaca dari covering index"""
+    return db.session.execute(
+        db.select(SensorReading.id_pengukuran, SensorReading.jenis, SensorReading.ts, SensorReading.nilai)
+        .where(SensorReading.id_pengukuran.in_(ids))
+        .order_by(SensorReading.id_pengukuran, SensorReading.ts)
+    ).all()
+
+
+def ringkas(rows):
+    """{(id_pengukuran, jenis): ringkasan} dari baris ambil_pembacaan"""
+    grup = {}
+    for r in rows:
+        grup.setdefault((r.id_pengukuran, r.jenis), []).append(r)
+
+    hasil = {}
+    for (id_pengukuran, jenis), daftar in grup.items():
+        nilai = np.fromiter((r.nilai for r in daftar), dtype=np.float64, count=len(daftar))
+        hasil[(id_pengukuran, jenis)] = {
+            "id_pengukuran": id_pengukuran,
+            "jenis": jenis,
+            "jumlah": len(daftar),
+            "nilai_min": float(nilai.min()),
+            "nilai_max": float(nilai.max()),
+            "nilai_median": float(np.median(nilai)),
+            "ts_awal": daftar[0].ts,
+            "ts_akhir": daftar[-1].ts,
+        }
+    return hasil
+
+
+def rollup_pengukuran(ids):
+    """
+    Hitung ulang ringkasan untuk beberapa pengukuran dan ganti barisnya dalam satu transaksi.
+    Hanya (pengukuran, jenis) yang masih punya sampel yang diganti: ringkasan jenis yang
+    sampelnya sudah di-prune tetap disimpan.
+    """
+    ids = set(db.session.scalars(
+        db.select(Pengukuran.id_pengukuran).where(Pengukuran.id_pengukuran.in_(ids))
+    ))
+    if not ids:
+        return 0
+    ringkasan = ringkas(ambil_pembacaan(ids))
+    per_jenis = {}
+    for id_pengukuran, jenis in ringkasan:
+        per_jenis.setdefault(jenis, set()).add(id_pengukuran)
+    for jenis, ids_jenis in per_jenis.items():
+        db.session.execute(
+            delete(SensorRollup).where(SensorRollup.jenis == jenis, SensorRollup.id_pengukuran.in_(ids_jenis))
+        )
+    if ringkasan:
+        sekarang = datetime.utcnow()
+        db.session.execute(insert(SensorRollup.__table__),
+                           [{**r, "updated_at": sekarang} for r in ringkasan.values()])
+    db.session.commit()
+    return len(ringkasan)
+
+
+def rollup_semua(since=None, chunk_size=500, progress=None):
+    """
+    Rollup pengukuran yang punya sampel dengan ts >= since (semua jika since None).
+    Setiap chunk pengukuran = satu transaksi.
+    """
+    mulai = time.perf_counter()
+    query = db.select(SensorReading.id_pengukuran).where(SensorReading.id_pengukuran.is_not(None)).distinct()
+    if since is not None:
+        query = query.where(SensorReading.ts >= since)
+    ids = sorted(db.session.scalars(query))
+
+    total = 0
+    for i in range(0, len(ids), chunk_size):
+        total += rollup_pengukuran(ids[i:i + chunk_size])
+        if progress:
+            progress(min(i + chunk_size, len(ids)), len(ids))
+    return {"pengukuran": len(ids), "rollup": total, "detik": round(time.perf_counter() - mulai, 2)}
+
+
+def belum_dirangkum(ids):
+    """
+    Pengukuran yang punya sampel tanpa rollup (pengukuran, jenis), atau sampel setelah ts_akhir
+    rollup-nya (masuk setelah `flask sensor rollup` dijalankan) sehingga belum ikut dirangkum.
+    """
+    return set(db.session.scalars(
+        db.select(SensorReading.id_pengukuran)
+        .outerjoin(SensorRollup, (SensorRollup.id_pengukuran == SensorReading.id_pengukuran)
+                   & (SensorRollup.jenis == SensorReading.jenis))
+        .where(SensorReading.id_pengukuran.in_(ids),
+               SensorRollup.id_rollup.is_(None) | (SensorReading.ts > SensorRollup.ts_akhir))
+        .distinct()
+    ))
+
+
+def prune(hari=None, batch_size=10000, progress=None):
+    """
+    Hapus sampel yang lebih tua dari `hari` per batch (satu transaksi per batch).
+    Pengukuran yang belum punya rollup, atau punya sampel yang masuk setelah rollup dibuat,
+    dirangkum (ulang) dulu agar ringkasannya tidak hilang.
+    """
+    hari = hari if hari is not None else current_app.config.get("SENSOR_RETENSI_HARI", 180)
+    batas = datetime.utcnow() - timedelta(days=hari)
+    mulai, total = time.perf_counter(), 0
+
+    while True:
+        rows = db.session.execute(
+            db.select(SensorReading.id, SensorReading.id_pengukuran)
+            .where(SensorReading.ts < batas)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids_peng = {r.id_pengukuran for r in rows if r.id_pengukuran is not None}
+        if ids_peng:
+            perlu = belum_dirangkum(ids_peng)
+            if perlu:
+                rollup_pengukuran(perlu)
+
+        db.session.execute(delete(SensorReading).where(SensorReading.id.in_([r.id for r in rows])))
+        db.session.commit()
+        total += len(rows)
+        if progress:
+            progress(total)
+
+    return {"dihapus": total, "batas": batas, "detik": round(time.perf_counter() - mulai, 2)}
+
+
+def rollup_untuk(id_pengukuran):
+    """Ringkasan satu pengukuran: dari sensor_rollup, atau dihitung langsung jika belum di-rollup"""
+    rows = SensorRollup.query.filter_by(id_pengukuran=id_pengukuran).order_by(SensorRollup.jenis).all()
+    if rows:
+        daftar = [{c: getattr(r, c) for c in KOLOM_RINGKASAN} for r in rows]
+    else:
+        daftar = [r for _, r in sorted(ringkas(ambil_pembacaan([id_pengukuran])).items())]
+    return [
+        {**{c: r[c] for c in KOLOM_RINGKASAN},
+         "ts_awal": r["ts_awal"].isoformat(), "ts_akhir": r["ts_akhir"].isoformat()}
+        for r in daftar
+    ]
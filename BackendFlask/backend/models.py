@@ -11,7 +11,7 @@ class OrangTua(db.Model):
     nama = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    nomor_hp = db.Column(db.String(20), nullable=True)
+    nomor_hp = db.Column(db.String(20), nullable=True, index=True)  # login: email ATAU nomor_hp
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     anak = db.relationship("Anak", backref="orang_tua", lazy=True)
@@ -30,7 +30,7 @@ class Perawat(db.Model):
     nama = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    nomor_hp = db.Column(db.String(20), nullable=True)
+    nomor_hp = db.Column(db.String(20), nullable=True, index=True)  # login: email ATAU nomor_hp
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
@@ -44,7 +44,7 @@ class Anak(db.Model):
     __tablename__ = "anak"
 
     id_anak = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    id_orang_tua = db.Column(db.Integer, db.ForeignKey("orang_tua.id_orang_tua"), nullable=True)
+    id_orang_tua = db.Column(db.Integer, db.ForeignKey("orang_tua.id_orang_tua"), nullable=True, index=True)
     nama = db.Column(db.String(100), nullable=False)
     jenis_kelamin = db.Column(db.Enum('Laki-laki', 'Perempuan'), nullable=True)
     tanggal_lahir = db.Column(db.Date, nullable=True)
@@ -62,6 +62,11 @@ class Anak(db.Model):
 # ========================
 class Pengukuran(db.Model):
     __tablename__ = "pengukuran"
+    # halaman anak memfilter id_anak lalu mengurutkan tanggal / created_at
+    __table_args__ = (
+        db.Index("ix_pengukuran_anak_tanggal", "id_anak", "tanggal"),
+        db.Index("ix_pengukuran_anak_created_at", "id_anak", "created_at"),
+    )
 
     id_pengukuran = db.Column(db.Integer, primary_key=True, autoincrement=True)
     id_anak = db.Column(db.Integer, db.ForeignKey("anak.id_anak"), nullable=False)
@@ -86,3 +91,107 @@ class Pengukuran(db.Model):
 
     def __repr__(self):
         return f"<Pengukuran {self.id_pengukuran} - Anak {self.id_anak}>"
+
+
+# ========================
+# Model Job Analisis AI
+# ========================
+class AnalisisJob(db.Model):
+    __tablename__ = "analisis_job"
+
+    id_job = db.Column(db.String(32), primary_key=True)
+    id_anak = db.Column(db.Integer, db.ForeignKey("anak.id_anak"), nullable=True)
+    id_pengukuran = db.Column(db.Integer, db.ForeignKey("pengukuran.id_pengukuran"), nullable=True)
+    kunci = db.Column(db.String(64), nullable=True, index=True)  # kunci analisis_ai yang sedang dibuat
+    jenis = db.Column(db.String(20), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending / running / done / error
+    hasil_raw = db.Column(db.Text, nullable=True)
+    hasil = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AnalisisJob {self.id_job} - {self.status}>"
+
+
+# ========================
+# Model Cache Analisis AI
+# ========================
+class AnalisisAI(db.Model):
+    __tablename__ = "analisis_ai"
+
+    id_analisis = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_pengukuran = db.Column(db.Integer, db.ForeignKey("pengukuran.id_pengukuran"), nullable=False, index=True)
+    kunci = db.Column(db.String(64), unique=True, nullable=False)  # sha256 input prompt
+    jenis = db.Column(db.String(20), nullable=False)  # varian prompt: detail / ringkas / terstruktur
+    model = db.Column(db.String(50), nullable=False)
+    hasil_raw = db.Column(db.Text, nullable=True)
+    hasil = db.Column(db.JSON, nullable=True)
+    pengukuran_updated_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AnalisisAI {self.id_analisis} - Pengukuran {self.id_pengukuran}>"
+
+
+# ========================
+# Model Pembacaan Sensor Mentah (append-only)
+# ========================
+class SensorReading(db.Model):
+    __tablename__ = "sensor_reading"
+    # (id_pengukuran, ts) + kolom yang dibaca rollup/audit -> query per pengukuran cukup dari index
+    __table_args__ = (
+        db.Index("ix_sensor_reading_pengukuran_ts", "id_pengukuran", "ts", "jenis", "nilai"),
+    )
+
+    # tanpa foreign key: insert tidak perlu cek tabel pengukuran dan pembacaan
+    # perangkat yang belum terikat ke pengukuran tetap tersimpan
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    device_id = db.Column(db.String(64), nullable=False)
+    id_pengukuran = db.Column(db.Integer, nullable=True)
+    jenis = db.Column(db.String(10), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False, index=True)  # index dipakai pruning retensi
+    nilai = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<SensorReading {self.id} - {self.device_id} {self.jenis}={self.nilai}>"
+
+
+# ========================
+# Model Ringkasan Pembacaan Sensor per Pengukuran
+# ========================
+class SensorRollup(db.Model):
+    __tablename__ = "sensor_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("id_pengukuran", "jenis", name="uq_sensor_rollup_pengukuran_jenis"),
+    )
+
+    id_rollup = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    id_pengukuran = db.Column(db.Integer, db.ForeignKey("pengukuran.id_pengukuran"), nullable=False)
+    jenis = db.Column(db.String(10), nullable=False)
+    jumlah = db.Column(db.Integer, nullable=False)
+    nilai_min = db.Column(db.Float, nullable=False)
+    nilai_max = db.Column(db.Float, nullable=False)
+    nilai_median = db.Column(db.Float, nullable=False)
+    ts_awal = db.Column(db.DateTime, nullable=False)
+    ts_akhir = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SensorRollup Pengukuran {self.id_pengukuran} {self.jenis} n={self.jumlah}>"
+
+
+# ========================
+# Model Perangkat IoT
+# ========================
+class Device(db.Model):
+    __tablename__ = "device"
+
+    id_device = db.Column(db.String(64), primary_key=True)  # device_id yang dikirim firmware
+    nama = db.Column(db.String(100), nullable=False)
+    jenis_sensor = db.Column(db.String(10), nullable=True)  # kepala / lengan / tinggi / berat
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Device {self.id_device} - {self.nama}>"
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from .extensions import db
+from .models import Anak, OrangTua, Pengukuran, Perawat
+
+# ==========================================================
+# ✅ CEK RENCANA QUERY ROUTE UTAMA (flask db-explain)
+# ==========================================================
+# Query yang sama dengan yang dijalankan route paling sering dibuka, dijalankan dengan
+# EXPLAIN di database aktif. Query yang membaca seluruh tabel (tanpa index) dilaporkan
+# gagal, misalnya setelah migrasi index belum dijalankan di server.
+
+
+def query_utama():
+    """(nama, route, select) untuk setiap predikat panas"""
+    hari = datetime(2025, 1, 1)
+    pengukuran_anak = db.select(Pengukuran.id_pengukuran).where(Pengukuran.id_anak == 1)
+    return [
+        ("pengukuran terbaru anak", "/iot/api/pengukuran/detail/<id_anak>, /iot/pengukuran/detail/<id_anak>",
+         pengukuran_anak.order_by(Pengukuran.created_at.desc(), Pengukuran.id_pengukuran.desc()).limit(1)),
+        ("riwayat pengukuran anak", "/iot/api/pengukuran/riwayat/<id_anak>, /iot/chart/<id_anak>",
+         pengukuran_anak.order_by(Pengukuran.created_at.asc())),
+        ("grafik per tanggal", "/iot/api/pengukuran/<id_anak>/grafik",
+         pengukuran_anak.where(Pengukuran.tanggal.is_not(None)).order_by(Pengukuran.tanggal.asc())),
+        ("pengukuran anak per hari", "/iot/api/create-pengukuran",
+         pengukuran_anak.where(Pengukuran.tanggal >= hari, Pengukuran.tanggal < hari + timedelta(days=1)).limit(1)),
+        ("anak milik orang tua", "/iot/api/anak-by-orangtua/<id>, /dashboard/orangtua/<id>",
+         db.select(Anak.id_anak).where(Anak.id_orang_tua == 1)),
+        ("login orang tua", "/auth/login",
+         db.select(OrangTua.id_orang_tua).where((OrangTua.nomor_hp == "08123") | (OrangTua.email == "08123"))),
+        ("login perawat", "/auth/login",
+         db.select(Perawat.id_perawat).where((Perawat.email == "08123") | (Perawat.nomor_hp == "08123"))),
+    ]
+
+
+def explain(query):
+    """
+    Jalankan EXPLAIN untuk satu select. Mengembalikan (pakai_index, ringkasan rencana).
+    Mendukung SQLite (EXPLAIN QUERY PLAN), MySQL/MariaDB, dan PostgreSQL.
+    """
+    dialek = db.engine.dialect
+    sql = str(query.compile(dialect=dialek, compile_kwargs={"literal_binds": True}))
+
+    if dialek.name == "sqlite":
+        langkah = [r[3] for r in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}"))]
+        # "SCAN pengukuran" = full table scan; "SEARCH ... USING INDEX" / "SCAN ... USING INDEX" = index
+        scan_penuh = [s for s in langkah if s.startswith("SCAN ") and " USING " not in s]
+        return not scan_penuh, "; ".join(langkah)
+
+    if dialek.name in ("mysql", "mariadb"):
+        rows = db.session.execute(db.text(f"EXPLAIN {sql}")).mappings().all()
+        # type ALL = full table scan; index_merge / ref / range memakai index
+        scan_penuh = [r for r in rows if r["type"] == "ALL"]
+        return not scan_penuh, "; ".join(f"{r['table']}: {r['type']} key={r['key']}" for r in rows)
+
+    langkah = [r[0] for r in db.session.execute(db.text(f"EXPLAIN {sql}"))]
+    return not any("Seq Scan" in s for s in langkah), "; ".join(s.strip() for s in langkah)
+
+
+def periksa_semua():
+    """[{nama, route, index, rencana}] untuk semua query utama"""
+    hasil = []
+    for nama, route, query in query_utama():
+        pakai_index, rencana = explain(query)
+        hasil.append({"nama": nama, "route": route, "index": pakai_index, "rencana": rencana})
+    db.session.rollback()
+    return hasil
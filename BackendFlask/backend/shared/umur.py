@@ -0,0 +1,26 @@
+from datetime import datetime
+
+# ==========================================================
+# ✅ FUNGSI BANTU: HITUNG UMUR DALAM BULAN
+# ==========================================================
+# Dipakai route, prompt Gemini dan flask ai-precompute (harus sama agar kunci cache cocok).
+
+
+def hitung_umur_bulan(tanggal_lahir, pada=None):
+    today = pada or datetime.today()
+    umur_tahun = today.year - tanggal_lahir.year
+    umur_bulan = today.month - tanggal_lahir.month
+    total_bulan = umur_tahun * 12 + umur_bulan
+    if today.day < tanggal_lahir.day:
+        total_bulan -= 1
+    return max(0, total_bulan)
+
+
+def umur_bulan_pengukuran(anak, peng):
+    """
+    Umur pada tanggal pengukuran: umur yang dipakai saat z-score peng dihitung
+    (tanggal sama dengan rescore.siapkan_kolom), jadi inilah yang ditampilkan di samping z-score.
+    """
+    if not anak.tanggal_lahir:
+        return 0
+    return hitung_umur_bulan(anak.tanggal_lahir, peng.tanggal or peng.created_at or datetime.utcnow())
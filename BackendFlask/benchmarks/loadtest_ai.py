@@ -0,0 +1,96 @@
+"""
+Load test endpoint streaming analisis AI (/iot/api/gemini-analysis/<id_anak>/stream, yang
+memanggil Gemini di dalam request) dengan backend Gemini palsu (offline, tanpa kuota API).
+
+Jalankan dari folder BackendFlask:
+
+    python -m benchmarks.loadtest_ai                                  # default: fake-latency p50 800ms / p99 5s
+    python -m benchmarks.loadtest_ai --concurrency 32 --requests 200 --max-concurrency 4
+    python -m benchmarks.loadtest_ai --p50 2000 --p99 20000 --error-rate 0.05 --timeout 10
+
+Setiap request memakai anak berbeda sehingga cache analisis tidak membantu. Laporan berisi
+latensi request (p50/p95/p99), throughput, jumlah error, dan metrik Gemini (sukses,
+timeout, ditolak karena semaphore/breaker) untuk melihat titik jenuh worker.
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from .run import buat_app
+
+def persentil(data, p):
+    return data[min(len(data) - 1, int(p * len(data)))] if data else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test analisis AI dengan backend Gemini palsu")
+    parser.add_argument("--requests", type=int, default=100, help="Jumlah request total")
+    parser.add_argument("--concurrency", type=int, default=16, help="Jumlah klien bersamaan")
+    parser.add_argument("--backend", default="fake-latency", choices=["fake", "fake-latency"])
+    parser.add_argument("--p50", type=float, default=800, help="Latensi p50 Gemini palsu (ms)")
+    parser.add_argument("--p99", type=float, default=5000, help="Latensi p99 Gemini palsu (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang error per panggilan")
+    parser.add_argument("--timeout", type=float, default=30, help="GEMINI_TIMEOUT (detik)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="GEMINI_MAX_CONCURRENCY")
+    args = parser.parse_args(argv)
+
+    app = buat_app(
+        GEMINI_BACKEND=args.backend,
+        GEMINI_FAKE_P50_MS=args.p50,
+        GEMINI_FAKE_P99_MS=args.p99,
+        GEMINI_FAKE_ERROR_RATE=args.error_rate,
+        GEMINI_TIMEOUT=args.timeout,
+        GEMINI_MAX_CONCURRENCY=args.max_concurrency,
+        GEMINI_BREAKER_THRESHOLD=max(5, args.requests),  # breaker tidak ikut menolak selama uji
+    )
+
+    from backend.extensions import db
+    from backend.models import Anak, Pengukuran
+    from backend.ai_integration import gemini_metrics
+
+    with app.app_context():
+        db.create_all()
+        ids = []
+        for i in range(args.requests):
+            anak = Anak(nama=f"Anak {i}", jenis_kelamin="Laki-laki", tanggal_lahir=date(2023, 1, 1))
+            db.session.add(anak)
+            db.session.flush()
+            db.session.add(Pengukuran(id_anak=anak.id_anak, created_at=datetime(2025, 1, 1),
+                                      berat_badan=10 + i % 50 / 10, tinggi_badan=80 + i % 20))
+            ids.append(anak.id_anak)
+        db.session.commit()
+
+    client = app.test_client()
+
+    def kirim(id_anak):
+        mulai = time.perf_counter()
+        resp = client.get(f"/iot/api/gemini-analysis/{id_anak}/stream")
+        body = resp.get_data(as_text=True)
+        ok = resp.status_code == 200 and "event: done" in body
+        return time.perf_counter() - mulai, ok
+
+    print(f"=== Load test: {args.requests} request, {args.concurrency} klien, backend {args.backend} "
+          f"(p50 {args.p50:.0f} ms, p99 {args.p99:.0f} ms, error {args.error_rate:.0%}), "
+          f"GEMINI_MAX_CONCURRENCY={args.max_concurrency} ===")
+    mulai = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        hasil = list(pool.map(kirim, ids))
+    durasi = time.perf_counter() - mulai
+
+    latensi = sorted(d for d, _ in hasil)
+    gagal = sum(1 for _, ok in hasil if not ok)
+    print(f"  durasi total   : {durasi:.2f} s ({len(hasil) / durasi:.2f} request/detik)")
+    print(f"  latensi request: p50 {persentil(latensi, 0.5) * 1000:.0f} ms, "
+          f"p95 {persentil(latensi, 0.95) * 1000:.0f} ms, p99 {persentil(latensi, 0.99) * 1000:.0f} ms, "
+          f"rata-rata {statistics.mean(latensi) * 1000:.0f} ms")
+    print(f"  request gagal  : {gagal}/{len(hasil)}")
+    with app.app_context():
+        print(f"  metrik Gemini  : {gemini_metrics()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Benchmark paket analisis BalitaCare (offline: SQLite in-memory + data sintetis).
+
+Jalankan dari folder BackendFlask:
+
+    python -m benchmarks.run                      # bandingkan dengan baseline.json
+    python -m benchmarks.run --tolerance 0.5      # toleransi 50%
+    python -m benchmarks.run --update-baseline    # simpan hasil sebagai baseline baru
+    python -m benchmarks.run --only scoring       # hanya benchmark yang namanya mengandung "scoring"
+
+Hasil ditulis sebagai JSON (median mikrodetik per operasi). Proses keluar dengan
+kode 1 jika ada benchmark yang lebih lambat dari baseline melebihi toleransi.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+
+SAMPLE_GEMINI = [
+    "Secara umum perkembangan anak ini baik dan sesuai dengan standar WHO. Berat badan dan tinggi badan "
+    "berada pada rentang normal. Lingkar kepala juga normal. Tetap lanjutkan pemberian makanan bergizi "
+    "seimbang dan lakukan pemantauan rutin setiap bulan di posyandu.",
+    "Anak ini perlu perhatian khusus karena berat badan menurut umur berada di kategori kurang. "
+    "Asupan nutrisi harus ditingkatkan, terutama protein hewani. Konsultasi dengan dokter atau ahli gizi "
+    "sangat disarankan. Lakukan monitoring berat badan setiap dua minggu.",
+    '{"status_perkembangan": "Baik", "analisis_umum": "Normal", "area_perhatian": [], '
+    '"rekomendasi": ["Pemantauan rutin"], "saran_pemantauan": "Setiap bulan", "ringkasan": "Baik"}',
+]
+
+
+# ==========================================================
+# ✅ UTILITAS PENGUKURAN WAKTU
+# ==========================================================
+def ukur(fn, repeat=7, number=None, min_time=0.05):
+    """Median waktu per panggilan (mikrodetik) dari beberapa putaran"""
+    if number is None:
+        number, elapsed = 1, 0.0
+        while True:
+            t = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - t
+            if elapsed >= min_time or number >= 1_000_000:
+                break
+            number *= 10
+    hasil = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        hasil.append((time.perf_counter() - t) / number)
+    return {"median_us": round(statistics.median(hasil) * 1e6, 3), "ops": number}
+
+
+# ==========================================================
+# ✅ FIXTURE: APP FLASK + SQLITE IN-MEMORY
+# ==========================================================
+def buat_app(**config):
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    from backend import create_app
+    from backend.config import Config
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite://"
+        TESTING = True
+
+    for nama, nilai in config.items():
+        setattr(BenchmarkConfig, nama, nilai)
+    return create_app(BenchmarkConfig)
+
+
+def isi_riwayat(db, Anak, Pengukuran, jumlah_per_anak):
+    """Buat satu anak per ukuran riwayat dan kembalikan {jumlah: id_anak}"""
+    rng = random.Random(42)
+    ids = {}
+    for n in jumlah_per_anak:
+        anak = Anak(nama=f"Anak {n}", jenis_kelamin="Laki-laki", tanggal_lahir=date(2021, 1, 1))
+        db.session.add(anak)
+        db.session.flush()
+        mulai = datetime(2021, 1, 1)
+        rows = []
+        for i in range(n):
+            tgl = mulai + timedelta(hours=i * 6)
+            rows.append({
+                "id_anak": anak.id_anak,
+                "tanggal": tgl,
+                "created_at": tgl,
+                "berat_badan": round(rng.uniform(3, 18), 1),
+                "tinggi_badan": round(rng.uniform(50, 105), 1),
+                "lingkar_kepala": round(rng.uniform(33, 50), 1),
+                "lingkar_lengan": round(rng.uniform(10, 17), 1),
+                "z_bb": round(rng.uniform(-3, 3), 2),
+                "z_tb": round(rng.uniform(-3, 3), 2),
+            })
+        db.session.execute(db.insert(Pengukuran), rows)
+        ids[n] = anak.id_anak
+    db.session.commit()
+    return ids
+
+
+# ==========================================================
+# ✅ DAFTAR BENCHMARK
+# ==========================================================
+def benchmark_scoring():
+    from backend.analysis.predict import (
+        hitung_zscore, assess_child_growth, hitung_pertumbuhan, assess_child_growth_batch
+    )
+    from backend.analysis.lms import get_engine
+
+    get_engine()
+    hasil = {
+        "scoring.hitung_zscore": ukur(lambda: hitung_zscore(12.0, 24, "L", "bb")),
+        "scoring.assess_child_growth": ukur(lambda: hitung_pertumbuhan("L", 24, 12.0, 86.0, 48.0, 15.0)),
+        "scoring.assess_child_growth_cached": ukur(lambda: assess_child_growth("L", 24, 12.0, 86.0, 48.0, 15.0)),
+    }
+
+    rng = np.random.default_rng(0)
+    for n in (1_000, 100_000):
+        sex = rng.choice(["L", "P"], n)
+        umur = rng.integers(0, 61, n)
+        berat, tinggi = rng.uniform(3, 20, n), rng.uniform(50, 110, n)
+        kepala, lengan = rng.uniform(33, 52, n), rng.uniform(10, 18, n)
+        hasil[f"scoring.batch_{n}"] = ukur(
+            lambda: assess_child_growth_batch(sex, umur, berat, tinggi, kepala, lengan), repeat=5
+        )
+    return hasil
+
+
+def benchmark_lms_load():
+    from backend.analysis.lms import LMSEngine, get_engine, compile_artifact, status_artifact
+
+    ok, _ = status_artifact()
+    if not ok:
+        compile_artifact()
+    return {
+        "lms_load.cold_excel": ukur(LMSEngine.from_excel, repeat=3, number=1),
+        "lms_load.cold_artifact": ukur(LMSEngine.from_artifact, repeat=5),
+        "lms_load.warm": ukur(get_engine),
+    }
+
+
+def benchmark_grafik():
+    from backend.extensions import db
+    from backend.models import Anak, Pengukuran
+
+    app = buat_app()
+    hasil = {}
+    with app.app_context():
+        db.create_all()
+        ids = isi_riwayat(db, Anak, Pengukuran, [10, 100, 1_000, 10_000])
+        client = app.test_client()
+        for n, id_anak in ids.items():
+            def panggil(id_anak=id_anak):
+                resp = client.get(f"/iot/api/pengukuran/{id_anak}/grafik")
+                assert resp.status_code == 200, resp.data
+            hasil[f"grafik.riwayat_{n}"] = ukur(panggil, repeat=5)
+    return hasil
+
+
+def benchmark_parse_gemini():
+    from backend.ai_parser import parse_gemini_response
+
+    return {
+        f"parse_gemini.sampel_{i}": ukur(lambda teks=teks: parse_gemini_response(teks))
+        for i, teks in enumerate(SAMPLE_GEMINI)
+    }
+
+
+def benchmark_gemini_fake():
+    """Overhead jalur panggilan Gemini (client, breaker, semaphore, metrik) dengan backend palsu"""
+    from backend.ai_integration import generate_with_gemini
+
+    app = buat_app(GEMINI_BACKEND="fake")
+    with app.app_context():
+        return {"gemini_fake.generate": ukur(lambda: generate_with_gemini("ANALISIS PERTUMBUHAN ANAK"))}
+
+
+BENCHMARKS = [benchmark_scoring, benchmark_lms_load, benchmark_grafik, benchmark_parse_gemini,
+              benchmark_gemini_fake]
+
+
+# ==========================================================
+# ✅ PERBANDINGAN DENGAN BASELINE
+# ==========================================================
+def bandingkan(hasil, baseline, tolerance):
+    """Kembalikan daftar (nama, baseline, sekarang, rasio) yang melewati toleransi"""
+    regresi = []
+    for nama, data in sorted(hasil.items()):
+        lama = baseline.get(nama)
+        if not lama:
+            print(f"  {nama:<34} {data['median_us']:>14.3f} us  (baru)")
+            continue
+        rasio = data["median_us"] / lama["median_us"] if lama["median_us"] else 1.0
+        tanda = "❌" if rasio > 1 + tolerance else "✅"
+        print(f"  {nama:<34} {data['median_us']:>14.3f} us  baseline {lama['median_us']:>14.3f} us  "
+              f"x{rasio:.2f} {tanda}")
+        if rasio > 1 + tolerance:
+            regresi.append((nama, lama["median_us"], data["median_us"], rasio))
+    return regresi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark paket analisis BalitaCare")
+    parser.add_argument("--output", default=os.path.join(HERE, "results.json"), help="File JSON hasil")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="File JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCH_TOLERANCE", "0.25")),
+                        help="Batas perlambatan relatif sebelum gagal (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Tulis hasil sebagai baseline")
+    parser.add_argument("--only", default=None, help="Hanya jalankan benchmark yang namanya mengandung teks ini")
+    args = parser.parse_args(argv)
+
+    hasil = {}
+    for bench in BENCHMARKS:
+        if args.only and args.only not in bench.__name__:
+            continue
+        hasil.update(bench())
+
+    with open(args.output, "w") as f:
+        json.dump(hasil, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(hasil)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline diperbarui: {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"=== Hasil benchmark (toleransi {args.tolerance:.0%}) ===")
+    regresi = bandingkan(hasil, baseline, args.tolerance)
+    if regresi:
+        print(f"\n❌ {len(regresi)} benchmark melambat melebihi toleransi")
+        return 1
+    print("\n✅ Tidak ada regresi performa")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
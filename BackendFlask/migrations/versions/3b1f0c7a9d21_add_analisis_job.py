@@ -0,0 +1,35 @@
+"""add analisis_job
+
+Revision ID: 3b1f0c7a9d21
+Revises: 6e05bd8d4591
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0c7a9d21'
+down_revision = '6e05bd8d4591'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analisis_job',
+    sa.Column('id_job', sa.String(length=32), nullable=False),
+    sa.Column('id_anak', sa.Integer(), nullable=True),
+    sa.Column('id_pengukuran', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('hasil_raw', sa.Text(), nullable=True),
+    sa.Column('hasil', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id_job')
+    )
+
+
+def downgrade():
+    op.drop_table('analisis_job')
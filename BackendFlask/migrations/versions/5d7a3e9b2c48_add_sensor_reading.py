@@ -0,0 +1,54 @@
+"""add sensor_reading time series and sensor_rollup
+
+Revision ID: 5d7a3e9b2c48
+Revises: 8c4e2d6f1a35
+Create Date: 2026-10-18 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a3e9b2c48'
+down_revision = '8c4e2d6f1a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sensor_reading',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('device_id', sa.String(length=64), nullable=False),
+    sa.Column('id_pengukuran', sa.Integer(), nullable=True),
+    sa.Column('jenis', sa.String(length=10), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('nilai', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sensor_reading_pengukuran_ts', 'sensor_reading',
+                    ['id_pengukuran', 'ts', 'jenis', 'nilai'], unique=False)
+    op.create_index('ix_sensor_reading_ts', 'sensor_reading', ['ts'], unique=False)
+
+    op.create_table('sensor_rollup',
+    sa.Column('id_rollup', sa.Integer(), nullable=False),
+    sa.Column('id_pengukuran', sa.Integer(), nullable=False),
+    sa.Column('jenis', sa.String(length=10), nullable=False),
+    sa.Column('jumlah', sa.Integer(), nullable=False),
+    sa.Column('nilai_min', sa.Float(), nullable=False),
+    sa.Column('nilai_max', sa.Float(), nullable=False),
+    sa.Column('nilai_median', sa.Float(), nullable=False),
+    sa.Column('ts_awal', sa.DateTime(), nullable=False),
+    sa.Column('ts_akhir', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_pengukuran'], ['pengukuran.id_pengukuran'], ),
+    sa.PrimaryKeyConstraint('id_rollup'),
+    sa.UniqueConstraint('id_pengukuran', 'jenis', name='uq_sensor_rollup_pengukuran_jenis')
+    )
+
+
+def downgrade():
+    op.drop_table('sensor_rollup')
+    op.drop_index('ix_sensor_reading_ts', table_name='sensor_reading')
+    op.drop_index('ix_sensor_reading_pengukuran_ts', table_name='sensor_reading')
+    op.drop_table('sensor_reading')
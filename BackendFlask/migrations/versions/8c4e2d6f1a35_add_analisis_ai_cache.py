@@ -0,0 +1,46 @@
+"""add analisis_ai cache
+
+Revision ID: 8c4e2d6f1a35
+Revises: 3b1f0c7a9d21
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2d6f1a35'
+down_revision = '3b1f0c7a9d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analisis_ai',
+    sa.Column('id_analisis', sa.Integer(), nullable=False),
+    sa.Column('id_pengukuran', sa.Integer(), nullable=False),
+    sa.Column('kunci', sa.String(length=64), nullable=False),
+    sa.Column('jenis', sa.String(length=20), nullable=False),
+    sa.Column('model', sa.String(length=50), nullable=False),
+    sa.Column('hasil_raw', sa.Text(), nullable=True),
+    sa.Column('hasil', sa.JSON(), nullable=True),
+    sa.Column('pengukuran_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['id_pengukuran'], ['pengukuran.id_pengukuran'], ),
+    sa.PrimaryKeyConstraint('id_analisis'),
+    sa.UniqueConstraint('kunci')
+    )
+    op.create_index('ix_analisis_ai_id_pengukuran', 'analisis_ai', ['id_pengukuran'], unique=False)
+
+    op.add_column('analisis_job', sa.Column('kunci', sa.String(length=64), nullable=True))
+    op.add_column('analisis_job', sa.Column('jenis', sa.String(length=20), nullable=True))
+    op.create_index('ix_analisis_job_kunci', 'analisis_job', ['kunci'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_analisis_job_kunci', table_name='analisis_job')
+    op.drop_column('analisis_job', 'jenis')
+    op.drop_column('analisis_job', 'kunci')
+    op.drop_index('ix_analisis_ai_id_pengukuran', table_name='analisis_ai')
+    op.drop_table('analisis_ai')
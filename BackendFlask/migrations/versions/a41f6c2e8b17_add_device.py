@@ -0,0 +1,30 @@
+"""add device registry
+
+Revision ID: a41f6c2e8b17
+Revises: 5d7a3e9b2c48
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c2e8b17'
+down_revision = '5d7a3e9b2c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('device',
+    sa.Column('id_device', sa.String(length=64), nullable=False),
+    sa.Column('nama', sa.String(length=100), nullable=False),
+    sa.Column('jenis_sensor', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id_device')
+    )
+
+
+def downgrade():
+    op.drop_table('device')
@@ -0,0 +1,98 @@
+"""sync schema with models and index hot query predicates
+
+Revision ID: c92d5e7a1f08
+Revises: a41f6c2e8b17
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c92d5e7a1f08'
+down_revision = 'a41f6c2e8b17'
+branch_labels = None
+depends_on = None
+
+# Database lama dibuat dengan db.create_all() atau manual, sehingga orang_tua / perawat / anak
+# dan kolom z-score pengukuran mungkin sudah ada: semuanya hanya dibuat jika belum ada.
+
+KOLOM_SKOR = [
+    ('z_bb', sa.Float()), ('kategori_bb', sa.String(length=50)),
+    ('z_tb', sa.Float()), ('kategori_tb', sa.String(length=50)),
+    ('z_lk', sa.Float()), ('kategori_lk', sa.String(length=50)),
+    ('z_imt', sa.Float()), ('kategori_imt', sa.String(length=50)),
+    ('z_lila', sa.Float()), ('kategori_lila', sa.String(length=50)),
+]
+
+# (nama, tabel, kolom)
+INDEX = [
+    ('ix_pengukuran_anak_tanggal', 'pengukuran', ['id_anak', 'tanggal']),
+    ('ix_pengukuran_anak_created_at', 'pengukuran', ['id_anak', 'created_at']),
+    ('ix_anak_id_orang_tua', 'anak', ['id_orang_tua']),
+    ('ix_orang_tua_nomor_hp', 'orang_tua', ['nomor_hp']),
+    ('ix_perawat_nomor_hp', 'perawat', ['nomor_hp']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tabel = set(inspector.get_table_names())
+
+    if 'orang_tua' not in tabel:
+        op.create_table('orang_tua',
+        sa.Column('id_orang_tua', sa.Integer(), nullable=False),
+        sa.Column('nama', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('nomor_hp', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id_orang_tua'),
+        sa.UniqueConstraint('email')
+        )
+
+    if 'perawat' not in tabel:
+        op.create_table('perawat',
+        sa.Column('id_perawat', sa.Integer(), nullable=False),
+        sa.Column('nama', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('nomor_hp', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id_perawat'),
+        sa.UniqueConstraint('email')
+        )
+
+    if 'anak' not in tabel:
+        op.create_table('anak',
+        sa.Column('id_anak', sa.Integer(), nullable=False),
+        sa.Column('id_orang_tua', sa.Integer(), nullable=True),
+        sa.Column('nama', sa.String(length=100), nullable=False),
+        sa.Column('jenis_kelamin', sa.Enum('Laki-laki', 'Perempuan'), nullable=True),
+        sa.Column('tanggal_lahir', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['id_orang_tua'], ['orang_tua.id_orang_tua']),
+        sa.PrimaryKeyConstraint('id_anak')
+        )
+
+    kolom_pengukuran = {c['name'] for c in inspector.get_columns('pengukuran')}
+    with op.batch_alter_table('pengukuran') as batch_op:
+        for nama, tipe in KOLOM_SKOR:
+            if nama not in kolom_pengukuran:
+                batch_op.add_column(sa.Column(nama, tipe, nullable=True))
+
+    for nama, nama_tabel, kolom in INDEX:
+        # MySQL sudah membuat index otomatis untuk foreign key (mis. anak.id_orang_tua)
+        ada = sa.inspect(op.get_bind()).get_indexes(nama_tabel)
+        if not any(i['name'] == nama or i['column_names'] == kolom for i in ada):
+            op.create_index(nama, nama_tabel, kolom, unique=False)
+
+
+def downgrade():
+    # hanya index yang dilepas: tabel dan kolom z-score mungkin sudah ada sebelum revisi ini
+    # (dan berisi data), jadi tidak dihapus
+    for nama, nama_tabel, _ in reversed(INDEX):
+        if nama in {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(nama_tabel)}:
+            op.drop_index(nama, table_name=nama_tabel)
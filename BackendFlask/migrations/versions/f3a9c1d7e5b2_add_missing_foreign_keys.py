@@ -0,0 +1,68 @@
+"""add foreign keys declared by the models
+
+Revision ID: f3a9c1d7e5b2
+Revises: c92d5e7a1f08
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1d7e5b2'
+down_revision = 'c92d5e7a1f08'
+branch_labels = None
+depends_on = None
+
+# Tabel pengukuran (init) dan analisis_job dibuat tanpa foreign key, sehingga `flask db upgrade`
+# tidak sama dengan db.create_all(). Database yang dibuat dengan create_all() sudah punya FK ini:
+# hanya dibuat jika belum ada.
+
+# (nama, tabel, kolom, tabel tujuan, kolom tujuan, boleh NULL)
+FOREIGN_KEY = [
+    ('fk_pengukuran_id_anak_anak', 'pengukuran', 'id_anak', 'anak', 'id_anak', False),
+    ('fk_pengukuran_id_perawat_perawat', 'pengukuran', 'id_perawat', 'perawat', 'id_perawat', True),
+    ('fk_analisis_job_id_anak_anak', 'analisis_job', 'id_anak', 'anak', 'id_anak', True),
+    ('fk_analisis_job_id_pengukuran_pengukuran', 'analisis_job', 'id_pengukuran', 'pengukuran', 'id_pengukuran', True),
+]
+
+
+def sudah_ada(nama_tabel, kolom, tujuan):
+    return any(
+        fk['constrained_columns'] == [kolom] and fk['referred_table'] == tujuan
+        for fk in sa.inspect(op.get_bind()).get_foreign_keys(nama_tabel)
+    )
+
+
+def bersihkan_yatim(nama_tabel, kolom, tujuan, kolom_tujuan, boleh_null):
+    """Referensi ke baris yang sudah tidak ada: NULL jika boleh, selain itu upgrade dihentikan"""
+    yatim = (
+        f"{kolom} IS NOT NULL AND {kolom} NOT IN (SELECT {kolom_tujuan} FROM {tujuan})"
+    )
+    if boleh_null:
+        op.execute(f"UPDATE {nama_tabel} SET {kolom} = NULL WHERE {yatim}")
+        return
+    jumlah = op.get_bind().execute(sa.text(f"SELECT COUNT(*) FROM {nama_tabel} WHERE {yatim}")).scalar()
+    if jumlah:
+        raise RuntimeError(
+            f"{jumlah} baris {nama_tabel}.{kolom} menunjuk ke {tujuan} yang tidak ada; "
+            f"perbaiki atau hapus baris tersebut lalu jalankan `flask db upgrade` lagi"
+        )
+
+
+def upgrade():
+    for nama, nama_tabel, kolom, tujuan, kolom_tujuan, boleh_null in FOREIGN_KEY:
+        if sudah_ada(nama_tabel, kolom, tujuan):
+            continue
+        bersihkan_yatim(nama_tabel, kolom, tujuan, kolom_tujuan, boleh_null)
+        # batch: SQLite tidak bisa ALTER TABLE ADD CONSTRAINT, tabel dibuat ulang
+        with op.batch_alter_table(nama_tabel) as batch_op:
+            batch_op.create_foreign_key(nama, tujuan, [kolom], [kolom_tujuan])
+
+
+def downgrade():
+    for nama, nama_tabel, _, _, _, _ in reversed(FOREIGN_KEY):
+        if nama in {fk['name'] for fk in sa.inspect(op.get_bind()).get_foreign_keys(nama_tabel)}:
+            with op.batch_alter_table(nama_tabel) as batch_op:
+                batch_op.drop_constraint(nama, type_='foreignkey')
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+from flask_migrate.cli import db as db_cli
+
+from backend import create_app
+from backend.config import Config
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """App dengan database SQLite yang dibuat lewat `flask db upgrade` (bukan db.create_all())"""
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path_factory.mktemp('db') / 'migrasi.sqlite3'}"
+
+    app = create_app(TestConfig)
+    hasil = app.test_cli_runner().invoke(db_cli, ["upgrade", "--directory", MIGRATIONS])
+    assert hasil.exit_code == 0, hasil.output
+    return app
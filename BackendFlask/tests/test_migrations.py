@@ -0,0 +1,11 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from backend.extensions import db
+
+
+def test_migrasi_sama_dengan_model(app):
+    """`flask db upgrade` menghasilkan skema yang sama dengan model (autogenerate kosong)"""
+    with app.app_context(), db.engine.connect() as conn:
+        selisih = compare_metadata(MigrationContext.configure(conn), db.metadata)
+    assert not selisih, selisih
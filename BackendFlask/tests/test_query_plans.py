@@ -0,0 +1,11 @@
+import pytest
+
+from backend.query_plans import explain, query_utama
+
+
+@pytest.mark.parametrize("nama", [nama for nama, _, _ in query_utama()])
+def test_query_utama_memakai_index(app, nama):
+    with app.app_context():
+        query = {n: q for n, _, q in query_utama()}[nama]
+        pakai_index, rencana = explain(query)
+        assert pakai_index, f"{nama}: {rencana}"
@@ -0,0 +1,52 @@
+import { PUBLIC_BACKEND_URL } from '$env/static/public';
+
+export type AiJob = { id_job: string; status: string; status_url: string };
+
+// Tunggu job analisis AI di backend selesai lalu kembalikan hasil parsing-nya
+// (null jika gagal atau belum selesai setelah maxPercobaan).
+export async function tungguAnalisisAI(
+	job: AiJob,
+	{ interval = 2000, maxPercobaan = 60 } = {}
+): Promise<Record<string, any> | null> {
+	for (let i = 0; i < maxPercobaan; i++) {
+		try {
+			const res = await fetch(`${PUBLIC_BACKEND_URL}${job.status_url}`);
+			if (res.ok) {
+				const data = await res.json();
+				if (data.status === 'done') return data.ai_analysis ?? null;
+				if (data.status === 'error') return null;
+			}
+		} catch (err) {
+			console.error('Gagal cek status analisis AI:', err);
+		}
+		await new Promise((resolve) => setTimeout(resolve, interval));
+	}
+	return null;
+}
+
+export type StreamAnalisisHandler = {
+	onHasil?: (data: Record<string, any>) => void;
+	onToken?: (teks: string) => void;
+	onDone?: (analisis: Record<string, any> | null) => void;
+	onError?: (pesan: string) => void;
+};
+
+// Stream analisis Gemini (Server-Sent Events): teks muncul bertahap lewat onToken,
+// hasil terstruktur dikirim sekali di onDone. Kembalikan fungsi untuk menutup stream.
+export function streamAnalisisAI(idAnak: number, handler: StreamAnalisisHandler): () => void {
+	const source = new EventSource(`${PUBLIC_BACKEND_URL}/iot/api/gemini-analysis/${idAnak}/stream`);
+
+	source.addEventListener('hasil', (e) => handler.onHasil?.(JSON.parse((e as MessageEvent).data)));
+	source.addEventListener('token', (e) => handler.onToken?.(JSON.parse((e as MessageEvent).data).teks));
+	source.addEventListener('done', (e) => {
+		handler.onDone?.(JSON.parse((e as MessageEvent).data).gemini_analysis ?? null);
+		source.close();
+	});
+	source.addEventListener('error', (e) => {
+		const data = (e as MessageEvent).data;
+		handler.onError?.(data ? JSON.parse(data).error : 'Koneksi stream analisis AI terputus');
+		source.close();
+	});
+
+	return () => source.close();
+}
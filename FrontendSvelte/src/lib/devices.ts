@@ -0,0 +1,34 @@
+import { PUBLIC_BACKEND_URL } from '$env/static/public';
+
+const BACKEND_URL = `${PUBLIC_BACKEND_URL}/iot`;
+
+export type DeviceBinding = { id_device: string; id_anak: number; id_pengukuran: number; jenis: string | null };
+export type Device = {
+	id_device: string;
+	nama: string;
+	jenis_sensor: string | null;
+	binding: DeviceBinding | null;
+};
+
+// Daftar perangkat IoT terdaftar beserta sesi pengukuran yang sedang memakainya
+export async function daftarPerangkat(): Promise<Device[]> {
+	const res = await fetch(`${BACKEND_URL}/api/devices`);
+	return res.ok ? await res.json() : [];
+}
+
+// Ikat perangkat ke pengukuran ini: perangkat cukup mengirim device_id + nilai.
+// Binding lepas sendiri jika perangkat tidak mengirim data beberapa saat.
+export async function ikatPerangkat(idDevice: string, idPengukuran: string | number): Promise<Device> {
+	const res = await fetch(`${BACKEND_URL}/api/devices/${encodeURIComponent(idDevice)}/bind`, {
+		method: 'POST',
+		headers: { 'Content-Type': 'application/json' },
+		body: JSON.stringify({ id_pengukuran: Number(idPengukuran) })
+	});
+	const data = await res.json();
+	if (!res.ok) throw new Error(data.error || 'Gagal menghubungkan perangkat');
+	return data;
+}
+
+export async function lepasPerangkat(idDevice: string): Promise<void> {
+	await fetch(`${BACKEND_URL}/api/devices/${encodeURIComponent(idDevice)}/bind`, { method: 'DELETE' });
+}